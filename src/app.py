@@ -1,104 +1,36 @@
 import os
+from functools import partial
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from pathlib import Path
-from typing import Any, Optional
-from scipy.fft import dctn, idctn
-from PIL import Image
+from typing import Any, Optional, Sequence
 import numpy as np
 import matplotlib
 matplotlib.use("TkAgg")
 import matplotlib.pyplot as plt
+from matplotlib.axes import Axes
+from matplotlib.image import AxesImage
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
-def crop(img: np.typing.NDArray[Any], F: int) -> tuple[np.typing.NDArray[Any], int, int]:
-  """
-  Crops an image to be perfectly divisible in blocks of side length F.
-
-  :param img: Image to crop.
-  :type img: np.typing.NDArray[Any]
-  :param F: Block side length.
-  :type F: int
-  :return: Cropped image along with its new width and height.
-  :rtype: tuple[np.typing.NDArray[Any], int, int]
-  """
-  h, w = img.shape
-  height, width = h - h % F, w - w % F
-  cropped = img[:height, :width]
-  return cropped, width, height
-
-def to_visual(data: np.typing.NDArray[Any]) -> np.typing.NDArray[Any]:
-  """
-  Converts a data matrix into gray-scale for visualization.
-
-  :param data: Data matrix.
-  :type data: np.typing.NDArray[Any]
-  :return: Gray-scale data matrix.
-  :rtype: np.typing.NDArray[Any]
-  """
-  disp = np.log10(1 + np.abs(data)) # Apply absolute to avoid negatives and + 1 to avoid 0s and make original 0s become 0s when scaled (as log(1) is 0).
-  disp *= 255 / disp.max() if disp.max() > 0 else 1
-  return disp.astype(np.uint8)
-
-def jpeg_pipeline_steps(img: np.typing.NDArray[Any], F: int, d_thr: int) -> tuple[list[np.typing.NDArray[Any] | tuple[np.typing.NDArray[Any], np.typing.NDArray[Any]]], list[str]]:
-  """
-  Builds the JPEG compression steps.
-
-  :param img: Image to compress.
-  :type img: np.typing.NDArray[Any]
-  :param F: Block size.
-  :type F: int
-  :param d_thr: Threshold.
-  :type d_thr: int
-  :raises ValueError: _description_
-  :return: JPEG compression steps and titles.
-  :rtype: tuple[list[np.typing.NDArray[Any] | tuple[np.typing.NDArray[Any], np.typing.NDArray[Any]]], list[str]]
-  """
-  if img.ndim != 2:
-    raise ValueError("Image must be gray-scale!")
-
-  cropped, width, height = crop(img, F)
-
-  # Mask for k+ℓ < d_thr
-  k_idx, l_idx = np.meshgrid(np.arange(F), np.arange(F), indexing="ij")
-  block_mask = (k_idx + l_idx) < d_thr
-
-  coeff_mag = np.zeros_like(cropped, dtype=float)
-  coeff_masked_mag = np.zeros_like(cropped, dtype=float)
-  idct_float = np.empty_like(cropped, dtype=float)
-
-  for y in range(0, height, F):
-    for x in range(0, width, F):
-      patch = cropped[y : y + F, x : x + F].astype(float) # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
-      # DCT
-      c: np.typing.NDArray[Any] = dctn(patch - 128, norm="ortho") # type: ignore
-      coeff_mag[y : y + F, x : x + F] = c # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
-      # Mask
-      c_mask = c * block_mask
-      coeff_masked_mag[y : y + F, x : x + F] = c_mask # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
-      # IDCT
-      rec_patch: np.typing.NDArray[Any] = idctn(c_mask, norm="ortho") # type: ignore
-      idct_float[y : y + F, x : x + F] = np.clip(np.round(rec_patch + 128), 0, 255).astype(np.uint8) # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
-
-  images: list[np.typing.NDArray[Any] | tuple[np.typing.NDArray[Any], np.typing.NDArray[Any]]] = [
-    img,
-    cropped,
-    to_visual(coeff_mag),
-    to_visual(coeff_masked_mag),
-    idct_float,
-    (cropped, idct_float)
-  ]
-
-  titles = [
-    "Original image",
-    "Cropped image",
-    "|DCT| (log₁₀)",
-    f"Mask k+ℓ ≥ {d_thr}",
-    "IDCT (round & clip 0-255)",
-    "Original vs Compressed images"
-  ]
-
-  return images, titles
+from pipeline import PipelineSteps, Step
+from display import display_factor, downsample
+from profiling import stage
+from worker import BackgroundWorker
+from fileio import BackgroundSaver, load_image
+
+POLL_MS = 50
+"""
+Milliseconds between two checks for results of the background compression.
+"""
+
+DEBOUNCE_MS = 150
+"""
+Milliseconds to wait after the last parameter edit, or canvas resize, before updating the live preview, or the displayed pyramid level.
+"""
+
+THRESHOLD_STEPS = (3, 4, 5)
+"""
+Indices of the steps that change with the threshold.
+"""
 
 class DCT2App(tk.Tk):
   """
@@ -114,29 +46,39 @@ class DCT2App(tk.Tk):
     # Initialize data stuff.
     self.image_path: Path | None = None
     self.img_orig: np.typing.NDArray[Any] | None = None
-    self.step_imgs: list[np.typing.NDArray[Any] | tuple[np.typing.NDArray[Any], np.typing.NDArray[Any]]] = []
+    self.step_imgs: Sequence[Step] = []
     self.step_titles: list[str] = []
     self.step_idx: int = 0
     self.filename: Optional[str] = None
+    self.step_params: Optional[tuple[int, int]] = None
+    """
+    F and d of the displayed compression steps, None if not compressed yet.
+    """
+    self.worker = BackgroundWorker()
+    self._prefetch: Optional[PipelineSteps] = None # Steps whose reconstructed image waits for the worker to be idle to be computed.
+    self._preview_id: Optional[str] = None
+    self._resize_id: Optional[str] = None
+    self._images: dict[Axes, AxesImage] = {}
+    self._original_display: Optional[tuple[int, np.typing.NDArray[Any]]] = None
     # Build widgets.
     self._build_widgets()
+    self.after(POLL_MS, self._poll_worker)
 
   def load_image(self) -> None:
     """
-    Loads an image selected by the user.
+    Loads an image selected by the user, decoding it on the background thread.
     """
     filename = filedialog.askopenfilename(title="Select an image (BMP/PNG/JPG)", filetypes=[("Images", "*.bmp;*.png;*.jpg;*.jpeg"), ("All files", "*.*")])
     if filename:
-      self.filename = os.path.basename(filename)
-      self.image_path = Path(filename)
-      img = Image.open(filename).convert("L")
-      self.img_orig = np.array(img)
-      self._reset_steps([self.img_orig], ["Original image"])
-      self.download_btn.config(state=tk.DISABLED)
+      self.cancel_compression()
+      self.cancel_btn.config(state=tk.NORMAL)
+      self.status_label.config(text="load…")
+      self.worker.submit(lambda progress: load_image(Path(filename)), on_result=partial(self._on_image_loaded, Path(filename)), on_error=self._on_compression_error)
 
   def compress_and_show(self) -> None:
     """
     Applies the JPEG-like compression pipeline to the selected image with the chosen parameters.
+    Steps are computed on a background thread only when first displayed or downloaded, superseding any computation still in progress, and the reconstructed image is computed right away.
     """
     if self.img_orig is None:
       messagebox.showwarning("No image", "You must first load an image.")
@@ -151,14 +93,52 @@ class DCT2App(tk.Tk):
       messagebox.showerror("Parameter d not valid", "d must ≥ 1.")
       return
 
+    self.worker.cancel() # Work on the previous steps is stale.
+    steps = PipelineSteps(self.img_orig, F, dthr)
+    self.step_params = (F, dthr)
+    if self.var_live.get() and isinstance(self.step_imgs, PipelineSteps):
+      self.step_imgs, self.step_titles = steps, steps.titles # Keep the current step while previewing.
+      self._update_nav_buttons()
+      self._show_current_step()
+    else:
+      self._reset_steps(steps, steps.titles)
+    self._prefetch = steps # Prefetch the reconstructed image, after displaying the current step if it's being computed.
+    self._start_prefetch()
+    self.download_btn.config(state=tk.NORMAL)
+
+  def cancel_compression(self) -> None:
+    """
+    Cancels the compression in progress, if any.
+    """
+    self.worker.cancel()
+    self._prefetch = None
+    self.cancel_btn.config(state=tk.DISABLED)
+    self.progress.config(value=0)
+    self.status_label.config(text="")
+
+  def preview(self) -> None:
+    """
+    Updates the live preview with the chosen parameters: when only d changed, only the masked coefficients and the IDCT are recomputed, and only if one of them is displayed, otherwise the image is compressed again.
+    Unlike :meth:`compress_and_show`, incomplete or invalid parameters are silently ignored since they are still being edited.
+    """
+    self._preview_id = None
+    if self.img_orig is None:
+      return
     try:
-      imgs, titles = jpeg_pipeline_steps(self.img_orig, F, dthr)
-    except Exception as exc:
-      messagebox.showerror("Compression error", str(exc))
+      F = self.var_block.get()
+      dthr = self.var_d.get()
+    except tk.TclError:
       return
-
-    self._reset_steps(imgs, titles)
-    self.download_btn.config(state=tk.NORMAL)
+    if F < 2 or dthr < 1 or self.step_params == (F, dthr):
+      return
+    if self.step_params is None or self.step_params[0] != F or not isinstance(self.step_imgs, PipelineSteps):
+      self.compress_and_show()
+      return
+    self.step_imgs = self.step_imgs.with_threshold(dthr)
+    self.step_titles = self.step_imgs.titles
+    self.step_params = (F, dthr)
+    if self.step_idx in THRESHOLD_STEPS:
+      self._show_current_step()
 
   def prev_step(self) -> None:
     """
@@ -182,7 +162,8 @@ class DCT2App(tk.Tk):
     """
     Downloads all step images except for the original into a chosen directory.
     """
-    if len(self.step_imgs) <= 1:
+    steps = self.step_imgs
+    if not isinstance(steps, PipelineSteps) or self.step_params is None:
       messagebox.showwarning("Nothing to download", "Compress an image first.")
       return
 
@@ -190,16 +171,15 @@ class DCT2App(tk.Tk):
     if not directory:
       return
 
-    save_dir = Path(directory)
-    count = 0
-    F = self.var_block.get()
-    dthr = self.var_d.get()
-    for idx, img_obj in enumerate(self.step_imgs[1:5], start=1):
-      out_path = save_dir / f"{os.path.splitext(str(self.filename))[0]}_step_{idx}_{F}_{dthr}.bmp"
-      Image.fromarray(img_obj.astype(np.uint8)).save(out_path) # type: ignore
-      count += 1
-
-    messagebox.showinfo("Download complete", f"Saved {count} images to {save_dir}")
+    stem = os.path.splitext(str(self.filename))[0]
+    F, dthr = self.step_params
+    def compute_and_save(progress: Any) -> int:
+      with BackgroundSaver() as saver: # Each step is saved while the next one is computed.
+        for idx in range(1, 5):
+          saver.save(steps.step(idx, progress), Path(directory) / f"{stem}_step_{idx}_{F}_{dthr}.bmp") # type: ignore
+        return len(saver.wait())
+    self.cancel_btn.config(state=tk.NORMAL)
+    self.worker.submit(compute_and_save, on_result=partial(self._on_steps_saved, Path(directory)), on_error=self._on_compression_error, on_progress=self._on_progress)
 
   def _build_widgets(self) -> None:
     """
@@ -218,7 +198,14 @@ class DCT2App(tk.Tk):
     self.var_d = tk.IntVar(value=10)
     ttk.Spinbox(ctrl, from_=1, to=256, increment=1, width=5, textvariable=self.var_d).pack(side=tk.LEFT)
 
-    ttk.Button(ctrl, text="Compress", command=self.compress_and_show).pack(side=tk.LEFT, padx=15)
+    self.var_live = tk.BooleanVar(value=False)
+    ttk.Checkbutton(ctrl, text="Live", variable=self.var_live, command=self._schedule_preview).pack(side=tk.LEFT, padx=(15, 0))
+    for var in (self.var_block, self.var_d):
+      var.trace_add("write", lambda *_: self._schedule_preview())
+
+    ttk.Button(ctrl, text="Compress", command=self.compress_and_show).pack(side=tk.LEFT, padx=(15, 2))
+    self.cancel_btn = ttk.Button(ctrl, text="Cancel", command=self.cancel_compression, state=tk.DISABLED)
+    self.cancel_btn.pack(side=tk.LEFT, padx=(0, 15))
 
     self.prev_btn = ttk.Button(ctrl, text="◀", command=self.prev_step, state=tk.DISABLED)
     self.prev_btn.pack(side=tk.LEFT)
@@ -230,17 +217,59 @@ class DCT2App(tk.Tk):
     self.download_btn = ttk.Button(ctrl, text="Download steps…", command=self.download_steps, state=tk.DISABLED)
     self.download_btn.pack(side=tk.LEFT, padx=(15, 0))
 
+    self.status_label = ttk.Label(ctrl, text="")
+    self.status_label.pack(side=tk.RIGHT, padx=5)
+    self.progress = ttk.Progressbar(ctrl, length=120, maximum=1.0)
+    self.progress.pack(side=tk.RIGHT)
+
     self.fig, self.ax = plt.subplots()
-    self.ax.axis("off")
+    self.ax_pair = (self.fig.add_subplot(1, 2, 1), self.fig.add_subplot(1, 2, 2)) # Axes are created once and shown or hidden as needed.
+    for ax in (self.ax, *self.ax_pair):
+      ax.axis("off")
+      ax.set_visible(ax is self.ax)
+    self.fig.subplots_adjust(left=0.02, right=0.98, bottom=0.02, top=0.92, wspace=0.05)
     self.canvas = FigureCanvasTkAgg(self.fig, master=self)
     self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    self.canvas.get_tk_widget().bind("<Configure>", self._on_resize, add="+")
+
+  def _on_image_loaded(self, path: Path, img: np.typing.NDArray[Any]) -> None:
+    """
+    Displays an image decoded on the background thread.
+
+    :param path: Path of the image.
+    :type path: Path
+    :param img: Decoded gray-scale image.
+    :type img: np.typing.NDArray[Any]
+    """
+    self._on_task_done()
+    self.filename = path.name
+    self.image_path = path
+    self.img_orig = img
+    self._original_display = None
+    self.step_params = None
+    self._reset_steps([self.img_orig], ["Original image"])
+    self.download_btn.config(state=tk.DISABLED)
+    if self.var_live.get():
+      self.compress_and_show()
+
+  def _on_steps_saved(self, save_dir: Path, count: int) -> None:
+    """
+    Reports the step images saved in the background.
 
-  def _reset_steps(self, imgs: list[np.typing.NDArray[Any] | tuple[np.typing.NDArray[Any], np.typing.NDArray[Any]]], titles: list[str]) -> None:
+    :param save_dir: Directory where the images were saved.
+    :type save_dir: Path
+    :param count: Number of saved images.
+    :type count: int
+    """
+    self._on_task_done()
+    messagebox.showinfo("Download complete", f"Saved {count} images to {save_dir}")
+
+  def _reset_steps(self, imgs: Sequence[Step], titles: list[str]) -> None:
     """
     Resets the pipeline steps.
 
-    :param imgs: Images to display for each step.
-    :type imgs: list[np.typing.NDArray[Any] | tuple[np.typing.NDArray[Any], np.typing.NDArray[Any]]]
+    :param imgs: Images to display for each step, possibly computed lazily.
+    :type imgs: Sequence[Step]
     :param titles: Titles for each step.
     :type titles: list[str]
     """
@@ -252,30 +281,176 @@ class DCT2App(tk.Tk):
 
   def _show_current_step(self) -> None:
     """
-    Displays the current step image(s).
-    """
-    self.fig.clf()
-    img_obj = self.step_imgs[self.step_idx]
-    title = self.step_titles[self.step_idx]
-
-    if isinstance(img_obj, tuple):
-      ax1 = self.fig.add_subplot(1, 2, 1)
-      ax2 = self.fig.add_subplot(1, 2, 2)
-      ax1.imshow(img_obj[0], cmap="gray", vmin=0, vmax=255)
-      ax2.imshow(img_obj[1], cmap="gray", vmin=0, vmax=255)
-      ax1.set_title("Original")
-      ax2.set_title("Compressed")
-      for ax in (ax1, ax2):
-        ax.axis("off")
+    Displays the current step image(s), downsampled to the canvas size and computed on the background thread first if needed.
+    """
+    self.step_label.config(text=f"Step {self.step_idx} / {len(self.step_imgs) - 1}")
+    steps = self.step_imgs
+    width, height = self.canvas.get_width_height()
+    if isinstance(steps, PipelineSteps):
+      if not steps.display_ready(self.step_idx, height, width):
+        self._request_step(steps, self.step_idx)
+        return
+      self._draw(steps.display(self.step_idx, height, width), self.step_titles[self.step_idx])
+      return
+    img: np.typing.NDArray[Any] = steps[self.step_idx] # type: ignore # Only the original image is available before compressing.
+    factor = display_factor(img.shape, height, width)
+    if self._original_display is None or self._original_display[0] != factor:
+      self._original_display = (factor, downsample(img, factor))
+    self._draw(self._original_display[1], self.step_titles[self.step_idx])
+
+  def _request_step(self, steps: PipelineSteps, idx: int, show: bool = True) -> None:
+    """
+    Computes a step, downsampled to the canvas size, on the background thread.
+
+    :param steps: Lazy steps.
+    :type steps: PipelineSteps
+    :param idx: Step index.
+    :type idx: int
+    :param show: Whether to display the step once computed, if still current, defaults to True.
+    :type show: bool, optional
+    """
+    self.cancel_btn.config(state=tk.NORMAL)
+    self.progress.config(value=0)
+    width, height = self.canvas.get_width_height()
+    self.worker.submit(steps.display, idx, height, width, on_result=partial(self._on_step_ready, steps, idx, show), on_error=self._on_compression_error, on_progress=self._on_progress)
+
+  def _start_prefetch(self) -> None:
+    """
+    Computes the reconstructed image of the pending prefetch, without displaying it, once the worker is idle, so that a prefetch never supersedes the step being displayed.
+    """
+    if self._prefetch is None or self.worker.busy:
+      return
+    steps, self._prefetch = self._prefetch, None
+    if steps is self.step_imgs and not steps.ready(4):
+      self._request_step(steps, 4, show=False)
+
+  def _draw(self, img_obj: Step, title: str) -> None:
+    """
+    Draws step image(s) on the canvas.
+
+    :param img_obj: Image, or pair of images, of the step.
+    :type img_obj: Step
+    :param title: Step title.
+    :type title: str
+    """
+    with stage("draw"):
+      pair = isinstance(img_obj, tuple)
+      self.ax.set_visible(not pair)
+      for ax in self.ax_pair:
+        ax.set_visible(pair)
+
+      if isinstance(img_obj, tuple):
+        self._set_image(self.ax_pair[0], img_obj[0], "Original")
+        self._set_image(self.ax_pair[1], img_obj[1], "Compressed")
+      else:
+        self._set_image(self.ax, img_obj, title)
+
+      self.canvas.draw_idle()
+
+  def _set_image(self, ax: Axes, img: np.typing.NDArray[Any], title: str) -> None:
+    """
+    Displays an image in an axes, updating the data of its existing image in place instead of creating a new one.
+
+    :param ax: Axes.
+    :type ax: Axes
+    :param img: Image.
+    :type img: np.typing.NDArray[Any]
+    :param title: Axes title.
+    :type title: str
+    """
+    image = self._images.get(ax)
+    if image is None:
+      self._images[ax] = ax.imshow(img, cmap="gray", vmin=0, vmax=255)
     else:
-      ax = self.fig.add_subplot(1, 1, 1)
-      ax.imshow(img_obj, cmap="gray", vmin=0, vmax=255)
-      ax.axis("off")
-      ax.set_title(title)
+      image.set_data(img)
+      image.set_extent((-0.5, img.shape[1] - 0.5, img.shape[0] - 0.5, -0.5))
+      ax.set_xlim(-0.5, img.shape[1] - 0.5)
+      ax.set_ylim(img.shape[0] - 0.5, -0.5)
+    ax.set_title(title)
 
-    self.fig.tight_layout()
-    self.canvas.draw()
-    self.step_label.config(text=f"Step {self.step_idx} / {len(self.step_imgs) - 1}")
+  def _schedule_preview(self) -> None:
+    """
+    Debounces parameter edits in live preview mode, updating the preview only once they stop for :data:`DEBOUNCE_MS`.
+    """
+    if self._preview_id is not None:
+      self.after_cancel(self._preview_id)
+      self._preview_id = None
+    if self.var_live.get():
+      self._preview_id = self.after(DEBOUNCE_MS, self.preview)
+
+  def _on_resize(self, _: tk.Event) -> None:
+    """
+    Redraws the current step once the canvas stops being resized, to pick the matching level of its display pyramid.
+    """
+    if self._resize_id is not None:
+      self.after_cancel(self._resize_id)
+    self._resize_id = self.after(DEBOUNCE_MS, self._redraw)
+
+  def _redraw(self) -> None:
+    """
+    Redraws the current step, if any.
+    """
+    self._resize_id = None
+    if self.step_imgs:
+      self._show_current_step()
+
+  def _poll_worker(self) -> None:
+    """
+    Runs the callbacks of the background compression on the Tk thread, rescheduling itself.
+    """
+    self.worker.dispatch()
+    self.after(POLL_MS, self._poll_worker)
+
+  def _on_progress(self, name: str, fraction: float) -> None:
+    """
+    Displays the progress of the background compression.
+
+    :param name: Name of the current stage.
+    :type name: str
+    :param fraction: Fraction completed.
+    :type fraction: float
+    """
+    self.progress.config(value=fraction)
+    self.status_label.config(text=f"{name}…")
+
+  def _on_task_done(self) -> None:
+    """
+    Resets the progress display once a background computation is over.
+    """
+    self.cancel_btn.config(state=tk.DISABLED)
+    self.progress.config(value=1.0)
+    self.status_label.config(text="")
+
+  def _on_step_ready(self, steps: PipelineSteps, idx: int, show: bool, img_obj: Step) -> None:
+    """
+    Displays a step computed on the background thread, if it's still the current one.
+
+    :param steps: Lazy steps the step belongs to.
+    :type steps: PipelineSteps
+    :param idx: Step index.
+    :type idx: int
+    :param show: Whether to display the step.
+    :type show: bool
+    :param img_obj: Image, or pair of images, of the step.
+    :type img_obj: Step
+    """
+    self._on_task_done()
+    if show and steps is self.step_imgs and idx == self.step_idx:
+      self._draw(img_obj, self.step_titles[idx])
+    self._start_prefetch()
+
+  def _on_compression_error(self, exc: Exception) -> None:
+    """
+    Reports a failed background compression.
+
+    :param exc: Raised exception.
+    :type exc: Exception
+    """
+    self._prefetch = None
+    self.cancel_btn.config(state=tk.DISABLED)
+    self.progress.config(value=0)
+    self.status_label.config(text="")
+    messagebox.showerror("Compression error", str(exc))
 
   def _update_nav_buttons(self) -> None:
     """
@@ -292,6 +467,7 @@ class DCT2App(tk.Tk):
     """
     Performs closing operations to quit the application properly.
     """
+    self.worker.shutdown()
     plt.close("all")
     self.destroy()
     print("app quit")
@@ -0,0 +1,236 @@
+import os
+import csv
+import math
+import argparse
+from pathlib import Path
+from functools import partial
+from time import perf_counter
+from typing import Any, Optional
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+from pipeline import compress
+from color import SUBSAMPLINGS, compress_color
+from blocks import EDGES, set_workers
+from fileio import IMAGE_EXTENSIONS, BackgroundSaver, load_image, prefetch, save_image
+
+CHUNK_SIZE = 8
+"""
+Largest number of images compressed by a process in a single task, decoding and saving them in the background while compressing.
+"""
+
+def find_images(directory: Path) -> list[Path]:
+  """
+  Lists the images directly inside a directory, sorted by name.
+
+  :param directory: Directory to scan.
+  :type directory: Path
+  :return: Paths of the images found.
+  :rtype: list[Path]
+  """
+  return sorted(path for path in directory.iterdir() if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS)
+
+def output_path(path: Path, output_dir: Path, F: int, d_thr: int) -> Path:
+  """
+  Builds the path of the compressed image, named like the IDCT step saved by the application.
+
+  :param path: Path of the source image.
+  :type path: Path
+  :param output_dir: Directory where to save the compressed image.
+  :type output_dir: Path
+  :param F: Block size.
+  :type F: int
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :return: Path of the compressed image.
+  :rtype: Path
+  """
+  return output_dir / f"{path.stem}_step_4_{F}_{d_thr}.bmp"
+
+def compress_file(path: Path, output_dir: Path, F: int, d_thr: int, subsampling: Optional[str] = None, edge: str = "crop") -> tuple[Path, dict[str, float]]:
+  """
+  Compresses a single image as gray-scale, or as color with the given chroma subsampling, measuring its quality, and saves the result.
+
+  :param path: Path of the image to compress.
+  :type path: Path
+  :param output_dir: Directory where to save the compressed image.
+  :type output_dir: Path
+  :param F: Block size.
+  :type F: int
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :param subsampling: Chroma subsampling, one of :data:`color.SUBSAMPLINGS`, defaults to None to compress as gray-scale.
+  :type subsampling: Optional[str], optional
+  :param edge: Handling of the partial blocks of gray-scale images, one of :data:`blocks.EDGES`, defaults to "crop".
+  :type edge: str, optional
+  :return: Path of the saved compressed image and its metrics, see :func:`pipeline.compress` and :func:`color.compress_color`.
+  :rtype: tuple[Path, dict[str, float]]
+  """
+  rec, metrics = _compress_image(load_image(path, "L" if subsampling is None else "RGB"), F, d_thr, subsampling, edge)
+  return save_image(rec, output_path(path, output_dir, F, d_thr)), metrics
+
+def compress_files(paths: list[Path], output_dir: Path, F: int, d_thr: int, subsampling: Optional[str] = None, edge: str = "crop") -> list[tuple[str, Optional[dict[str, float]], Optional[str]]]:
+  """
+  Compresses many images like :func:`compress_file`, decoding the next images and saving the previous ones on background threads while compressing the current one.
+
+  :param paths: Paths of the images to compress.
+  :type paths: list[Path]
+  :param output_dir: Directory where to save the compressed images.
+  :type output_dir: Path
+  :param F: Block size.
+  :type F: int
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :param subsampling: Chroma subsampling, one of :data:`color.SUBSAMPLINGS`, defaults to None to compress as gray-scale.
+  :type subsampling: Optional[str], optional
+  :param edge: Handling of the partial blocks of gray-scale images, one of :data:`blocks.EDGES`, defaults to "crop".
+  :type edge: str, optional
+  :return: For each image, in order, its name and either its metrics or the error that made it fail, as a string so that it can be sent across processes.
+  :rtype: list[tuple[str, Optional[dict[str, float]], Optional[str]]]
+  """
+  results: list[tuple[str, Optional[dict[str, float]], Optional[str]]] = []
+  saved: list[tuple[int, dict[str, float], Future[Path]]] = []
+  with BackgroundSaver() as saver:
+    for path, image in prefetch(paths, partial(load_image, mode="L" if subsampling is None else "RGB")):
+      try:
+        rec, metrics = _compress_image(image.result(), F, d_thr, subsampling, edge)
+        saved.append((len(results), metrics, saver.save(rec, output_path(path, output_dir, F, d_thr))))
+        results.append((path.name, None, None))
+      except Exception as exc: # pylint: disable=broad-exception-caught
+        results.append((path.name, None, str(exc)))
+  for idx, metrics, future in saved:
+    error = future.exception()
+    results[idx] = (results[idx][0], None if error else metrics, str(error) if error else None)
+  return results
+
+def _compress_image(img: Any, F: int, d_thr: int, subsampling: Optional[str], edge: str) -> tuple[Any, dict[str, float]]:
+  """
+  Compresses a decoded image as gray-scale or color.
+
+  :param img: Gray-scale or RGB image.
+  :type img: Any
+  :param F: Block size.
+  :type F: int
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :param subsampling: Chroma subsampling, None for gray-scale images.
+  :type subsampling: Optional[str]
+  :param edge: Handling of the partial blocks of gray-scale images.
+  :type edge: str
+  :return: Reconstructed image and its metrics.
+  :rtype: tuple[Any, dict[str, float]]
+  """
+  if subsampling is None:
+    return compress(img, F, d_thr, cached=False, edge=edge) # Each image is compressed only once.
+  return compress_color(img, F, d_thr, subsampling)
+
+def write_report(path: Path, rows: list[dict[str, Any]]) -> None:
+  """
+  Saves the metrics of each compressed image as CSV.
+
+  :param path: Path of the CSV report.
+  :type path: Path
+  :param rows: Metrics of each image, along with its name.
+  :type rows: list[dict[str, Any]]
+  """
+  with open(path, "w", newline="", encoding="utf-8") as file:
+    writer = csv.DictWriter(file, fieldnames=["image", "F", "d", "mse", "psnr", "ssim", "retained", "fraction"])
+    writer.writeheader()
+    writer.writerows(sorted(rows, key=lambda row: row["image"]))
+
+def batch_compress(input_dir: Path, output_dir: Path, F: int, d_thr: int, workers: Optional[int] = None, report: Optional[Path] = None, subsampling: Optional[str] = None, edge: str = "crop") -> dict[str, float]:
+  """
+  Compresses every image in a directory across a pool of processes, and measures the quality of each of them.
+  Each process compresses chunks of images, decoding the next ones and saving the previous ones in the background, so that I/O overlaps with the transforms.
+
+  :param input_dir: Directory with the images to compress.
+  :type input_dir: Path
+  :param output_dir: Directory where to save the compressed images, created if missing.
+  :type output_dir: Path
+  :param F: Block size.
+  :type F: int
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :param workers: Number of processes, defaults to the number of CPUs.
+  :type workers: Optional[int], optional
+  :param report: Path of a CSV report with the metrics of each image, defaults to None for no report.
+  :type report: Optional[Path], optional
+  :param subsampling: Chroma subsampling to compress the images as color, one of :data:`color.SUBSAMPLINGS`, defaults to None to compress them as gray-scale.
+  :type subsampling: Optional[str], optional
+  :param edge: Handling of the partial blocks of gray-scale images, one of :data:`blocks.EDGES`, defaults to "crop". Padded images keep their original size.
+  :type edge: str, optional
+  :raises ValueError: If padding is requested for color images, which are always cropped.
+  :return: Summary with the number of compressed and failed images, the elapsed seconds, the throughput in images per second and the mean PSNR (of lossy images only) and SSIM.
+  :rtype: dict[str, float]
+  """
+  if subsampling is not None and edge != "crop":
+    raise ValueError("Color images can only be cropped!")
+  paths = find_images(input_dir)
+  output_dir.mkdir(parents=True, exist_ok=True)
+  done = 0
+  failed = 0
+  rows: list[dict[str, Any]] = []
+  start = perf_counter()
+  workers = workers or os.cpu_count() or 1
+  size = max(1, min(CHUNK_SIZE, math.ceil(len(paths) / (2 * workers)))) # Small enough chunks to keep every process busy until the end.
+  chunks = [paths[idx : idx + size] for idx in range(0, len(paths), size)] # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
+  with ProcessPoolExecutor(max_workers=workers, initializer=set_workers, initargs=(1,)) as executor: # Processes already use all CPUs, avoid oversubscribing them with threads.
+    futures = {executor.submit(compress_files, chunk, output_dir, F, d_thr, subsampling, edge): chunk for chunk in chunks}
+    with tqdm(total=len(paths), bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{rate_fmt}]', ncols=80, unit="img") as progress:
+      for future in as_completed(futures):
+        try:
+          results = future.result()
+        except Exception as exc: # The whole chunk failed, e.g. its process died.
+          results = [(path.name, None, str(exc)) for path in futures[future]]
+        for name, metrics, error in results:
+          if metrics is None:
+            failed += 1
+            progress.write(f"err {name}: {error}.")
+          else:
+            rows.append({"image": name, "F": F, "d": d_thr, **metrics})
+            done += 1
+        progress.update(len(results))
+  elapsed = perf_counter() - start
+  if report is not None:
+    write_report(report, rows)
+  lossy = [row["psnr"] for row in rows if math.isfinite(row["psnr"])]
+  return {
+    "images": done,
+    "failed": failed,
+    "seconds": elapsed,
+    "images_per_second": done / elapsed if elapsed > 0 else 0.0,
+    "mean_psnr": sum(lossy) / len(lossy) if lossy else math.inf,
+    "mean_ssim": sum(row["ssim"] for row in rows) / len(rows) if rows else math.nan
+  }
+
+def main(argv: Optional[list[str]] = None) -> None:
+  """
+  Non-interactive entry point to compress a directory of images.
+
+  :param argv: Command line arguments, defaults to the process arguments.
+  :type argv: Optional[list[str]], optional
+  """
+  parser = argparse.ArgumentParser(description="Compresses every image in a directory, as gray-scale or color, with JPEG compression type.")
+  parser.add_argument("input_dir", type=Path, help="Directory with the images to compress.")
+  parser.add_argument("output_dir", type=Path, help="Directory where to save the compressed images.")
+  parser.add_argument("F", type=int, help="Block size (≥ 2).")
+  parser.add_argument("d", type=int, help="Threshold (≥ 1).")
+  parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of processes, defaults to the number of CPUs.")
+  parser.add_argument("--report", type=Path, default=None, help="Path of a CSV report with the MSE, PSNR, SSIM and retained coefficients of each image.")
+  parser.add_argument("--color", choices=list(SUBSAMPLINGS), default=None, help="Compresses the images as color, in YCbCr with the given chroma subsampling, instead of gray-scale.")
+  parser.add_argument("--edge", choices=list(EDGES), default="crop", help="Handling of the trailing rows and columns that don't fill a whole block of gray-scale images: cropping them, or padding the last blocks so that the images keep their size. Color images are always cropped.")
+  args = parser.parse_args(argv)
+  if args.F < 2:
+    parser.error("F must be ≥ 2")
+  if args.d < 1:
+    parser.error("d must be ≥ 1")
+  if args.workers < 1:
+    parser.error("workers must be ≥ 1")
+  if not args.input_dir.is_dir():
+    parser.error(f"'{args.input_dir}' is not a directory")
+  if args.color is not None and args.edge != "crop":
+    parser.error("--edge is only supported for gray-scale images, color images are always cropped")
+  summary = batch_compress(args.input_dir, args.output_dir, args.F, args.d, args.workers, args.report, args.color, args.edge)
+  print(f"Compressed {summary['images']:.0f} images ({summary['failed']:.0f} failed) in {summary['seconds']:.2f}s: {summary['images_per_second']:.2f} img/s, {summary['mean_psnr']:.2f} dB mean PSNR, {summary['mean_ssim']:.4f} mean SSIM.")
+
+if __name__ == "__main__":
+  main()
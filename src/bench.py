@@ -0,0 +1,263 @@
+import os
+import sys
+import json
+import math
+import subprocess
+import platform
+import tracemalloc
+from pathlib import Path
+from itertools import product
+from datetime import datetime, timezone
+from time import perf_counter
+from timeit import repeat
+from typing import Any
+import numpy as np
+import scipy
+import pandas as pd
+from tqdm import tqdm
+from blocks import PRECISIONS, block_mask, blockwise_dct, blockwise_idct, get_precision, get_workers, pack, packed_idct, resolve_method, unblock
+from pipeline import crop, jpeg_pipeline_steps, packed_visual, to_visual
+
+KEYS = ["size", "F", "d"]
+"""
+Columns identifying a configuration of the pipeline benchmark.
+"""
+
+METRICS = ["crop", "dct", "mask", "idct", "visual", "total", "peak_mib"]
+"""
+Columns of the pipeline benchmark where higher is worse: seconds of each stage and of the whole pipeline, and peak memory in MiB.
+"""
+
+def default_workers() -> list[int]:
+  """
+  Lists the thread counts to benchmark: powers of two up to the number of CPUs, plus the number of CPUs itself.
+
+  :return: Thread counts.
+  :rtype: list[int]
+  """
+  cpus = os.cpu_count() or 1
+  return sorted({2**i for i in range(cpus.bit_length()) if 2**i <= cpus} | {cpus})
+
+def benchmark_scaling(size: int = 4096, F: int = 8, d_thr: int = 10, workers: list[int] | None = None) -> pd.DataFrame:
+  """
+  Measures how the blockwise DCT2, mask and IDCT2 of a size×size image scale with the number of threads.
+
+  :param size: Image side length, defaults to 4096.
+  :type size: int, optional
+  :param F: Block size, defaults to 8.
+  :type F: int, optional
+  :param d_thr: Threshold, defaults to 10.
+  :type d_thr: int, optional
+  :param workers: Thread counts, defaults to :func:`default_workers`.
+  :type workers: list[int] | None, optional
+  :return: DataFrame with execution times and speedups over one thread.
+  :rtype: pd.DataFrame
+  """
+  img = np.random.default_rng(42).integers(0, 256, size=(size - size % F, size - size % F)).astype(np.uint8)
+  mask = block_mask(F, d_thr)
+  rows: list[dict[str, float]] = []
+  for count in tqdm(workers or default_workers(), bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt}', ncols=80):
+    seconds = min(repeat(lambda count=count: blockwise_idct(blockwise_dct(img, F, count) * mask, count), repeat=3, number=1))
+    rows.append({"workers": count, "seconds": seconds, "megapixels_per_second": img.size / seconds / 1e6})
+  df = pd.DataFrame(rows).set_index("workers")
+  df["speedup"] = df["seconds"].iloc[0] / df["seconds"]
+  return df
+
+def benchmark_methods(size: int = 2048, Fs: list[int] = [2, 4, 8, 16, 32, 64, 128]) -> pd.DataFrame:
+  """
+  Compares the SciPy and matrix block transform backends (blockwise DCT2 followed by IDCT2) on a size×size image, to locate the block size where one overtakes the other.
+
+  :param size: Image side length, defaults to 2048.
+  :type size: int, optional
+  :param Fs: Block sizes, defaults to [2, 4, 8, 16, 32, 64, 128].
+  :type Fs: list[int], optional
+  :return: DataFrame indexed by block size with the seconds of each backend, the faster one and the one picked by the 'auto' method.
+  :rtype: pd.DataFrame
+  """
+  rng = np.random.default_rng(42)
+  rows: list[dict[str, Any]] = []
+  for F in tqdm(Fs, bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt}', ncols=80):
+    img = rng.integers(0, 256, size=(size - size % F, size - size % F)).astype(np.uint8)
+    row: dict[str, Any] = {"F": F}
+    for method in ("scipy", "matrix"):
+      row[method] = min(repeat(lambda F=F, method=method: blockwise_idct(blockwise_dct(img, F, method=method), method=method), repeat=3, number=1))
+    row["faster"] = "matrix" if row["matrix"] < row["scipy"] else "scipy"
+    row["auto"] = resolve_method(F)
+    rows.append(row)
+  return pd.DataFrame(rows).set_index("F")
+
+def benchmark_precisions(size: int = 4096, F: int = 8, d_thr: int = 10) -> pd.DataFrame:
+  """
+  Compares the floating point precisions of the block transforms on the blockwise DCT2, mask and IDCT2 of a size×size image, measuring speed, peak memory and how far the reconstruction drifts from the double precision one.
+
+  :param size: Image side length, defaults to 4096.
+  :type size: int, optional
+  :param F: Block size, defaults to 8.
+  :type F: int, optional
+  :param d_thr: Threshold, defaults to 10.
+  :type d_thr: int, optional
+  :return: DataFrame indexed by precision with seconds, throughput in megapixels per second, peak MiB, largest pixel difference from double precision and fraction of differing pixels.
+  :rtype: pd.DataFrame
+  """
+  img = np.random.default_rng(42).integers(0, 256, size=(size - size % F, size - size % F)).astype(np.uint8)
+  mask = block_mask(F, d_thr)
+  def compress(precision: str) -> np.typing.NDArray[Any]:
+    coeffs = blockwise_dct(img, F, precision=precision)
+    coeffs *= mask
+    return blockwise_idct(coeffs)
+  reference = compress("float64")
+  rows: list[dict[str, Any]] = []
+  for precision in tqdm(PRECISIONS, bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt}', ncols=80):
+    seconds = min(repeat(lambda precision=precision: compress(precision), repeat=3, number=1))
+    tracemalloc.start()
+    rec = compress(precision)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    error = np.abs(rec - reference)
+    rows.append({"precision": precision, "seconds": seconds, "megapixels_per_second": img.size / seconds / 1e6, "peak_mib": peak / 2**20, "max_error": float(error.max()), "differing": float(np.count_nonzero(error) / error.size)})
+  return pd.DataFrame(rows).set_index("precision")
+
+STARTUP_MODULES = ["engine", "dct", "pipeline", "batch", "app"]
+"""
+Modules whose cold import time is measured by :func:`benchmark_startup`: the engine, and what its 'dct', compression, 'batch' and 'cmp' commands import when run.
+"""
+
+def benchmark_startup(repeats: int = 5, modules: list[str] = STARTUP_MODULES) -> pd.DataFrame:
+  """
+  Measures the cold start latency of the engine, from launching the interpreter to exiting right after printing its identifier, and the cold import time of the modules loaded by its commands, each in a fresh interpreter.
+  The interpreter startup alone is measured too, so that the overhead of the project can be told apart.
+
+  :param repeats: Number of runs of each measure, of which the fastest is kept, defaults to 5.
+  :type repeats: int, optional
+  :param modules: Modules to import, defaults to :data:`STARTUP_MODULES`.
+  :type modules: list[str], optional
+  :return: DataFrame with the seconds of each measure and their overhead over the bare interpreter, NaN for modules that can't be imported (such as the application without Tk or a display).
+  :rtype: pd.DataFrame
+  """
+  src = Path(__file__).resolve().parent
+  def run(arguments: list[str], stdin: str = "") -> float:
+    best = math.inf
+    for _ in range(repeats):
+      start = perf_counter()
+      completed = subprocess.run([sys.executable, *arguments], input=stdin, capture_output=True, text=True, cwd=src, check=False)
+      if completed.returncode != 0:
+        return math.nan
+      best = min(best, perf_counter() - start)
+    return best
+  rows = [{"target": "python", "seconds": run(["-c", "pass"])}, {"target": "engine start", "seconds": run([str(src / "engine.py")], "exit\n")}]
+  rows += [{"target": f"import {module}", "seconds": run(["-c", f"import {module}"])} for module in modules]
+  df = pd.DataFrame(rows).set_index("target")
+  df["overhead"] = df["seconds"] - df.loc["python", "seconds"]
+  return df
+
+def environment() -> dict[str, Any]:
+  """
+  Describes the environment the benchmarks run in, so that saved results can be told apart.
+
+  :return: Timestamp, platform, Python, NumPy and SciPy versions, number of CPUs, threads and precision used by the block transforms.
+  :rtype: dict[str, Any]
+  """
+  return {
+    "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    "platform": platform.platform(),
+    "processor": platform.processor() or platform.machine(),
+    "python": sys.version.split()[0],
+    "numpy": np.__version__,
+    "scipy": scipy.__version__,
+    "cpus": os.cpu_count() or 1,
+    "workers": get_workers(),
+    "precision": get_precision()
+  }
+
+def benchmark_pipeline(sizes: list[int] = [512, 1024, 2048], Fs: list[int] = [8, 16, 32], ds: list[int] = [4, 10], repeats: int = 3) -> pd.DataFrame:
+  """
+  Times each stage of the block pipeline (crop, DCT2, mask packing the kept coefficients, IDCT2 and visualization of the coefficients) and measures the peak memory of a whole compression, for every combination of image size, block size and threshold.
+
+  :param sizes: Square image side lengths, defaults to [512, 1024, 2048].
+  :type sizes: list[int], optional
+  :param Fs: Block sizes, defaults to [8, 16, 32].
+  :type Fs: list[int], optional
+  :param ds: Thresholds, defaults to [4, 10].
+  :type ds: list[int], optional
+  :param repeats: Runs of each stage, keeping the fastest, defaults to 3.
+  :type repeats: int, optional
+  :return: DataFrame with one row per configuration, with the seconds of each stage, the throughput in megapixels per second and the peak memory in MiB.
+  :rtype: pd.DataFrame
+  """
+  rng = np.random.default_rng(42)
+  rows: list[dict[str, float]] = []
+  for size, F, d_thr in tqdm(list(product(sizes, Fs, ds)), bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt}', ncols=80):
+    img = rng.integers(0, 256, size=(size, size)).astype(np.uint8)
+    cropped, _, _ = crop(img, F)
+    coeffs = blockwise_dct(cropped, F)
+    packed = pack(coeffs, d_thr)
+    row: dict[str, float] = {"size": size, "F": F, "d": d_thr}
+    row["crop"] = min(repeat(lambda: crop(img, F), repeat=repeats, number=1))
+    row["dct"] = min(repeat(lambda: blockwise_dct(cropped, F), repeat=repeats, number=1))
+    row["mask"] = min(repeat(lambda: pack(coeffs, d_thr), repeat=repeats, number=1))
+    row["idct"] = min(repeat(lambda: packed_idct(packed, F, d_thr), repeat=repeats, number=1))
+    row["visual"] = min(repeat(lambda: (to_visual(unblock(coeffs)), packed_visual(packed, F, d_thr)), repeat=repeats, number=1))
+    row["total"] = min(repeat(lambda: jpeg_pipeline_steps(img, F, d_thr, cached=False), repeat=repeats, number=1))
+    row["megapixels_per_second"] = cropped.size / row["total"] / 1e6
+    tracemalloc.start()
+    jpeg_pipeline_steps(img, F, d_thr, cached=False)
+    row["peak_mib"] = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    rows.append(row)
+  return pd.DataFrame(rows)
+
+def save_results(df: pd.DataFrame, path: Path) -> None:
+  """
+  Saves benchmark results along with the environment metadata, as JSON or, if the path ends with .csv, as CSV with the metadata in leading '#' comment lines.
+
+  :param df: Benchmark results.
+  :type df: pd.DataFrame
+  :param path: Path of the results file.
+  :type path: Path
+  """
+  if path.suffix.lower() == ".csv":
+    with open(path, "w", encoding="utf-8", newline="") as file:
+      file.writelines(f"# {key}: {value}\n" for key, value in environment().items())
+      df.to_csv(file, index=False)
+  else:
+    path.write_text(json.dumps({"environment": environment(), "results": df.to_dict(orient="records")}, indent=2), encoding="utf-8")
+
+def load_results(path: Path) -> pd.DataFrame:
+  """
+  Loads benchmark results saved by :func:`save_results`.
+
+  :param path: Path of the results file.
+  :type path: Path
+  :return: Benchmark results.
+  :rtype: pd.DataFrame
+  """
+  if path.suffix.lower() == ".csv":
+    return pd.read_csv(path, comment="#")
+  return pd.DataFrame(json.loads(path.read_text(encoding="utf-8"))["results"])
+
+def compare(baseline: pd.DataFrame, current: pd.DataFrame, tolerance: float = 0.1, min_seconds: float = 1e-4) -> pd.DataFrame:
+  """
+  Compares benchmark results against a baseline, flagging the configurations where any stage time or the peak memory grew by more than the tolerance.
+  Stages faster than min_seconds in the baseline are too noisy to compare and are skipped.
+
+  :param baseline: Baseline benchmark results.
+  :type baseline: pd.DataFrame
+  :param current: Current benchmark results.
+  :type current: pd.DataFrame
+  :param tolerance: Allowed relative growth, defaults to 0.1 (10%).
+  :type tolerance: float, optional
+  :param min_seconds: Minimum baseline time of a stage to compare it, defaults to 1e-4.
+  :type min_seconds: float, optional
+  :return: DataFrame indexed by the configurations found in both results, with the current/baseline ratio of each metric, the worst metric and whether it is a regression.
+  :rtype: pd.DataFrame
+  """
+  merged = baseline.merge(current, on=KEYS, suffixes=("_baseline", "_current"))
+  metrics = [metric for metric in METRICS if f"{metric}_baseline" in merged and f"{metric}_current" in merged]
+  ratios = pd.DataFrame({metric: merged[f"{metric}_current"] / merged[f"{metric}_baseline"] for metric in metrics})
+  for metric in metrics:
+    if metric != "peak_mib":
+      ratios.loc[merged[f"{metric}_baseline"] < min_seconds, metric] = np.nan
+  ratios.index = pd.MultiIndex.from_frame(merged[KEYS])
+  ratios["worst"] = ratios[metrics].fillna(0).idxmax(axis=1)
+  ratios["regression"] = ratios[metrics].max(axis=1) > 1 + tolerance
+  return ratios
@@ -0,0 +1,349 @@
+from typing import Any, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy.fft import dctn, idctn
+from dct import compute_dct_matrix
+
+MATRIX_MIN_F = 4
+"""
+Smallest block size for which the 'auto' method picks the matrix backend, see :func:`bench.benchmark_methods`.
+"""
+
+MATRIX_MAX_F = 32
+"""
+Largest block size for which the 'auto' method picks the matrix backend, see :func:`bench.benchmark_methods`.
+"""
+
+BASIS_MAX_F = 16
+"""
+Largest block size whose packed coefficients are reconstructed with a single product by the IDCT2 basis images, see :func:`packed_idct`.
+"""
+
+METHODS = ("auto", "scipy", "matrix")
+"""
+Available block transform backends: SciPy's FFT-based DCT2, batched products with the cached DCT2 matrix, or the fastest of the two for the block size.
+"""
+
+PRECISIONS = ("float32", "float64")
+"""
+Available floating point precisions of the block transforms. Single precision halves memory traffic and is accurate enough for 8-bit images, whose reconstructions match double precision ones but for rare off-by-one roundings.
+"""
+
+EDGES = {"crop": None, "replicate": "edge", "reflect": "symmetric", "zero": "constant"}
+"""
+Available handlings of the trailing rows and columns that don't fill a whole block, with the matching NumPy padding mode: cropping them, or padding the last blocks by replicating the border pixels, mirroring the image across its border or with 0s.
+"""
+
+_workers: int = 1
+
+_precision: str = "float32"
+
+def get_workers() -> int:
+  """
+  Returns the default number of threads used by the block transforms.
+
+  :return: Number of threads.
+  :rtype: int
+  """
+  return _workers
+
+def set_workers(workers: int) -> None:
+  """
+  Sets the default number of threads used by the block transforms.
+
+  :param workers: Number of threads, at least 1.
+  :type workers: int
+  :raises ValueError: If workers is less than 1.
+  """
+  global _workers # pylint: disable=global-statement
+  if workers < 1:
+    raise ValueError("Workers must be ≥ 1!")
+  _workers = workers
+
+def get_precision() -> str:
+  """
+  Returns the default floating point precision of the block transforms.
+
+  :return: One of :data:`PRECISIONS`.
+  :rtype: str
+  """
+  return _precision
+
+def set_precision(precision: str) -> None:
+  """
+  Sets the default floating point precision of the block transforms.
+
+  :param precision: One of :data:`PRECISIONS`.
+  :type precision: str
+  :raises ValueError: If the precision is unknown.
+  """
+  global _precision # pylint: disable=global-statement
+  if precision not in PRECISIONS:
+    raise ValueError(f"Precision must be one of {', '.join(PRECISIONS)}!")
+  _precision = precision
+
+def resolve_method(F: int, method: str = "auto") -> str:
+  """
+  Resolves the block transform backend to use for a block size.
+  Batched products D @ X @ Dᵀ with the cached F×F DCT2 matrix beat FFT-based transforms for small blocks, where the FFT overhead dominates.
+
+  :param F: Block side length.
+  :type F: int
+  :param method: One of :data:`METHODS`, defaults to "auto".
+  :type method: str, optional
+  :raises ValueError: If the method is unknown.
+  :return: Either "scipy" or "matrix".
+  :rtype: str
+  """
+  if method not in METHODS:
+    raise ValueError(f"Method must be one of {', '.join(METHODS)}!")
+  if method == "auto":
+    return "matrix" if MATRIX_MIN_F <= F <= MATRIX_MAX_F else "scipy"
+  return method
+
+def _in_bands(transform: Callable[[np.typing.NDArray[Any]], np.typing.NDArray[Any]], blocks: np.typing.NDArray[Any], workers: Optional[int], F: Optional[int] = None) -> np.typing.NDArray[Any]:
+  """
+  Applies a transform to bands of block rows concurrently, since SciPy and NumPy release the GIL while transforming.
+
+  :param transform: Transform of a (..., rows, W/F, F, F) array of blocks, or of a (..., rows, W/F, K) array of packed blocks, returning a (..., rows, W/F, F, F) array.
+  :type transform: Callable[[np.typing.NDArray[Any]], np.typing.NDArray[Any]]
+  :param blocks: (..., H/F, W/F, F, F) array of blocks, or (..., H/F, W/F, K) array of packed blocks.
+  :type blocks: np.typing.NDArray[Any]
+  :param workers: Number of threads, defaults to :func:`get_workers`.
+  :type workers: Optional[int]
+  :param F: Block side length of packed blocks, defaults to None for blocks that aren't packed.
+  :type F: Optional[int], optional
+  :return: Transformed blocks.
+  :rtype: np.typing.NDArray[Any]
+  """
+  axis = -4 if F is None else -3
+  workers = min(workers or _workers, blocks.shape[axis])
+  if workers <= 1:
+    return transform(blocks)
+  out = np.empty(blocks.shape if F is None else blocks.shape[:-1] + (F, F), dtype=blocks.dtype)
+  bounds = np.linspace(0, blocks.shape[axis], workers + 1).astype(int)
+  def run(start: int, stop: int) -> None:
+    out[..., start:stop, :, :, :] = transform(blocks[(Ellipsis, slice(start, stop)) + (slice(None),) * (-axis - 1)])
+  with ThreadPoolExecutor(workers) as executor:
+    list(executor.map(run, bounds[:-1], bounds[1:]))
+  return out
+
+def block_view(img: np.typing.NDArray[Any], F: int) -> np.typing.NDArray[Any]:
+  """
+  Returns a (H/F, W/F, F, F) view of an image whose sides are multiples of F, without copying any data.
+
+  :param img: Image with sides divisible by F.
+  :type img: np.typing.NDArray[Any]
+  :param F: Block side length.
+  :type F: int
+  :return: View of the image where the first two axes index the blocks and the last two index the pixels within a block.
+  :rtype: np.typing.NDArray[Any]
+  """
+  h, w = img.shape
+  return img.reshape(h // F, F, w // F, F).swapaxes(1, 2)
+
+def unblock(blocks: np.typing.NDArray[Any]) -> np.typing.NDArray[Any]:
+  """
+  Reassembles a (H/F, W/F, F, F) array of blocks into an H×W image.
+
+  :param blocks: Array of blocks.
+  :type blocks: np.typing.NDArray[Any]
+  :return: Image made of the given blocks.
+  :rtype: np.typing.NDArray[Any]
+  """
+  bh, bw, F, _ = blocks.shape
+  return blocks.swapaxes(1, 2).reshape(bh * F, bw * F)
+
+def block_mask(F: int, d_thr: int) -> np.typing.NDArray[np.bool_]:
+  """
+  Builds the F×F mask of the coefficients to keep, that is those with k+ℓ < d_thr.
+
+  :param F: Block side length.
+  :type F: int
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :return: F×F boolean mask.
+  :rtype: np.typing.NDArray[np.bool_]
+  """
+  k_idx, l_idx = np.meshgrid(np.arange(F), np.arange(F), indexing="ij")
+  return (k_idx + l_idx) < d_thr
+
+def zigzag_indices(F: int, d_thr: int) -> tuple[np.typing.NDArray[np.intp], np.typing.NDArray[np.intp]]:
+  """
+  Lists the (k, ℓ) positions of the coefficients kept by the mask k+ℓ < d_thr in JPEG zig-zag order, so that low frequencies come first.
+
+  :param F: Block side length.
+  :type F: int
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :return: Row and column indices of the kept coefficients.
+  :rtype: tuple[np.typing.NDArray[np.intp], np.typing.NDArray[np.intp]]
+  """
+  k_idx, l_idx = np.nonzero(block_mask(F, d_thr))
+  diagonal = k_idx + l_idx
+  order = np.lexsort((np.where(diagonal % 2 == 1, k_idx, -k_idx), diagonal)) # Odd diagonals go down-left, even ones go up-right.
+  return k_idx[order], l_idx[order]
+
+def pack(coeffs: np.typing.NDArray[Any], d_thr: int) -> np.typing.NDArray[Any]:
+  """
+  Packs the coefficients kept by the mask k+ℓ < d_thr, at most d(d+1)/2 per block, in zig-zag order, dropping the masked ones instead of storing them as 0s.
+
+  :param coeffs: (..., H/F, W/F, F, F) array of DCT2 coefficients.
+  :type coeffs: np.typing.NDArray[Any]
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :return: Contiguous (..., H/F, W/F, K) array with the K kept coefficients of each block, so that its (n_blocks, K) reshape is free.
+  :rtype: np.typing.NDArray[Any]
+  """
+  F = coeffs.shape[-1]
+  k_idx, l_idx = zigzag_indices(F, d_thr)
+  return np.take(coeffs.reshape(coeffs.shape[:-2] + (F * F,)), k_idx * F + l_idx, axis=-1) # Faster than indexing both axes.
+
+def unpack(packed: np.typing.NDArray[Any], F: int, d_thr: int, side: Optional[int] = None) -> np.typing.NDArray[Any]:
+  """
+  Undoes :func:`pack`, filling the masked coefficients with 0s.
+  Each coefficient of the blocks is gathered from the packed ones or from an appended 0, which is much faster than scattering the packed coefficients into the blocks.
+
+  :param packed: (..., H/F, W/F, K) array of packed coefficients.
+  :type packed: np.typing.NDArray[Any]
+  :param F: Block side length.
+  :type F: int
+  :param d_thr: Threshold the coefficients were packed with.
+  :type d_thr: int
+  :param side: Side length of the top-left corner of the blocks to unpack, defaults to None for whole blocks.
+  :type side: Optional[int], optional
+  :return: (..., H/F, W/F, side, side) array of blocks, or of their corners.
+  :rtype: np.typing.NDArray[Any]
+  """
+  side = side or F
+  k_idx, l_idx = zigzag_indices(F, d_thr)
+  inside = (k_idx < side) & (l_idx < side)
+  sources = np.full(side * side, len(k_idx))
+  sources[k_idx[inside] * side + l_idx[inside]] = np.flatnonzero(inside)
+  zeros = np.zeros(packed.shape[:-1] + (1,), dtype=packed.dtype)
+  return np.take(np.concatenate((packed, zeros), axis=-1), sources, axis=-1).reshape(packed.shape[:-1] + (side, side))
+
+def padded_blocks(img: np.typing.NDArray[Any], F: int, edge: str, dtype: Any) -> np.typing.NDArray[Any]:
+  """
+  Copies an image into a (⌈H/F⌉, ⌈W/F⌉, F, F) array of blocks, padding the partial blocks along the bottom and right borders.
+  Whole blocks are copied straight from a view of the image, only the strips of partial blocks are padded, so an image with sides divisible by F costs a single copy.
+
+  :param img: Image to split in blocks.
+  :type img: np.typing.NDArray[Any]
+  :param F: Block side length.
+  :type F: int
+  :param edge: Padding of the partial blocks, one of :data:`EDGES` but "crop".
+  :type edge: str
+  :param dtype: Type of the blocks.
+  :type dtype: Any
+  :return: Array of blocks.
+  :rtype: np.typing.NDArray[Any]
+  """
+  h, w = img.shape
+  bh, bw = -(-h // F), -(-w // F)
+  h0, w0 = h - h % F, w - w % F
+  pad = ((0, bh * F - h), (0, bw * F - w))
+  blocks = np.empty((bh, bw, F, F), dtype=dtype)
+  blocks[: h0 // F, : w0 // F] = block_view(img[:h0, :w0], F) # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
+  # Each strip keeps a whole block of context, which reflections mirror.
+  if h0 < h:
+    strip = np.pad(img[max(h0 - F, 0) :], pad, mode=EDGES[edge]) # type: ignore # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
+    blocks[-1] = block_view(strip[-F:], F)[0]
+  if w0 < w:
+    strip = np.pad(img[:, max(w0 - F, 0) :], pad, mode=EDGES[edge]) # type: ignore # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
+    blocks[:, -1] = block_view(strip[:, -F:], F)[:, 0]
+  return blocks
+
+def blockwise_dct(img: np.typing.NDArray[Any], F: int, workers: Optional[int] = None, method: str = "auto", precision: Optional[str] = None, edge: str = "crop") -> np.typing.NDArray[Any]:
+  """
+  Applies the DCT2 to every F×F block of the image, level-shifted by -128, in a single batched call per band of block rows.
+
+  :param img: Image, with sides divisible by F unless it is padded.
+  :type img: np.typing.NDArray[Any]
+  :param F: Block side length.
+  :type F: int
+  :param workers: Number of threads transforming bands of block rows concurrently, defaults to :func:`get_workers`.
+  :type workers: Optional[int], optional
+  :param method: Transform backend, one of :data:`METHODS`, defaults to "auto".
+  :type method: str, optional
+  :param precision: Floating point precision, one of :data:`PRECISIONS`, defaults to :func:`get_precision`.
+  :type precision: Optional[str], optional
+  :param edge: Padding of the partial blocks, one of :data:`EDGES`, defaults to "crop" for images whose sides are already divisible by F.
+  :type edge: str, optional
+  :return: (⌈H/F⌉, ⌈W/F⌉, F, F) array with the DCT2 coefficients of each block, in the given precision.
+  :rtype: np.typing.NDArray[Any]
+  """
+  if edge == "crop":
+    blocks = block_view(img, F).astype(precision or _precision, order="C") # The only copy, straight from 8-bit pixels to the working precision.
+  else:
+    blocks = padded_blocks(img, F, edge, precision or _precision)
+  blocks -= 128
+  if resolve_method(F, method) == "matrix":
+    D = compute_dct_matrix(F).astype(blocks.dtype, copy=False)
+    return _in_bands(lambda band: D @ band @ D.T, blocks, workers)
+  return _in_bands(lambda band: dctn(band, axes=(-2, -1), norm="ortho", overwrite_x=True), blocks, workers) # type: ignore
+
+def blockwise_idct(coeffs: np.typing.NDArray[Any], workers: Optional[int] = None, method: str = "auto") -> np.typing.NDArray[Any]:
+  """
+  Applies the IDCT2 to every block of coefficients in a single batched call, undoing the level shift and rounding and clipping to 0-255.
+  Any leading axes are treated as a batch, so several masked versions of the same blocks can be reconstructed at once.
+  The IDCT2 runs in the precision of the coefficients.
+
+  :param coeffs: (..., H/F, W/F, F, F) array of DCT2 coefficients.
+  :type coeffs: np.typing.NDArray[Any]
+  :param workers: Number of threads transforming bands of block rows concurrently, defaults to :func:`get_workers`.
+  :type workers: Optional[int], optional
+  :param method: Transform backend, one of :data:`METHODS`, defaults to "auto".
+  :type method: str, optional
+  :return: (..., H/F, W/F, F, F) array of reconstructed pixel values, in the precision of the coefficients.
+  :rtype: np.typing.NDArray[Any]
+  """
+  F = coeffs.shape[-1]
+  D = compute_dct_matrix(F).astype(coeffs.dtype, copy=False) if resolve_method(F, method) == "matrix" else None
+  def transform(band: np.typing.NDArray[Any]) -> np.typing.NDArray[Any]:
+    rec: np.typing.NDArray[Any] = idctn(band, axes=(-2, -1), norm="ortho") if D is None else D.T @ band @ D # type: ignore
+    rec += 128
+    np.round(rec, out=rec)
+    return np.clip(rec, 0, 255, out=rec)
+  return _in_bands(transform, coeffs, workers)
+
+def packed_idct(packed: np.typing.NDArray[Any], F: int, d_thr: int, workers: Optional[int] = None, method: str = "auto") -> np.typing.NDArray[Any]:
+  """
+  Applies the IDCT2 straight to packed coefficients, like :func:`blockwise_idct` does to the masked blocks, so that the work scales with the kept coefficients rather than with the F×F blocks.
+  With the matrix backend, blocks up to :data:`BASIS_MAX_F` wide are reconstructed by a single (n_blocks, K) @ (K, F²) product with the IDCT2 basis image of each kept coefficient. Larger blocks only multiply their top-left m×m corner, with m = min(d, F), where all the kept coefficients lie, by the first m rows of the DCT2 matrix, Dₘᵀ @ C @ Dₘ.
+  The 'auto' method picks the matrix backend whenever the corner is at most :data:`MATRIX_MAX_F` wide, otherwise SciPy's IDCT2 of the unpacked blocks.
+
+  :param packed: (..., H/F, W/F, K) array of coefficients packed by :func:`pack`.
+  :type packed: np.typing.NDArray[Any]
+  :param F: Block side length.
+  :type F: int
+  :param d_thr: Threshold the coefficients were packed with.
+  :type d_thr: int
+  :param workers: Number of threads transforming bands of block rows concurrently, defaults to :func:`get_workers`.
+  :type workers: Optional[int], optional
+  :param method: Transform backend, one of :data:`METHODS`, defaults to "auto".
+  :type method: str, optional
+  :return: (..., H/F, W/F, F, F) array of reconstructed pixel values, in the precision of the coefficients.
+  :rtype: np.typing.NDArray[Any]
+  """
+  m = min(d_thr, F)
+  if method == "auto":
+    method = "matrix" if m <= MATRIX_MAX_F else "scipy"
+  if resolve_method(F, method) == "scipy" or (F > BASIS_MAX_F and m == F):
+    return blockwise_idct(unpack(packed, F, d_thr), workers, method) # Nothing to skip.
+  D = compute_dct_matrix(F).astype(packed.dtype)
+  if F <= BASIS_MAX_F:
+    k_idx, l_idx = zigzag_indices(F, d_thr)
+    basis = (D[k_idx, :, None] * D[l_idx, None, :]).reshape(len(k_idx), F * F)
+    def product(band: np.typing.NDArray[Any]) -> np.typing.NDArray[Any]:
+      return (band.reshape(-1, band.shape[-1]) @ basis).reshape(band.shape[:-1] + (F, F))
+  else:
+    corner = D[:m]
+    def product(band: np.typing.NDArray[Any]) -> np.typing.NDArray[Any]:
+      return corner.T @ unpack(band, F, d_thr, m) @ corner
+  def transform(band: np.typing.NDArray[Any]) -> np.typing.NDArray[Any]:
+    rec = product(band)
+    rec += 128
+    np.round(rec, out=rec)
+    return np.clip(rec, 0, 255, out=rec)
+  return _in_bands(transform, packed, workers, F)
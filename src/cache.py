@@ -0,0 +1,139 @@
+import hashlib
+from threading import Lock
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+import numpy as np
+
+class LRUCache:
+  """
+  Thread-safe cache of arrays bounded by their total size in bytes, evicting the least recently used arrays first.
+  """
+  def __init__(self, budget: int) -> None:
+    """
+    :param budget: Maximum number of bytes held by the cached arrays.
+    :type budget: int
+    """
+    self._entries: OrderedDict[Hashable, np.typing.NDArray[Any]] = OrderedDict()
+    self._lock = Lock()
+    self._budget = budget
+    self.nbytes: int = 0
+    """
+    Number of bytes currently held by the cached arrays.
+    """
+    self.hits: int = 0
+    """
+    Number of lookups that found their array.
+    """
+    self.misses: int = 0
+    """
+    Number of lookups that didn't find their array.
+    """
+
+  @property
+  def budget(self) -> int:
+    """
+    Maximum number of bytes held by the cached arrays. Lowering it immediately evicts arrays until they fit.
+    """
+    return self._budget
+
+  @budget.setter
+  def budget(self, budget: int) -> None:
+    with self._lock:
+      self._budget = budget
+      self._evict()
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+  def __contains__(self, key: Hashable) -> bool:
+    return key in self._entries
+
+  def get(self, key: Hashable) -> Optional[np.typing.NDArray[Any]]:
+    """
+    Looks up an array, marking it as the most recently used.
+
+    :param key: Key of the array.
+    :type key: Hashable
+    :return: Cached array, or None if missing.
+    :rtype: Optional[np.typing.NDArray[Any]]
+    """
+    with self._lock:
+      value = self._entries.get(key)
+      if value is None:
+        self.misses += 1
+      else:
+        self.hits += 1
+        self._entries.move_to_end(key)
+      return value
+
+  def put(self, key: Hashable, value: np.typing.NDArray[Any]) -> np.typing.NDArray[Any]:
+    """
+    Caches an array, making it read-only so that callers can't alter the cached copy. Arrays larger than the whole budget are not cached.
+
+    :param key: Key of the array.
+    :type key: Hashable
+    :param value: Array to cache.
+    :type value: np.typing.NDArray[Any]
+    :return: The given array, now read-only.
+    :rtype: np.typing.NDArray[Any]
+    """
+    value.flags.writeable = False
+    with self._lock:
+      if value.nbytes <= self._budget:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+          self.nbytes -= previous.nbytes
+        self._entries[key] = value
+        self.nbytes += value.nbytes
+        self._evict()
+    return value
+
+  def get_or_compute(self, key: Hashable, compute: Callable[[], np.typing.NDArray[Any]]) -> np.typing.NDArray[Any]:
+    """
+    Looks up an array, computing and caching it if missing.
+
+    :param key: Key of the array.
+    :type key: Hashable
+    :param compute: Function computing the array.
+    :type compute: Callable[[], np.typing.NDArray[Any]]
+    :return: Cached or freshly computed read-only array.
+    :rtype: np.typing.NDArray[Any]
+    """
+    value = self.get(key)
+    return self.put(key, compute()) if value is None else value
+
+  def clear(self) -> None:
+    """
+    Empties the cache and resets its statistics.
+    """
+    with self._lock:
+      self._entries.clear()
+      self.nbytes = 0
+      self.hits = 0
+      self.misses = 0
+
+  def _evict(self) -> None:
+    """
+    Evicts the least recently used arrays until they fit in the budget. The lock must already be held.
+    """
+    while self.nbytes > self._budget:
+      _, value = self._entries.popitem(last=False)
+      self.nbytes -= value.nbytes
+
+def image_digest(img: np.typing.NDArray[Any]) -> str:
+  """
+  Computes a digest of an image content, shape and type, to be used as a cache key.
+
+  :param img: Image.
+  :type img: np.typing.NDArray[Any]
+  :return: Hexadecimal digest.
+  :rtype: str
+  """
+  digest = hashlib.blake2b(f"{img.shape}{img.dtype}".encode(), digest_size=16)
+  digest.update(np.ascontiguousarray(img).data)
+  return digest.hexdigest()
+
+CACHE = LRUCache(512 * 2**20)
+"""
+Shared cache for DCT2 matrices, keyed by ("dct_matrix", N), blockwise DCT2 coefficients, keyed by ("block_dct", image digest, F, precision, edge handling), the coefficients kept by a threshold, packed and keyed by ("packed", image digest, F, precision, d), lazily built pipeline steps, keyed by ("step", image digest, F, precision, [d,] step index), and their downsampled display levels, keyed by ("display", image digest, F, precision, [d,] step index, factor). Defaults to a 512 MiB budget.
+"""
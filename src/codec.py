@@ -0,0 +1,220 @@
+import zlib
+import struct
+from pathlib import Path
+from typing import Any
+import numpy as np
+from blocks import get_precision, pack, packed_idct, unblock, zigzag_indices
+from pipeline import block_coefficients
+from profiling import stage, count
+
+MAGIC = b"GDCT"
+"""
+Signature at the start of every compressed file.
+"""
+
+VERSION = 1
+"""
+Version of the compressed file format.
+"""
+
+HEADER = struct.Struct("<4s B I I H H f B")
+"""
+Compressed file header: magic, version, height, width, F, d, quantization step and level type (0 for int16, 1 for int32).
+"""
+
+LENGTH = struct.Struct("<I")
+"""
+Length prefix of each entropy-coded stream.
+"""
+
+def _run_lengths(levels: np.typing.NDArray[Any]) -> tuple[np.typing.NDArray[np.uint16], np.typing.NDArray[np.uint16], np.typing.NDArray[Any]]:
+  """
+  Run-length codes the quantized coefficients of each block as (zero run, level) pairs, dropping trailing zeros.
+
+  :param levels: (n_blocks, K) array of quantized coefficients in zig-zag order.
+  :type levels: np.typing.NDArray[Any]
+  :return: Number of pairs of each block, zero run before each nonzero level and the nonzero levels.
+  :rtype: tuple[np.typing.NDArray[np.uint16], np.typing.NDArray[np.uint16], np.typing.NDArray[Any]]
+  """
+  n_blocks, K = levels.shape
+  flat = np.flatnonzero(levels)
+  block, position = np.divmod(flat, K)
+  previous = np.empty_like(position)
+  previous[0:1] = -1
+  previous[1:] = np.where(block[1:] == block[:-1], position[:-1], -1)
+  counts = np.bincount(block, minlength=n_blocks).astype(np.uint16)
+  return counts, (position - previous - 1).astype(np.uint16), levels.reshape(-1)[flat]
+
+def _expand_runs(counts: np.typing.NDArray[Any], runs: np.typing.NDArray[Any], values: np.typing.NDArray[Any], K: int) -> np.typing.NDArray[Any]:
+  """
+  Undoes the run-length coding of :func:`_run_lengths`.
+
+  :param counts: Number of pairs of each block.
+  :type counts: np.typing.NDArray[Any]
+  :param runs: Zero run before each nonzero level.
+  :type runs: np.typing.NDArray[Any]
+  :param values: Nonzero levels.
+  :type values: np.typing.NDArray[Any]
+  :param K: Number of coefficients of each block.
+  :type K: int
+  :return: (n_blocks, K) array of quantized coefficients in zig-zag order.
+  :rtype: np.typing.NDArray[Any]
+  """
+  counts = counts.astype(np.intp)
+  levels = np.zeros((len(counts), K), dtype=values.dtype)
+  if len(values):
+    steps = np.cumsum(runs.astype(np.intp) + 1)
+    starts = np.cumsum(counts) - counts
+    before = np.concatenate(([0], steps[:-1])) # Steps taken before each pair, to restart the count at each block.
+    position = steps - np.repeat(before[starts[counts > 0]], counts[counts > 0]) - 1
+    levels[np.repeat(np.arange(len(counts)), counts), position] = values
+  return levels
+
+def _pack_stream(stream: np.typing.NDArray[Any]) -> bytes:
+  """
+  Entropy codes an integer stream: signed values are mapped to unsigned ones (0, -1, 1, -2, … → 0, 1, 2, 3, …), split into byte planes (all low bytes, then all high bytes) and coded with DEFLATE restricted to runs of repeated bytes and Huffman codes, which compresses the mostly-zero high planes well and is much faster than a full LZ77 search.
+
+  :param stream: Integer stream.
+  :type stream: np.typing.NDArray[Any]
+  :return: Coded stream.
+  :rtype: bytes
+  """
+  unsigned = stream.dtype.str.replace("i", "u")
+  if stream.dtype.kind == "i":
+    stream = (stream << 1) ^ (stream >> (8 * stream.itemsize - 1))
+  planes = np.ascontiguousarray(stream.astype(unsigned).view(np.uint8).reshape(-1, stream.itemsize).T)
+  coder = zlib.compressobj(9, zlib.DEFLATED, 15, 9, zlib.Z_RLE)
+  return coder.compress(planes.tobytes()) + coder.flush()
+
+def _unpack_stream(data: bytes, dtype: str) -> np.typing.NDArray[Any]:
+  """
+  Undoes :func:`_pack_stream`.
+
+  :param data: Coded stream.
+  :type data: bytes
+  :param dtype: Little-endian type of the integer stream.
+  :type dtype: str
+  :return: Integer stream.
+  :rtype: np.typing.NDArray[Any]
+  """
+  unsigned = np.dtype(dtype.replace("i", "u"))
+  planes = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(unsigned.itemsize, -1)
+  stream = np.ascontiguousarray(planes.T).view(unsigned).reshape(-1)
+  if "i" in dtype:
+    return ((stream >> 1) ^ -(stream & 1).astype(dtype)).astype(dtype) # type: ignore
+  return stream
+
+def encode(img: np.typing.NDArray[Any], F: int, d_thr: int, q: float = 1.0) -> bytes:
+  """
+  Compresses a gray-scale image: blockwise DCT2, uniform quantization, zig-zag ordering of the coefficients with k+ℓ < d_thr, run-length coding and Huffman coding.
+
+  :param img: Image to compress.
+  :type img: np.typing.NDArray[Any]
+  :param F: Block size.
+  :type F: int
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :param q: Quantization step, defaults to 1.0.
+  :type q: float, optional
+  :raises ValueError: If the image is not gray-scale or smaller than a block, or the parameters are out of range.
+  :return: Compressed file content.
+  :rtype: bytes
+  """
+  if img.ndim != 2:
+    raise ValueError("Image must be gray-scale!")
+  if not 2 <= F <= 255 or not 1 <= d_thr <= 2 * F - 1 or q <= 0:
+    raise ValueError("F must be between 2 and 255, d must be between 1 and 2F - 1 and q must be > 0!")
+  if img.shape[0] < F or img.shape[1] < F:
+    raise ValueError("Image must be at least one block wide and high!")
+  with stage("dct"):
+    coeffs = block_coefficients(img, F)
+  bh, bw = coeffs.shape[:2]
+  count("blocks", bh * bw)
+  with stage("quantize"):
+    levels = np.rint(pack(coeffs, d_thr).reshape(bh * bw, -1) / q)
+    peak = np.abs(levels).max(initial=0)
+    if peak > np.iinfo(np.int32).max:
+      raise ValueError("Quantized coefficients overflow 32 bits, q is too small!")
+    wide = peak > np.iinfo(np.int16).max
+  with stage("run_length"):
+    counts, runs, values = _run_lengths(levels.astype(np.int32 if wide else np.int16))
+  data = [HEADER.pack(MAGIC, VERSION, bh * F, bw * F, F, d_thr, q, int(wide))]
+  with stage("entropy"):
+    for stream in (counts, runs, values):
+      packed = _pack_stream(stream.astype(stream.dtype.newbyteorder("<")))
+      data += [LENGTH.pack(len(packed)), packed]
+  return b"".join(data)
+
+def decode(data: bytes) -> np.typing.NDArray[np.uint8]:
+  """
+  Decompresses an image compressed with :func:`encode`.
+
+  :param data: Compressed file content.
+  :type data: bytes
+  :raises ValueError: If the data is not a supported compressed file or is corrupt.
+  :return: Reconstructed gray-scale image.
+  :rtype: np.typing.NDArray[np.uint8]
+  """
+  if len(data) < HEADER.size:
+    raise ValueError("Not a compressed image!")
+  magic, version, height, width, F, d_thr, q, wide = HEADER.unpack_from(data)
+  if magic != MAGIC:
+    raise ValueError("Not a compressed image!")
+  if version != VERSION:
+    raise ValueError(f"Unsupported compressed image version {version}!")
+  if not 2 <= F <= 255 or not 1 <= d_thr <= 2 * F - 1 or not 0 < q < np.inf or wide not in (0, 1):
+    raise ValueError("Corrupt GDCT stream!")
+  if height == 0 or width == 0 or height % F or width % F:
+    raise ValueError("Corrupt GDCT stream!")
+  try:
+    streams: list[bytes] = []
+    offset = HEADER.size
+    for _ in range(3):
+      (length,) = LENGTH.unpack_from(data, offset)
+      offset += LENGTH.size
+      streams.append(data[offset : offset + length]) # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
+      offset += length
+    with stage("entropy"):
+      counts = _unpack_stream(streams[0], "<u2")
+      runs = _unpack_stream(streams[1], "<u2")
+      values = _unpack_stream(streams[2], "<i4" if wide else "<i2")
+    if len(counts) != (height // F) * (width // F) or len(runs) != len(values) or int(counts.sum()) != len(values):
+      raise ValueError("Corrupt GDCT stream!")
+    with stage("run_length"):
+      levels = _expand_runs(counts, runs, values, len(zigzag_indices(F, d_thr)[0]))
+  except (zlib.error, struct.error, ValueError, IndexError) as exc: # Truncated streams, odd plane sizes or runs past the end of a block.
+    raise ValueError("Corrupt GDCT stream!") from exc
+  with stage("dequantize"):
+    packed = (levels.reshape(height // F, width // F, -1) * q).astype(get_precision())
+  with stage("idct"):
+    return unblock(packed_idct(packed, F, d_thr)).astype(np.uint8)
+
+def encode_file(img: np.typing.NDArray[Any], path: Path, F: int, d_thr: int, q: float = 1.0) -> int:
+  """
+  Compresses a gray-scale image into a file.
+
+  :param img: Image to compress.
+  :type img: np.typing.NDArray[Any]
+  :param path: Path of the compressed file.
+  :type path: Path
+  :param F: Block size.
+  :type F: int
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :param q: Quantization step, defaults to 1.0.
+  :type q: float, optional
+  :return: Size of the compressed file in bytes.
+  :rtype: int
+  """
+  return path.write_bytes(encode(img, F, d_thr, q))
+
+def decode_file(path: Path) -> np.typing.NDArray[np.uint8]:
+  """
+  Decompresses an image from a file written by :func:`encode_file`.
+
+  :param path: Path of the compressed file.
+  :type path: Path
+  :return: Reconstructed gray-scale image.
+  :rtype: np.typing.NDArray[np.uint8]
+  """
+  return decode(path.read_bytes())
@@ -0,0 +1,165 @@
+from typing import Any, Optional
+import numpy as np
+from blocks import block_view, blockwise_dct, get_precision, pack, packed_idct, unblock
+from profiling import stage, count
+from metrics import block_quality
+
+SUBSAMPLINGS = {"4:4:4": (1, 1), "4:2:2": (1, 2), "4:2:0": (2, 2)}
+"""
+Chroma subsampling schemes, with the vertical and horizontal subsampling factors of the Cb and Cr planes.
+"""
+
+RGB_TO_YCBCR = np.array([
+  [0.299, 0.587, 0.114],
+  [-0.168736, -0.331264, 0.5],
+  [0.5, -0.418688, -0.081312]
+])
+"""
+JFIF conversion matrix from RGB to YCbCr, whose chroma is then offset by 128.
+"""
+
+YCBCR_TO_RGB = np.linalg.inv(RGB_TO_YCBCR)
+"""
+JFIF conversion matrix from YCbCr, with the chroma offset removed, to RGB.
+"""
+
+def rgb_to_ycbcr(rgb: np.typing.NDArray[Any], precision: Optional[str] = None) -> np.typing.NDArray[Any]:
+  """
+  Converts an RGB image into YCbCr planes, all in the 0-255 range like 8-bit gray-scale images.
+
+  :param rgb: H×W×3 RGB image.
+  :type rgb: np.typing.NDArray[Any]
+  :param precision: Floating point precision of the planes, defaults to :func:`blocks.get_precision`.
+  :type precision: Optional[str], optional
+  :return: 3×H×W array with the Y, Cb and Cr planes, so that planes can be stacked without copies.
+  :rtype: np.typing.NDArray[Any]
+  """
+  matrix = RGB_TO_YCBCR.astype(precision or get_precision())
+  planes = np.tensordot(matrix, rgb.astype(matrix.dtype), axes=(1, 2))
+  planes[1:] += 128
+  return planes
+
+def ycbcr_to_rgb(planes: np.typing.NDArray[Any]) -> np.typing.NDArray[np.uint8]:
+  """
+  Converts YCbCr planes back into an 8-bit RGB image.
+
+  :param planes: 3×H×W array with the Y, Cb and Cr planes.
+  :type planes: np.typing.NDArray[Any]
+  :return: H×W×3 RGB image.
+  :rtype: np.typing.NDArray[np.uint8]
+  """
+  matrix = YCBCR_TO_RGB.astype(planes.dtype)
+  rgb = np.tensordot(planes, matrix, axes=(0, 1))
+  rgb -= matrix @ np.array([0, 128, 128], dtype=planes.dtype) # Removes the chroma offset without copying the planes.
+  np.round(rgb, out=rgb)
+  return np.clip(rgb, 0, 255, out=rgb).astype(np.uint8)
+
+def subsample(planes: np.typing.NDArray[Any], fy: int, fx: int) -> np.typing.NDArray[Any]:
+  """
+  Subsamples planes by averaging fy×fx blocks of pixels, summing strided views of the planes.
+
+  :param planes: C×H×W array of planes, with H divisible by fy and W by fx.
+  :type planes: np.typing.NDArray[Any]
+  :param fy: Vertical subsampling factor.
+  :type fy: int
+  :param fx: Horizontal subsampling factor.
+  :type fx: int
+  :return: C×(H/fy)×(W/fx) array of subsampled planes.
+  :rtype: np.typing.NDArray[Any]
+  """
+  small = planes[:, ::fy, ::fx].copy()
+  for i in range(fy):
+    for j in range(fx):
+      if i or j:
+        small += planes[:, i::fy, j::fx]
+  small /= fy * fx
+  return small
+
+def upsample(planes: np.typing.NDArray[Any], out: np.typing.NDArray[Any]) -> np.typing.NDArray[Any]:
+  """
+  Undoes :func:`subsample` by repeating each pixel over its fy×fx block, writing straight into the full size planes.
+
+  :param planes: C×h×w array of subsampled planes.
+  :type planes: np.typing.NDArray[Any]
+  :param out: C×(h·fy)×(w·fx) array where to write the upsampled planes.
+  :type out: np.typing.NDArray[Any]
+  :return: The out array.
+  :rtype: np.typing.NDArray[Any]
+  """
+  c, h, w = planes.shape
+  out.reshape(c, h, out.shape[1] // h, w, out.shape[2] // w)[...] = planes[:, :, None, :, None]
+  return out
+
+def _compress_planes(planes: np.typing.NDArray[Any], F: int, d_thr: int, method: str) -> tuple[np.typing.NDArray[Any], int]:
+  """
+  Compresses planes of the same size with one batched DCT2, packing of the kept coefficients and IDCT2, by stacking them as the block rows of a single image.
+
+  :param planes: C×H×W array of planes, with sides divisible by F.
+  :type planes: np.typing.NDArray[Any]
+  :param F: Block size.
+  :type F: int
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :param method: Block transform backend, one of :data:`blocks.METHODS`.
+  :type method: str
+  :return: C×H×W array of reconstructed planes and their number of retained coefficients.
+  :rtype: tuple[np.typing.NDArray[Any], int]
+  """
+  c, h, w = planes.shape
+  with stage("dct"):
+    coeffs = blockwise_dct(planes.reshape(c * h, w), F, method=method, precision=planes.dtype.name)
+  with stage("mask"):
+    packed = pack(coeffs, d_thr)
+  with stage("idct"):
+    rec = packed_idct(packed, F, d_thr, method=method)
+  count("blocks", coeffs.shape[0] * coeffs.shape[1])
+  return unblock(rec).reshape(c, h, w), packed.size
+
+def compress_color(img: np.typing.NDArray[Any], F: int, d_thr: int, subsampling: str = "4:2:0", method: str = "auto") -> tuple[np.typing.NDArray[np.uint8], dict[str, float]]:
+  """
+  Compresses an RGB image: converts it into YCbCr, subsamples the chroma and compresses each plane like a gray-scale image, batching all planes of the same size in the same transforms.
+  The image is cropped so that the subsampled chroma planes are divisible in blocks of side length F too.
+
+  :param img: H×W×3 RGB image.
+  :type img: np.typing.NDArray[Any]
+  :param F: Block size.
+  :type F: int
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :param subsampling: Chroma subsampling, one of :data:`SUBSAMPLINGS`, defaults to "4:2:0".
+  :type subsampling: str, optional
+  :param method: Block transform backend, one of :data:`blocks.METHODS`, defaults to "auto".
+  :type method: str, optional
+  :raises ValueError: If the image is not RGB, the subsampling is unknown or the image is smaller than a block.
+  :return: Reconstructed RGB image and its metrics over the three RGB channels: MSE, PSNR, block-wise SSIM, number of retained coefficients and their fraction of the RGB samples.
+  :rtype: tuple[np.typing.NDArray[np.uint8], dict[str, float]]
+  """
+  if img.ndim != 3 or img.shape[2] != 3:
+    raise ValueError("Image must be RGB!")
+  if subsampling not in SUBSAMPLINGS:
+    raise ValueError(f"Subsampling must be one of {', '.join(SUBSAMPLINGS)}!")
+  fy, fx = SUBSAMPLINGS[subsampling]
+
+  with stage("crop"):
+    h, w = img.shape[0] - img.shape[0] % (F * fy), img.shape[1] - img.shape[1] % (F * fx)
+    if h == 0 or w == 0:
+      raise ValueError("Image must be at least one block wide and high!")
+    cropped = img[:h, :w]
+  with stage("ycbcr"):
+    planes = rgb_to_ycbcr(cropped)
+  if fy == fx == 1:
+    planes, retained = _compress_planes(planes, F, d_thr, method)
+  else:
+    with stage("subsample"):
+      chroma = subsample(planes[1:], fy, fx)
+    planes[:1], luma_retained = _compress_planes(planes[:1], F, d_thr, method) # Reconstructions overwrite the planes, which are no longer needed.
+    chroma, chroma_retained = _compress_planes(chroma, F, d_thr, method)
+    with stage("upsample"):
+      upsample(chroma, planes[1:])
+    retained = luma_retained + chroma_retained
+  with stage("rgb"):
+    rec = ycbcr_to_rgb(planes)
+  with stage("metrics"):
+    # Channels stacked as block rows, like the planes.
+    metrics = block_quality(block_view(cropped.transpose(2, 0, 1).reshape(3 * h, w), F), block_view(rec.transpose(2, 0, 1).reshape(3 * h, w), F))
+  return rec, {**metrics, "retained": retained, "fraction": retained / cropped.size}
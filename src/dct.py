@@ -1,16 +1,44 @@
 import math
-from typing import Any
-from timeit import repeat
+from typing import TYPE_CHECKING, Any, Callable
+from time import perf_counter
 import numpy as np
 from scipy.fft import dctn
-import pandas as pd
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
-from tqdm import tqdm
+from cache import CACHE
+
+if TYPE_CHECKING: # Only needed by the benchmark, which imports them when run, so that the block transforms stay quick to import.
+  import pandas as pd
+  from matplotlib.figure import Figure
+
+DEFAULT_SIZES: list[int | tuple[int, int]] = [2**i for i in range(3, 13)]
+"""
+Matrix sizes benchmarked by default, from 8 to 4096.
+"""
+
+BUDGET = 1.0
+"""
+Time budget in seconds of each method at each size: runs repeat only while within it, and the naive DCT2 is extrapolated instead of run once a run is expected to exceed it.
+"""
+
+REPEATS = 5
+"""
+Largest number of runs of each method at each size, of which the fastest is kept.
+"""
 
 def compute_dct_matrix(N: int) -> np.typing.NDArray[Any]:
   """
   Return the N×N orthonormal DCT2 matrix D such that y = D @ x.
+  Matrices are cached by N, so the returned matrix is read-only.
+
+  :param N: Data size.
+  :type N: int
+  :return: N×N orthonormal DCT2 matrix D.
+  :rtype: np.typing.NDArray[Any]
+  """
+  return CACHE.get_or_compute(("dct_matrix", N), lambda: _build_dct_matrix(N))
+
+def _build_dct_matrix(N: int) -> np.typing.NDArray[Any]:
+  """
+  Builds the N×N orthonormal DCT2 matrix D such that y = D @ x.
 
   :param N: Data size.
   :type N: int
@@ -25,46 +53,108 @@ def compute_dct_matrix(N: int) -> np.typing.NDArray[Any]:
 
 def dct2_naive(data: np.typing.NDArray[Any]) -> np.typing.NDArray[Any]:
   """
-  Naive O(N³) 2D DCT2 using explicit matrix multiplication.
+  Naive O(N³) 2D DCT2 using explicit matrix multiplication, also for rectangular R×C matrices in O(RC(R + C)).
 
   :param data: Data matrix.
   :type data: np.typing.NDArray[Any]
   :return: Data matrix with DCT2 applied.
   :rtype: np.typing.NDArray[Any]
   """
-  D = compute_dct_matrix(data.shape[0])
-  return D @ data @ D.T
+  return compute_dct_matrix(data.shape[0]) @ data @ compute_dct_matrix(data.shape[1]).T
 
-def dct2_scipy(data: np.typing.NDArray[Any]) -> np.typing.NDArray[Any]:
+def dct2_scipy(data: np.typing.NDArray[Any], workers: int = 1, overwrite: bool = False) -> np.typing.NDArray[Any]:
   """
   Fast O(N² log N) DCT2 using SciPy's implementation.
 
   :param data: Data.
   :type data: np.typing.NDArray[Any]
+  :param workers: Number of threads SciPy can use, defaults to 1.
+  :type workers: int, optional
+  :param overwrite: Whether the DCT2 can be computed in place of the data, needing no additional memory, defaults to False.
+  :type overwrite: bool, optional
   :return: Data with DCT2 applied.
   :rtype: np.typing.NDArray[Any]
   """
-  return dctn(data, norm="ortho") # type: ignore
+  return dctn(data, norm="ortho", workers=workers, overwrite_x=overwrite) # type: ignore
+
+def parse_size(text: str) -> tuple[int, int]:
+  """
+  Parses a matrix size, either N for a square matrix or R×C (also written RxC) for a rectangular one.
+
+  :param text: Matrix size.
+  :type text: str
+  :raises ValueError: If the size isn't made of positive integers.
+  :return: Number of rows and columns.
+  :rtype: tuple[int, int]
+  """
+  try:
+    sides = [int(side) for side in text.lower().replace("×", "x").split("x")]
+  except ValueError:
+    sides = []
+  if len(sides) not in (1, 2) or min(sides) < 1:
+    raise ValueError("Size must be N or R×C with positive integers!")
+  return sides[0], sides[-1]
+
+def _time(run: Callable[[], Any], budget: float, repeats: int) -> tuple[float, int]:
+  """
+  Times a function, repeating it while the next run is expected to fit in the time budget.
+
+  :param run: Function to time.
+  :type run: Callable[[], Any]
+  :param budget: Time budget in seconds, always allowing at least one run.
+  :type budget: float
+  :param repeats: Largest number of runs.
+  :type repeats: int
+  :return: Fastest run time in seconds and number of runs.
+  :rtype: tuple[float, int]
+  """
+  times: list[float] = []
+  start = perf_counter()
+  while len(times) < repeats and (not times or perf_counter() - start + min(times) <= budget):
+    begin = perf_counter()
+    run()
+    times.append(perf_counter() - begin)
+  return min(times), len(times)
 
-def benchmark(sizes: list[int] = [2**i for i in range(3, 13)]) -> pd.DataFrame:
+def benchmark(sizes: list[int | tuple[int, int]] = DEFAULT_SIZES, workers: int = 1, budget: float = BUDGET, precision: str = "float64") -> "pd.DataFrame":
   """
-  Compares Naive 2D DCT2 and SciPy's 2D DCT2 implementations.
+  Compares Naive 2D DCT2 and SciPy's 2D DCT2 implementations, adapting the runs to a time budget so that large sizes stay quick to benchmark.
+  Each method is run up to :data:`REPEATS` times while within the budget. Once a naive run is expected to exceed the budget, scaling the largest measured one by the O(RC(R + C)) cost, the naive time is extrapolated instead, so that only the fast DCT2 runs, in place, at sizes like 8192 or 16384.
 
-  :param sizes: Matrix sizes, defaults to [8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096].
-  :type sizes: list[int], optional
-  :return: DataFrame with execution times.
+  :param sizes: Matrix sizes, either N for square matrices or (R, C) for rectangular ones, defaults to :data:`DEFAULT_SIZES`.
+  :type sizes: list[int | tuple[int, int]], optional
+  :param workers: Number of threads SciPy can use, defaults to 1.
+  :type workers: int, optional
+  :param budget: Time budget in seconds of each method at each size, defaults to :data:`BUDGET`.
+  :type budget: float, optional
+  :param precision: Floating point precision of the matrices, defaults to "float64".
+  :type precision: str, optional
+  :return: DataFrame indexed by the rows and columns of each size, in order of cost, with the execution times, whether the naive time is extrapolated and the number of runs of each method.
   :rtype: pd.DataFrame
   """
+  import pandas as pd
+  from tqdm import tqdm
   rng = np.random.default_rng(42)
-  rows: list[dict[str, float]] = []
-  for N in tqdm(sizes, bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt}', ncols=80):
-    x = rng.integers(0, 256, size=(N, N)).astype(float)
-    t_naive = min(repeat(lambda x=x: dct2_naive(x), repeat=5, number=1))
-    t_fast = min(repeat(lambda x=x: dct2_scipy(x), repeat=5, number=1))
-    rows.append({"N": N, "naive": t_naive, "fast": t_fast})
-  return pd.DataFrame(rows).set_index("N")
+  rows: list[dict[str, Any]] = []
+  measured: tuple[int, float] | None = None # Cost and time of the largest naive run.
+  shapes = sorted({(size, size) if isinstance(size, int) else tuple(size) for size in sizes}, key=lambda shape: (shape[0] * shape[1] * (shape[0] + shape[1]), shape))
+  for R, C in tqdm(shapes, bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt}', ncols=80):
+    x = rng.integers(0, 256, size=(R, C), dtype=np.uint8).astype(precision)
+    cost = R * C * (R + C)
+    estimate = measured[1] * cost / measured[0] if measured else 0.0
+    if estimate > budget:
+      t_naive, naive_runs = estimate, 0
+    else:
+      # Not part of the transform.
+      compute_dct_matrix(R)
+      compute_dct_matrix(C)
+      t_naive, naive_runs = _time(lambda x=x: dct2_naive(x), budget, REPEATS)
+      measured = (cost, t_naive)
+    t_fast, fast_runs = _time(lambda x=x: dct2_scipy(x, workers, overwrite=True), budget, REPEATS) # The DCT2 is orthonormal, so repeating it in place keeps the data bounded.
+    rows.append({"rows": R, "cols": C, "naive": t_naive, "fast": t_fast, "estimated": naive_runs == 0, "naive_runs": naive_runs, "fast_runs": fast_runs})
+  return pd.DataFrame(rows).set_index(["rows", "cols"])
 
-def plot(df: pd.DataFrame) -> Figure:
+def plot(df: "pd.DataFrame") -> "Figure":
   """
   Plots execution times (semi-logarithmic y-axis).
 
@@ -73,18 +163,35 @@ def plot(df: pd.DataFrame) -> Figure:
   :return: Plot with execution times as matrix size increases.
   :rtype: Figure
   """
+  import matplotlib.pyplot as plt
   figure, axis = plt.subplots()
-  # Reference complexity lines
-  N = np.array(df.index)
-  n3_ref = (N ** 3) / (N ** 3).max() * df["naive"].max() # Normalize to naive.
-  n2logn_ref = (N ** 2 * np.log2(N)) / (N ** 2 * np.log2(N)).max() * df["fast"].max() # Normalize to fast.
-  axis.semilogy(N, n3_ref, linestyle="--", label="Ideal $O(N^3)$")
-  axis.semilogy(N, n2logn_ref, linestyle="--", label="Ideal $O(N^2\\log N)$")
-  # Plot actual execution times.
-  axis.semilogy(df.index, df["naive"], marker="o", label="Naive $O(N^3)$")
-  axis.semilogy(df.index, df["fast"], marker="o", label="Fast $O(N^2\\log N)$")
+  shapes = df.index.to_frame(index=False)
+  square = (shapes["rows"] == shapes["cols"]).to_numpy()
+  estimated = df["estimated"].to_numpy()
+  squares = df[square].sort_index()
+  if not squares.empty:
+    # Reference complexity lines
+    N = squares.index.get_level_values("rows").to_numpy()
+    n3_ref = (N ** 3) / (N ** 3).max() * squares["naive"].max() # Normalize to naive.
+    n2logn_ref = (N ** 2 * np.log2(N)) / (N ** 2 * np.log2(N)).max() * squares["fast"].max() # Normalize to fast.
+    axis.semilogy(N, n3_ref, linestyle="--", label="Ideal $O(N^3)$")
+    axis.semilogy(N, n2logn_ref, linestyle="--", label="Ideal $O(N^2\\log N)$")
+    # Plot actual execution times.
+    measured = ~squares["estimated"].to_numpy()
+    axis.semilogy(N[measured], squares["naive"][measured], marker="o", label="Naive $O(N^3)$")
+    if not measured.all():
+      axis.semilogy(N[~measured], squares["naive"][~measured], marker="o", fillstyle="none", linestyle=":", color=axis.lines[-1].get_color(), label="Naive $O(N^3)$, extrapolated")
+    axis.semilogy(N, squares["fast"], marker="o", label="Fast $O(N^2\\log N)$")
+  if not square.all():
+    # Rectangular sizes, placed at the side of the square with as many elements.
+    side = np.sqrt(shapes["rows"] * shapes["cols"]).to_numpy()
+    rectangular = ~square
+    for mask, fillstyle, label in ((rectangular & ~estimated, "full", "Naive, rectangular"), (rectangular & estimated, "none", "Naive, rectangular, extrapolated")):
+      if mask.any():
+        axis.semilogy(side[mask], df["naive"][mask], marker="s", fillstyle=fillstyle, linestyle="none", label=label)
+    axis.semilogy(side[rectangular], df["fast"][rectangular], marker="s", linestyle="none", label="Fast, rectangular")
   # Labels and formatting.
-  axis.set_xlabel("Matrix size $N$")
+  axis.set_xlabel("Matrix size $N$ ($\\sqrt{RC}$ for $R×C$ matrices)")
   axis.set_ylabel("Execution time [s]")
   axis.set_title("2D DCT execution time vs size")
   axis.grid(True, which="both", linestyle="--", linewidth=0.5)
@@ -0,0 +1,39 @@
+import math
+from typing import Any
+import numpy as np
+
+def display_factor(shape: tuple[int, ...], height: int, width: int) -> int:
+  """
+  Picks the pyramid level to display an image on a canvas: the largest power of two downsampling factor that still leaves at least one image pixel per canvas pixel once the image is scaled to fit the canvas.
+
+  :param shape: Full resolution image shape.
+  :type shape: tuple[int, ...]
+  :param height: Canvas height in pixels.
+  :type height: int
+  :param width: Canvas width in pixels.
+  :type width: int
+  :return: Downsampling factor, 1 for images not larger than the canvas.
+  :rtype: int
+  """
+  ratio = max(shape[0] / max(height, 1), shape[1] / max(width, 1))
+  return 1 << math.floor(math.log2(ratio)) if ratio >= 2 else 1
+
+def downsample(img: np.typing.NDArray[Any], factor: int) -> np.typing.NDArray[Any]:
+  """
+  Downsamples an image by averaging factor×factor blocks, dropping the last rows and columns that don't fill a whole block.
+  The blocks are a strided view of the image, so only the downsampled image is allocated.
+
+  :param img: Image to downsample.
+  :type img: np.typing.NDArray[Any]
+  :param factor: Downsampling factor.
+  :type factor: int
+  :return: Downsampled image, of the same type for integer images and float32 otherwise.
+  :rtype: np.typing.NDArray[Any]
+  """
+  if factor == 1:
+    return img
+  h, w = img.shape[0] // factor, img.shape[1] // factor
+  small = img[: h * factor, : w * factor].reshape(h, factor, w, factor).mean(axis=(1, 3), dtype=np.float32) # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
+  if np.issubdtype(img.dtype, np.integer):
+    return np.rint(small, out=small).astype(img.dtype)
+  return small
@@ -1,7 +1,15 @@
-from typing import Final
+import io
+import sys
+import json
+import math
+import argparse
+from typing import Any, Final, Iterable, Optional
 from enum import StrEnum
-from dct import benchmark, plot
-from app import DCT2App
+from pathlib import Path
+from time import perf_counter
+from contextlib import redirect_stdout
+from multiprocessing import freeze_support
+import profiling
 
 class Command(StrEnum):
   """
@@ -24,6 +32,82 @@ class Command(StrEnum):
   """
   Launches the application window to select and compress a gray-scale image with JPEG compression type.
   """
+  BATCH = "batch"
+  """
+  Compresses every gray-scale image in a directory with JPEG compression type, across multiple processes.
+  """
+  SWEEP = "sweep"
+  """
+  Compresses a gray-scale image with many thresholds, reusing the same DCT2, and reports the retained coefficients and error for each.
+  """
+  METRICS = "metrics"
+  """
+  Compresses a gray-scale image and reports the MSE, PSNR, SSIM and retained coefficients of the result.
+  """
+  SEARCH = "search"
+  """
+  Searches the block size and threshold of a gray-scale image that best meet a target PSNR, fraction of retained coefficients or compressed file size.
+  """
+  COLOR = "color"
+  """
+  Compresses a color image in YCbCr with chroma subsampling and saves the result.
+  """
+  CACHE = "cache"
+  """
+  | Displays the usage of the cache of DCT2 matrices and block coefficients.
+  | If an argument is specified, either clears the cache or sets its memory budget.
+  """
+  STREAM = "stream"
+  """
+  Compresses a gray-scale image strip by strip through memory-mapped files, keeping memory usage bounded for images larger than RAM.
+  """
+  SEQUENCE = "sequence"
+  """
+  Compresses the frames of a directory or multi-page TIFF in order, recomputing only the blocks that changed since the previous frame.
+  """
+  ENC = "enc"
+  """
+  Encodes a gray-scale image into a compressed file with quantization, zig-zag ordering, run-length and Huffman coding.
+  """
+  DEC = "dec"
+  """
+  Decodes a compressed file back into an image.
+  """
+  WORKERS = "workers"
+  """
+  | Displays the number of threads used by the block transforms and the 'dct' benchmark.
+  | If a number is specified, sets it.
+  """
+  SCALE = "scale"
+  """
+  Measures how the block transforms scale from 1 to all CPU cores.
+  """
+  PRECISION = "precision"
+  """
+  Displays or sets the floating point precision of the block transforms.
+  """
+  PRECISIONS = "precisions"
+  """
+  Compares the floating point precisions of the block transforms.
+  """
+  METHODS = "methods"
+  """
+  Compares the SciPy and matrix block transform backends across block sizes to find their crossover point.
+  """
+  STARTUP = "startup"
+  """
+  Measures the cold start latency of the engine and the cold import time of the modules loaded by its commands.
+  """
+  BENCH = "bench"
+  """
+  | Benchmarks each stage of the block pipeline across image sizes, block sizes and thresholds, optionally saving the results.
+  | With 'compare', flags regressions against saved results.
+  """
+  PROFILE = "profile"
+  """
+  | Displays per-stage timings, memory allocations and counters collected while profiling is on.
+  | Can also turn profiling on or off and export the collected stages as a Chrome trace.
+  """
   EXIT = "exit"
   """
   Exits the engine.
@@ -39,31 +123,161 @@ class Engine:
   Engine version.
   """
 
+  def __init__(self, json_output: bool = False, interactive: bool = True) -> None:
+    """
+    :param json_output: Whether each command outputs a single JSON line with its results instead of text, defaults to False.
+    :type json_output: bool, optional
+    :param interactive: Whether commands can show plots, defaults to True.
+    :type interactive: bool, optional
+    """
+    self.json_output = json_output
+    """
+    Whether each command outputs a single JSON line with its results instead of text.
+    """
+    self.interactive = interactive
+    """
+    Whether commands can show plots.
+    """
+    self.failures = 0
+    """
+    Number of commands that failed so far.
+    """
+    self._result: Any = None
+    self._error: Optional[str] = None
+
   def start(self) -> None:
     """
-    Engine main loop to handle commands.
-    """
-    self.info()
-    while True:
-      match input().strip().split():
-        case [Command.INFO]:
-          self.info()
-        case [Command.HELP, *arguments]:
-          self.help(arguments)
-        case [Command.DCT, *arguments]:
-          self.dct(arguments)
-        case [Command.CMP]:
-          self.cmp()
-        case [Command.EXIT]:
-          break
-        case _:
-          self.error("Invalid command. Try 'help' to see a list of valid commands and how to use them.")
+    Engine main loop to handle commands from the standard input, until 'exit' or the end of the input.
+    In JSON output mode, it's a warm server answering each command line with a JSON line.
+    """
+    if not self.json_output:
+      self.info()
+    for line in sys.stdin:
+      if not self.run(line):
+        break
+
+  def run_script(self, lines: Iterable[str]) -> bool:
+    """
+    Runs commands in order, skipping empty lines and '#' comments, until 'exit' or the last command.
+
+    :param lines: Command lines.
+    :type lines: Iterable[str]
+    :return: Whether all commands succeeded.
+    :rtype: bool
+    """
+    failures = self.failures
+    for line in lines:
+      if line.strip() and not line.lstrip().startswith("#") and not self.run(line):
+        break
+    return self.failures == failures
+
+  def run(self, line: str) -> bool:
+    """
+    Runs a single command line, reporting any exception it raises as an error instead of propagating it.
+    In JSON output mode, the text printed by the command is captured and output as a JSON line along with the command, its success, its results, its error and its elapsed seconds.
+
+    :param line: Command line.
+    :type line: str
+    :return: False if the command is 'exit', True otherwise.
+    :rtype: bool
+    """
+    words = line.strip().split()
+    if words == [Command.EXIT]:
+      return False
+    self._result, self._error = None, None
+    if not self.json_output:
+      self._safe_dispatch(words)
+      return True
+    output = io.StringIO()
+    start = perf_counter()
+    with redirect_stdout(output):
+      self._safe_dispatch(words)
+    response = {"command": " ".join(words), "ok": self._error is None, "result": self._result, "error": self._error, "output": output.getvalue(), "seconds": perf_counter() - start}
+    print(json.dumps(_jsonable(response), ensure_ascii=False), flush=True)
+    return True
+
+  def emit(self, result: Any) -> None:
+    """
+    Records the results of the current command, output in JSON output mode.
+
+    :param result: Results, made of dictionaries, lists, numbers, strings, paths and data frames.
+    :type result: Any
+    """
+    self._result = result
+
+  def _safe_dispatch(self, words: list[str]) -> None:
+    """
+    Handles a command split into words, reporting any unexpected exception as an error of the command.
+
+    :param words: Command and its arguments.
+    :type words: list[str]
+    """
+    try:
+      self._dispatch(words)
+    except Exception as exc: # pylint: disable=broad-exception-caught # A failed command must not stop the engine, its scripts or the server.
+      self.error(exc)
+
+  def _dispatch(self, words: list[str]) -> None:
+    """
+    Handles a command split into words.
+
+    :param words: Command and its arguments.
+    :type words: list[str]
+    """
+    match words:
+      case [Command.INFO]:
+        self.info()
+      case [Command.HELP, *arguments]:
+        self.help(arguments)
+      case [Command.DCT, *arguments]:
+        self.dct(arguments)
+      case [Command.CMP]:
+        self.cmp()
+      case [Command.BATCH, *arguments]:
+        self.batch(arguments)
+      case [Command.SWEEP, *arguments]:
+        self.sweep(arguments)
+      case [Command.METRICS, *arguments]:
+        self.metrics(arguments)
+      case [Command.SEARCH, *arguments]:
+        self.search(arguments)
+      case [Command.COLOR, *arguments]:
+        self.color(arguments)
+      case [Command.CACHE, *arguments]:
+        self.cache(arguments)
+      case [Command.STREAM, *arguments]:
+        self.stream(arguments)
+      case [Command.SEQUENCE, *arguments]:
+        self.sequence(arguments)
+      case [Command.ENC, *arguments]:
+        self.enc(arguments)
+      case [Command.DEC, *arguments]:
+        self.dec(arguments)
+      case [Command.WORKERS, *arguments]:
+        self.workers(arguments)
+      case [Command.SCALE, *arguments]:
+        self.scale(arguments)
+      case [Command.PRECISION, *arguments]:
+        self.precision(arguments)
+      case [Command.PRECISIONS, *arguments]:
+        self.precisions(arguments)
+      case [Command.METHODS, *arguments]:
+        self.methods(arguments)
+      case [Command.STARTUP, *arguments]:
+        self.startup(arguments)
+      case [Command.BENCH, *arguments]:
+        self.bench(arguments)
+      case [Command.PROFILE, *arguments]:
+        self.profile(arguments)
+      case _:
+        self.error("Invalid command. Try 'help' to see a list of valid commands and how to use them.")
 
   def info(self) -> None:
     """
     Handles 'info' command.
     """
     print(f"EngineDCT2 v{Engine.VERSION}")
+    self.emit({"version": Engine.VERSION})
 
   def help(self, arguments: list[str]) -> None:
     """
@@ -87,14 +301,115 @@ class Engine:
             print()
             print("  Displays the list of available commands. If a command is specified, displays the help for that command.")
           case Command.DCT:
+            from dct import BUDGET
             print(f"  {Command.DCT}")
             print(f"  {Command.DCT} [n]")
+            print(f"  {Command.DCT} sizes <N | R×C> [...]")
             print()
-            print("  Compares a naive implementation of the DCT2 to SciPy's implementation. The comparison runs for N×N arrays with N starting from 2³ and doubling up to 2ⁿ (n defaults to 12).")
+            print("  Compares a naive implementation of the DCT2 to SciPy's implementation. The comparison runs for N×N arrays with N starting from 2³ and doubling up to 2ⁿ (n defaults to 12), or for the given square and rectangular sizes, like 3000 or 6000×4000.")
+            print(f"  Each method repeats only within a {BUDGET:g}s budget per size: once a naive run would exceed it, its time is extrapolated from the largest measured one, so sizes up to 16384 only run SciPy's implementation.")
           case Command.CMP:
             print(f"  {Command.CMP}")
             print()
             print("  Launches the application window to select and compress a gray-scale image with JPEG compression type.")
+          case Command.BATCH:
+            print(f"  {Command.BATCH}")
+            print(f"  {Command.BATCH} <input_dir> <output_dir> <F> <d> [workers] [report]")
+            print()
+            print("  Compresses every gray-scale image in input_dir with block size F and threshold d, saving the results in output_dir as they finish and reporting the throughput. Runs across as many processes as workers (defaults to the number of CPUs). Also reports the mean PSNR and the mean SSIM of the compressed images and, if a report path is specified, saves the metrics of each image there as CSV.")
+          case Command.SWEEP:
+            print(f"  {Command.SWEEP}")
+            print(f"  {Command.SWEEP} <image> <F> <d> [d ...]")
+            print()
+            print("  Compresses the given image as gray-scale with block size F and each of the thresholds d, computing the DCT2 only once. For each d reports the number and fraction of retained coefficients, the MSE and the PSNR.")
+          case Command.METRICS:
+            from blocks import EDGES
+            print(f"  {Command.METRICS}")
+            print(f"  {Command.METRICS} <image> <F> <d> [{' | '.join(EDGES)}]")
+            print()
+            print("  Compresses the given image as gray-scale with block size F and threshold d, measuring the quality in the same pass over the blocks. Reports the MSE, the PSNR, the mean SSIM over the F×F blocks and the number and fraction of retained coefficients. The trailing rows and columns that don't fill a whole block are cropped (default), or padded by replicating the border pixels, mirroring the image or with 0s, so that the image keeps its size. When padded, the MSE and PSNR only measure the pixels of the image and the SSIM only the whole blocks.")
+          case Command.SEARCH:
+            from search import DEFAULT_FS
+            print(f"  {Command.SEARCH}")
+            print(f"  {Command.SEARCH} <image> <psnr | fraction | bytes> <target> [F ...]")
+            print()
+            print(f"  Searches the block size F and threshold d that best meet the target for the given image as gray-scale: the fewest retained coefficients with at least the target PSNR in dB, or the highest PSNR within the target fraction of retained coefficients or size in bytes of the '{Command.ENC}' file. For each F (defaults to {', '.join(map(str, DEFAULT_FS))}) d is bisected reusing the cached DCT2, so each candidate costs only a mask and an IDCT2. Reports the best d of each F and the overall best.")
+          case Command.COLOR:
+            from color import SUBSAMPLINGS
+            print(f"  {Command.COLOR}")
+            print(f"  {Command.COLOR} <image> <output> <F> <d> [{' | '.join(SUBSAMPLINGS)}]")
+            print()
+            print("  Compresses the given image as RGB, converting it into YCbCr, subsampling the chroma (defaults to 4:2:0) and compressing each plane with block size F and threshold d, all planes of the same size in the same batched transforms. Saves the result to output and reports the MSE, the PSNR, the mean SSIM over the RGB channels and the number and fraction of retained coefficients.")
+          case Command.CACHE:
+            print(f"  {Command.CACHE}")
+            print(f"  {Command.CACHE} [clear | budget_mb]")
+            print()
+            print("  Displays the usage of the cache of DCT2 matrices and block coefficients, which lets recompressions of the same image and block size skip the DCT2. If 'clear' is specified, empties the cache. If a budget in MiB is specified, sets the cache memory budget, evicting the least recently used entries as needed.")
+          case Command.STREAM:
+            print(f"  {Command.STREAM}")
+            print(f"  {Command.STREAM} <input> <output> <F> <d> [strip_rows]")
+            print()
+            print("  Compresses the input image with block size F and threshold d, processing strip_rows rows at a time (defaults to F) and writing each strip straight to the output image. Memory usage stays bounded when the input is an 8-bit gray-scale .bmp or a .npy file. The output is saved as .npy if it has that extension, as an 8-bit .bmp otherwise.")
+          case Command.SEQUENCE:
+            print(f"  {Command.SEQUENCE}")
+            print(f"  {Command.SEQUENCE} <source> <F> <d> [output_dir]")
+            print()
+            print("  Compresses the frames of the source, either a directory of images (in order of their names) or a multi-page TIFF, with block size F and threshold d. Blocks whose pixels are unchanged since the previous frame reuse their coefficients, reconstruction and metrics, so only the changed blocks are transformed. Reports the recomputed blocks, the MSE, the PSNR, the mean SSIM and the seconds of each frame, along with the throughput in frames per second. If output_dir is specified, saves the compressed frames there.")
+          case Command.ENC:
+            print(f"  {Command.ENC}")
+            print(f"  {Command.ENC} <image> <output> <F> <d> [q]")
+            print()
+            print("  Encodes the given image as gray-scale into the output compressed file, keeping the DCT2 coefficients with k+ℓ < d of each F×F block quantized with step q (defaults to 1). Reports the file size, the compression ratio against 8-bit raw pixels and the PSNR.")
+          case Command.DEC:
+            print(f"  {Command.DEC}")
+            print(f"  {Command.DEC} <input> <output>")
+            print()
+            print("  Decodes the input compressed file and saves the image to output, in the format given by its extension.")
+          case Command.WORKERS:
+            print(f"  {Command.WORKERS}")
+            print(f"  {Command.WORKERS} [n]")
+            print()
+            print("  Displays the number of threads used by the block transforms of the compression commands and by SciPy's DCT2 in the 'dct' benchmark. If n is specified, sets it (defaults to 1).")
+          case Command.SCALE:
+            print(f"  {Command.SCALE}")
+            print(f"  {Command.SCALE} [size] [F]")
+            print()
+            print("  Measures the time of the blockwise DCT2, mask and IDCT2 of a size×size image (size defaults to 4096) with block size F (defaults to 8) as the number of threads grows from 1 to the number of CPUs, reporting the speedup over a single thread.")
+          case Command.PRECISION:
+            print(f"  {Command.PRECISION}")
+            print(f"  {Command.PRECISION} [float32 | float64]")
+            print()
+            print("  Displays the floating point precision of the block transforms of the compression commands. If specified, sets it (defaults to float32, which halves the memory of double precision and matches its reconstructions but for rare off-by-one roundings).")
+          case Command.PRECISIONS:
+            print(f"  {Command.PRECISIONS}")
+            print(f"  {Command.PRECISIONS} [size] [F]")
+            print()
+            print("  Measures the blockwise DCT2, mask and IDCT2 of a size×size image (size defaults to 4096) with block size F (defaults to 8) in single and double precision, reporting time, throughput, peak memory and the differences of the reconstructed pixels from double precision.")
+          case Command.METHODS:
+            print(f"  {Command.METHODS}")
+            print(f"  {Command.METHODS} [size]")
+            print()
+            print("  Measures the blockwise DCT2 and IDCT2 of a size×size image (size defaults to 2048) with SciPy's FFT-based transform and with batched products by the cached DCT2 matrix, for F from 2 to 128. Reports which backend is faster for each F and which one the compression commands pick automatically.")
+          case Command.STARTUP:
+            print(f"  {Command.STARTUP}")
+            print(f"  {Command.STARTUP} [repeats]")
+            print()
+            print("  Measures, in fresh interpreters, the time to start the engine and exit right away and the time to import the modules loaded by the 'dct', compression, 'batch' and 'cmp' commands, keeping the fastest of repeats runs (defaults to 5). Reports each time along with its overhead over starting the bare interpreter. Commands import their dependencies only when run, so that scripted runs start quickly.")
+          case Command.BENCH:
+            print(f"  {Command.BENCH}")
+            print(f"  {Command.BENCH} [output]")
+            print(f"  {Command.BENCH} compare <baseline> [current]")
+            print()
+            print("  Times the crop, DCT2, mask, IDCT2 and visualization stages of the block pipeline and measures its peak memory for 512², 1024² and 2048² images, F in 8, 16, 32 and d in 4, 10. If output is specified, saves the results along with the environment metadata as JSON, or as CSV if output ends with .csv.")
+            print("  With 'compare', compares the current results (loaded from current if specified, measured otherwise) against the baseline results, flagging as regressions the configurations where a stage time or the peak memory grew by more than 10%.")
+          case Command.PROFILE:
+            print(f"  {Command.PROFILE}")
+            print(f"  {Command.PROFILE} on [memory]")
+            print(f"  {Command.PROFILE} off")
+            print(f"  {Command.PROFILE} export <output>")
+            print()
+            print("  Displays the calls, total and mean time of each stage (crop, DCT2, mask, IDCT2, visualization, image loading and drawing) run by the other commands and the application since profiling was turned on, along with counters such as the number of transformed blocks.")
+            print("  'on' starts a new profiling session, also tracing the memory allocated by each stage if 'memory' is specified (this slows down the stages). 'off' stops profiling. 'export' saves the collected stages as a Chrome trace JSON file, viewable in chrome://tracing or Perfetto.")
           case Command.EXIT:
             print(f"  {Command.EXIT}")
             print("")
@@ -114,19 +429,587 @@ class Engine:
     :param arguments: Command arguments.
     :type arguments: list[str]
     """
-    if not arguments or len(arguments) == 1:
-      result = benchmark([2**i for i in range(3, (max(3, int(arguments[0])) if arguments else 12) + 1)])
-      print("Benchmark summary:\n", result)
-      plot(result).show()
-      print()
+    from dct import benchmark, parse_size, plot
+    from blocks import get_workers
+    if arguments and arguments[0] == "sizes":
+      try:
+        sizes: list[int | tuple[int, int]] = [parse_size(argument) for argument in arguments[1:]]
+      except ValueError as exc:
+        self.error(exc)
+        return
+      if not sizes:
+        self.error(f"Too few arguments for command '{Command.DCT} sizes'")
+        return
+    elif len(arguments) > 1:
+      self.error(f"Too many arguments for command '{Command.DCT}'")
+      return
     else:
-      self.error(f"Too many arguments for command '{Command.HELP}'")
+      try:
+        sizes = [2**i for i in range(3, (max(3, int(arguments[0])) if arguments else 12) + 1)]
+      except ValueError:
+        self.error("n must be an integer")
+        return
+    result = benchmark(sizes, get_workers())
+    print("Benchmark summary:\n", result)
+    self.emit(result)
+    if self.interactive:
+      plot(result).show()
+    print()
 
   def cmp(self) -> None:
     """
     Handles the 'cmp' command.
     """
-    DCT2App().mainloop()
+    if not self.interactive:
+      self.error(f"The '{Command.CMP}' command needs an interactive engine")
+      return
+    try:
+      from app import DCT2App
+      app = DCT2App()
+    except Exception as exc: # pylint: disable=broad-exception-caught # Tk isn't installed or there's no display.
+      self.error(f"The application needs Tk and a display: {exc}")
+      return
+    app.mainloop()
+
+  def batch(self, arguments: list[str]) -> None:
+    """
+    Handles the 'batch' command with arguments.
+
+    :param arguments: Command arguments.
+    :type arguments: list[str]
+    """
+    from batch import batch_compress
+    if len(arguments) not in (4, 5, 6):
+      self.error(f"Wrong number of arguments for command '{Command.BATCH}'")
+      return
+    report = Path(arguments.pop()) if len(arguments) == 6 or (len(arguments) == 5 and not arguments[4].lstrip("-").isdigit()) else None
+    try:
+      F, d_thr, *workers = [int(argument) for argument in arguments[2:]]
+    except ValueError:
+      self.error("F, d and workers must be integers")
+      return
+    input_dir = Path(arguments[0])
+    if not input_dir.is_dir():
+      self.error(f"'{input_dir}' is not a directory")
+    elif F < 2:
+      self.error("F must be ≥ 2")
+    elif d_thr < 1:
+      self.error("d must be ≥ 1")
+    elif workers and workers[0] < 1:
+      self.error("Workers must be an integer ≥ 1")
+    else:
+      summary = batch_compress(input_dir, Path(arguments[1]), F, d_thr, workers[0] if workers else None, report)
+      print(f"Compressed {summary['images']:.0f} images ({summary['failed']:.0f} failed) in {summary['seconds']:.2f}s: {summary['images_per_second']:.2f} img/s, {summary['mean_psnr']:.2f} dB mean PSNR, {summary['mean_ssim']:.4f} mean SSIM.")
+      if report is not None:
+        print(f"Saved the metrics of each image to '{report}'.")
+      self.emit(summary)
+      print()
+
+  def sweep(self, arguments: list[str]) -> None:
+    """
+    Handles the 'sweep' command with arguments.
+
+    :param arguments: Command arguments.
+    :type arguments: list[str]
+    """
+    import numpy as np
+    import pandas as pd
+    from PIL import Image
+    from pipeline import sweep
+    if len(arguments) < 3:
+      self.error(f"Too few arguments for command '{Command.SWEEP}'")
+      return
+    try:
+      F, *d_values = [int(argument) for argument in arguments[1:]]
+    except ValueError:
+      self.error("F and d must be integers")
+      return
+    if F < 2:
+      self.error("F must be ≥ 2")
+    elif min(d_values) < 1:
+      self.error("d must be ≥ 1")
+    else:
+      try:
+        img = np.array(Image.open(arguments[0]).convert("L"))
+        _, rows = sweep(img, F, d_values)
+      except (OSError, ValueError) as exc:
+        self.error(exc)
+        return
+      print("Sweep summary:\n", pd.DataFrame(rows).set_index("d"))
+      self.emit(rows)
+      print()
+
+  def metrics(self, arguments: list[str]) -> None:
+    """
+    Handles the 'metrics' command with arguments.
+
+    :param arguments: Command arguments.
+    :type arguments: list[str]
+    """
+    import numpy as np
+    from PIL import Image
+    from blocks import EDGES
+    from pipeline import compress
+    if len(arguments) not in (3, 4):
+      self.error(f"Wrong number of arguments for command '{Command.METRICS}'")
+      return
+    try:
+      F, d_thr = [int(argument) for argument in arguments[1:3]]
+    except ValueError:
+      self.error("F and d must be integers")
+      return
+    edge = arguments[3] if len(arguments) == 4 else "crop"
+    if F < 2:
+      self.error("F must be ≥ 2")
+    elif d_thr < 1:
+      self.error("d must be ≥ 1")
+    elif edge not in EDGES:
+      self.error(f"edge must be one of {', '.join(EDGES)}")
+    else:
+      try:
+        img = np.array(Image.open(arguments[0]).convert("L"))
+        _, metrics = compress(img, F, d_thr, edge=edge)
+      except (OSError, ValueError) as exc:
+        self.error(exc)
+        return
+      print(f"MSE: {metrics['mse']:.4f}")
+      print(f"PSNR: {metrics['psnr']:.2f} dB")
+      print(f"SSIM: {metrics['ssim']:.4f}")
+      print(f"Retained coefficients: {metrics['retained']:.0f} ({metrics['fraction']:.2%})")
+      self.emit(metrics)
+      print()
+
+  def search(self, arguments: list[str]) -> None:
+    """
+    Handles the 'search' command with arguments.
+
+    :param arguments: Command arguments.
+    :type arguments: list[str]
+    """
+    import numpy as np
+    import pandas as pd
+    from PIL import Image
+    from search import TARGETS, search
+    if len(arguments) < 3:
+      self.error(f"Too few arguments for command '{Command.SEARCH}'")
+      return
+    try:
+      value = float(arguments[2])
+      Fs = [int(argument) for argument in arguments[3:]]
+    except ValueError:
+      self.error("target must be a number and F must be integers")
+      return
+    if arguments[1] not in TARGETS:
+      self.error(f"target must be one of {', '.join(TARGETS)}")
+    elif Fs and min(Fs) < 2:
+      self.error("F must be ≥ 2")
+    else:
+      try:
+        img = np.array(Image.open(arguments[0]).convert("L"))
+        best, candidates = search(img, arguments[1], value, Fs or None)
+      except (OSError, ValueError) as exc:
+        self.error(exc)
+        return
+      print("Search candidates:\n", pd.DataFrame(candidates).set_index("F"))
+      print(f"Best: F={best['F']:.0f}, d={best['d']:.0f}, {best['psnr']:.2f} dB PSNR, {best['fraction']:.2%} retained coefficients.")
+      self.emit({"best": best, "candidates": candidates})
+      print()
+
+  def color(self, arguments: list[str]) -> None:
+    """
+    Handles the 'color' command with arguments.
+
+    :param arguments: Command arguments.
+    :type arguments: list[str]
+    """
+    import numpy as np
+    from PIL import Image
+    from color import SUBSAMPLINGS, compress_color
+    if len(arguments) not in (4, 5):
+      self.error(f"Wrong number of arguments for command '{Command.COLOR}'")
+      return
+    try:
+      F, d_thr = [int(argument) for argument in arguments[2:4]]
+    except ValueError:
+      self.error("F and d must be integers")
+      return
+    subsampling = arguments[4] if len(arguments) == 5 else "4:2:0"
+    if F < 2:
+      self.error("F must be ≥ 2")
+    elif d_thr < 1:
+      self.error("d must be ≥ 1")
+    elif subsampling not in SUBSAMPLINGS:
+      self.error(f"subsampling must be one of {', '.join(SUBSAMPLINGS)}")
+    else:
+      try:
+        img = np.array(Image.open(arguments[0]).convert("RGB"))
+        rec, metrics = compress_color(img, F, d_thr, subsampling)
+        Image.fromarray(rec).save(arguments[1])
+      except (OSError, ValueError) as exc:
+        self.error(exc)
+        return
+      print(f"Compressed {rec.shape[0]}×{rec.shape[1]} color image with {subsampling} chroma: {metrics['psnr']:.2f} dB PSNR, {metrics['ssim']:.4f} SSIM, {metrics['retained']:.0f} retained coefficients ({metrics['fraction']:.2%}).")
+      self.emit({"subsampling": subsampling, "height": rec.shape[0], "width": rec.shape[1], **metrics})
+      print()
+
+  def cache(self, arguments: list[str]) -> None:
+    """
+    Handles the 'cache' command with arguments.
+
+    :param arguments: Command arguments.
+    :type arguments: list[str]
+    """
+    from cache import CACHE
+    if len(arguments) > 1:
+      self.error(f"Too many arguments for command '{Command.CACHE}'")
+      return
+    if arguments and arguments[0] == "clear":
+      CACHE.clear()
+    elif arguments:
+      try:
+        budget = float(arguments[0])
+      except ValueError:
+        self.error("Budget must be a number of MiB or 'clear'")
+        return
+      if budget < 0:
+        self.error("Budget must be ≥ 0")
+        return
+      CACHE.budget = int(budget * 2**20)
+    print(f"Cache: {len(CACHE)} entries, {CACHE.nbytes / 2**20:.1f}/{CACHE.budget / 2**20:.1f} MiB, {CACHE.hits} hits, {CACHE.misses} misses.")
+    self.emit({"entries": len(CACHE), "bytes": CACHE.nbytes, "budget": CACHE.budget, "hits": CACHE.hits, "misses": CACHE.misses})
+    print()
+
+  def stream(self, arguments: list[str]) -> None:
+    """
+    Handles the 'stream' command with arguments.
+
+    :param arguments: Command arguments.
+    :type arguments: list[str]
+    """
+    from stream import compress_streaming
+    if len(arguments) not in (4, 5):
+      self.error(f"Wrong number of arguments for command '{Command.STREAM}'")
+      return
+    try:
+      F, d_thr, *strip_rows = [int(argument) for argument in arguments[2:]]
+    except ValueError:
+      self.error("F, d and strip_rows must be integers")
+      return
+    if F < 2:
+      self.error("F must be ≥ 2")
+    elif d_thr < 1:
+      self.error("d must be ≥ 1")
+    else:
+      try:
+        summary = compress_streaming(Path(arguments[0]), Path(arguments[1]), F, d_thr, strip_rows[0] if strip_rows else 0)
+      except (OSError, ValueError) as exc:
+        self.error(exc)
+        return
+      print(f"Compressed {summary['height']:.0f}×{summary['width']:.0f} image in {summary['strips']:.0f} strips in {summary['seconds']:.2f}s.")
+      self.emit(summary)
+      print()
+
+  def sequence(self, arguments: list[str]) -> None:
+    """
+    Handles the 'sequence' command with arguments.
+
+    :param arguments: Command arguments.
+    :type arguments: list[str]
+    """
+    import pandas as pd
+    from sequence import compress_sequence
+    if len(arguments) not in (3, 4):
+      self.error(f"Wrong number of arguments for command '{Command.SEQUENCE}'")
+      return
+    try:
+      F, d_thr = int(arguments[1]), int(arguments[2])
+    except ValueError:
+      self.error("F and d must be integers")
+      return
+    if F < 2:
+      self.error("F must be ≥ 2")
+    elif d_thr < 1:
+      self.error("d must be ≥ 1")
+    else:
+      try:
+        rows, summary = compress_sequence(Path(arguments[0]), F, d_thr, Path(arguments[3]) if len(arguments) == 4 else None)
+      except (OSError, ValueError) as exc:
+        self.error(exc)
+        return
+      if rows:
+        print("Frames:\n", pd.DataFrame(rows).set_index("frame"))
+      print(f"Compressed {summary['frames']:.0f} frames in {summary['seconds']:.2f}s: {summary['frames_per_second']:.2f} fps, {summary['changed_fraction']:.2%} of the blocks recomputed.")
+      self.emit({"frames": rows, "summary": summary})
+      print()
+
+  def enc(self, arguments: list[str]) -> None:
+    """
+    Handles the 'enc' command with arguments.
+
+    :param arguments: Command arguments.
+    :type arguments: list[str]
+    """
+    import numpy as np
+    from PIL import Image
+    from pipeline import crop
+    from metrics import psnr
+    from codec import encode_file, decode_file
+    if len(arguments) not in (4, 5):
+      self.error(f"Wrong number of arguments for command '{Command.ENC}'")
+      return
+    try:
+      F, d_thr = int(arguments[2]), int(arguments[3])
+      q = float(arguments[4]) if len(arguments) == 5 else 1.0
+    except ValueError:
+      self.error("F and d must be integers and q must be a number")
+      return
+    try:
+      img = np.array(Image.open(arguments[0]).convert("L"))
+      size = encode_file(img, Path(arguments[1]), F, d_thr, q)
+      cropped, _, _ = crop(img, F)
+      mse = float(np.mean((decode_file(Path(arguments[1])) - cropped.astype(float)) ** 2))
+    except (OSError, ValueError) as exc:
+      self.error(exc)
+      return
+    print(f"Encoded {cropped.shape[0]}×{cropped.shape[1]} image in {size} bytes: {cropped.size / size:.2f}:1 ratio, {psnr(mse):.2f} dB PSNR.")
+    self.emit({"height": cropped.shape[0], "width": cropped.shape[1], "bytes": size, "ratio": cropped.size / size, "psnr": psnr(mse)})
+    print()
+
+  def dec(self, arguments: list[str]) -> None:
+    """
+    Handles the 'dec' command with arguments.
+
+    :param arguments: Command arguments.
+    :type arguments: list[str]
+    """
+    from PIL import Image
+    from codec import decode_file
+    if len(arguments) != 2:
+      self.error(f"Wrong number of arguments for command '{Command.DEC}'")
+      return
+    try:
+      img = decode_file(Path(arguments[0]))
+      Image.fromarray(img).save(arguments[1])
+    except (OSError, ValueError) as exc:
+      self.error(exc)
+      return
+    print(f"Decoded {img.shape[0]}×{img.shape[1]} image.")
+    self.emit({"height": img.shape[0], "width": img.shape[1]})
+    print()
+
+  def workers(self, arguments: list[str]) -> None:
+    """
+    Handles the 'workers' command with arguments.
+
+    :param arguments: Command arguments.
+    :type arguments: list[str]
+    """
+    from blocks import get_workers, set_workers
+    if len(arguments) > 1:
+      self.error(f"Too many arguments for command '{Command.WORKERS}'")
+      return
+    if arguments:
+      try:
+        set_workers(int(arguments[0]))
+      except ValueError:
+        self.error("Workers must be an integer ≥ 1")
+        return
+    print(f"Workers: {get_workers()}.")
+    self.emit({"workers": get_workers()})
+    print()
+
+  def scale(self, arguments: list[str]) -> None:
+    """
+    Handles the 'scale' command with arguments.
+
+    :param arguments: Command arguments.
+    :type arguments: list[str]
+    """
+    from bench import benchmark_scaling
+    if len(arguments) > 2:
+      self.error(f"Too many arguments for command '{Command.SCALE}'")
+      return
+    try:
+      size, F = [int(argument) for argument in arguments] + [4096, 8][len(arguments):]
+    except ValueError:
+      self.error("Size and F must be integers")
+      return
+    if F < 2 or size < F:
+      self.error("F must be ≥ 2 and size must be ≥ F")
+      return
+    result = benchmark_scaling(size, F)
+    print("Scaling summary:\n", result)
+    self.emit(result)
+    print()
+
+  def precision(self, arguments: list[str]) -> None:
+    """
+    Handles the 'precision' command with arguments.
+
+    :param arguments: Command arguments.
+    :type arguments: list[str]
+    """
+    from blocks import PRECISIONS, get_precision, set_precision
+    if len(arguments) > 1:
+      self.error(f"Too many arguments for command '{Command.PRECISION}'")
+      return
+    if arguments:
+      try:
+        set_precision(arguments[0])
+      except ValueError:
+        self.error(f"Precision must be one of {', '.join(PRECISIONS)}")
+        return
+    print(f"Precision: {get_precision()}.")
+    self.emit({"precision": get_precision()})
+    print()
+
+  def precisions(self, arguments: list[str]) -> None:
+    """
+    Handles the 'precisions' command with arguments.
+
+    :param arguments: Command arguments.
+    :type arguments: list[str]
+    """
+    from bench import benchmark_precisions
+    if len(arguments) > 2:
+      self.error(f"Too many arguments for command '{Command.PRECISIONS}'")
+      return
+    try:
+      size, F = [int(argument) for argument in arguments] + [4096, 8][len(arguments):]
+    except ValueError:
+      self.error("Size and F must be integers")
+      return
+    if F < 2 or size < F:
+      self.error("F must be ≥ 2 and size must be ≥ F")
+      return
+    result = benchmark_precisions(size, F)
+    print("Precisions summary:\n", result)
+    self.emit(result)
+    print()
+
+  def methods(self, arguments: list[str]) -> None:
+    """
+    Handles the 'methods' command with arguments.
+
+    :param arguments: Command arguments.
+    :type arguments: list[str]
+    """
+    from bench import benchmark_methods
+    if len(arguments) > 1:
+      self.error(f"Too many arguments for command '{Command.METHODS}'")
+      return
+    try:
+      size = int(arguments[0]) if arguments else 2048
+    except ValueError:
+      self.error("Size must be an integer")
+      return
+    if size < 128:
+      self.error("Size must be ≥ 128")
+      return
+    result = benchmark_methods(size)
+    print("Methods summary:\n", result)
+    self.emit(result)
+    print()
+
+  def startup(self, arguments: list[str]) -> None:
+    """
+    Handles the 'startup' command with arguments.
+
+    :param arguments: Command arguments.
+    :type arguments: list[str]
+    """
+    from bench import benchmark_startup
+    if len(arguments) > 1:
+      self.error(f"Too many arguments for command '{Command.STARTUP}'")
+      return
+    try:
+      repeats = int(arguments[0]) if arguments else 5
+    except ValueError:
+      self.error("Repeats must be an integer")
+      return
+    if repeats < 1:
+      self.error("Repeats must be ≥ 1")
+      return
+    result = benchmark_startup(repeats)
+    print("Startup summary:\n", result)
+    self.emit(result)
+    print()
+
+  def bench(self, arguments: list[str]) -> None:
+    """
+    Handles the 'bench' command with arguments.
+
+    :param arguments: Command arguments.
+    :type arguments: list[str]
+    """
+    from bench import benchmark_pipeline, save_results, load_results, compare
+    match arguments:
+      case [] | [_]:
+        result = benchmark_pipeline()
+        print("Benchmark summary:\n", result.set_index(["size", "F", "d"]))
+        self.emit(result)
+        if arguments:
+          save_results(result, Path(arguments[0]))
+          print(f"Saved results to {arguments[0]}.")
+        print()
+      case ["compare", baseline, *current] if len(current) <= 1:
+        try:
+          comparison = compare(load_results(Path(baseline)), load_results(Path(current[0])) if current else benchmark_pipeline())
+        except (OSError, ValueError, KeyError) as exc:
+          self.error(exc)
+          return
+        print("Comparison (current / baseline):\n", comparison)
+        regressions = int(comparison["regression"].sum())
+        print(f"{regressions} regressions found." if regressions else "No regressions found.")
+        self.emit({"regressions": regressions, "comparison": comparison})
+        print()
+      case _:
+        self.error(f"Wrong arguments for command '{Command.BENCH}'")
+
+  def profile(self, arguments: list[str]) -> None:
+    """
+    Handles the 'profile' command with arguments.
+
+    :param arguments: Command arguments.
+    :type arguments: list[str]
+    """
+    import pandas as pd
+    match arguments:
+      case []:
+        profiler = profiling.active()
+        if profiler is None:
+          print(f"Profiling is off. Try '{Command.PROFILE} on'.")
+        elif not profiler.events:
+          print("No stages recorded yet.")
+        else:
+          print("Profile summary:\n", pd.DataFrame(profiler.summary()).set_index("stage"))
+          for name, value in profiler.counters.items():
+            print(f"  {name}: {value}")
+          self.emit({"stages": profiler.summary(), "counters": profiler.counters})
+        print()
+      case ["on", *memory] if memory in ([], ["memory"]):
+        profiling.enable(bool(memory))
+        print("Profiling on.")
+        print()
+      case ["off"]:
+        profiling.disable()
+        print("Profiling off.")
+        print()
+      case ["export", output]:
+        profiler = profiling.active()
+        if profiler is None:
+          self.error("Profiling is off")
+          return
+        try:
+          profiler.export(Path(output))
+        except OSError as exc:
+          self.error(exc)
+          return
+        print(f"Exported {len(profiler.events)} stages to {output}.")
+        self.emit({"stages": len(profiler.events), "output": output})
+        print()
+      case _:
+        self.error(f"Wrong arguments for command '{Command.PROFILE}'")
 
   def error(self, error: str | Exception) -> None:
     """
@@ -135,7 +1018,59 @@ class Engine:
     :param message: Message or exception.
     :type message: str | Exception
     """
+    self.failures += 1
+    if self._error is None:
+      self._error = str(error)
     print(f"err {error}.")
 
+def _jsonable(value: Any) -> Any:
+  """
+  Converts command results into values that can be serialized as JSON: data frames become lists of records, NumPy scalars and arrays become numbers and lists, paths become strings and non-finite numbers become null.
+
+  :param value: Results.
+  :type value: Any
+  :return: JSON serializable results.
+  :rtype: Any
+  """
+  if isinstance(value, dict):
+    return {str(key): _jsonable(item) for key, item in value.items()}
+  if isinstance(value, (list, tuple)):
+    return [_jsonable(item) for item in value]
+  if hasattr(value, "reset_index"): # Data frames, imported lazily by the commands.
+    return _jsonable(value.reset_index().to_dict("records"))
+  if hasattr(value, "tolist"): # NumPy scalars and arrays.
+    return _jsonable(value.tolist())
+  if isinstance(value, float) and not math.isfinite(value):
+    return None
+  if isinstance(value, Path):
+    return str(value)
+  return value
+
+def main(argv: Optional[list[str]] = None) -> None:
+  """
+  Entry point of the engine: an interactive prompt, or a non-interactive run of a command, a script of commands or a warm server over the standard input.
+
+  :param argv: Command line arguments, defaults to the process arguments.
+  :type argv: Optional[list[str]], optional
+  """
+  parser = argparse.ArgumentParser(description="Engine to benchmark the DCT2 and compress images with JPEG compression type. Without arguments, reads commands interactively.")
+  parser.add_argument("--json", action="store_true", help="Outputs a JSON line with the results of each command instead of text. Without a script or command, serves commands from the standard input until 'exit' or its end.")
+  parser.add_argument("--script", type=Path, default=None, help="Runs the commands in a file, one per line, skipping empty lines and '#' comments.")
+  parser.add_argument("command", nargs=argparse.REMAINDER, help="Runs a single command with its arguments.")
+  args = parser.parse_args(argv)
+  if args.script is not None and args.command:
+    parser.error("give either a script or a command")
+  scripted = args.script is not None or bool(args.command)
+  engine = Engine(json_output=args.json, interactive=not (scripted or args.json))
+  if not scripted:
+    engine.start()
+    return
+  try:
+    lines = args.script.read_text(encoding="utf-8").splitlines() if args.script is not None else [" ".join(args.command)]
+  except OSError as exc:
+    parser.error(str(exc))
+  sys.exit(0 if engine.run_script(lines) else 1)
+
 if __name__ == "__main__":
-  Engine().start()
+  freeze_support() # Needed by the process pool of the 'batch' command in frozen executables.
+  main()
@@ -0,0 +1,144 @@
+from pathlib import Path
+from collections import deque
+from threading import BoundedSemaphore
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator
+from PIL import Image
+import numpy as np
+from profiling import stage
+
+IMAGE_EXTENSIONS = (".bmp", ".png", ".jpg", ".jpeg")
+"""
+File extensions picked up when scanning a directory for images.
+"""
+
+PREFETCH = 2
+"""
+Number of images decoded ahead of the one being compressed.
+"""
+
+SAVE_THREADS = 2
+"""
+Number of threads encoding and writing images in the background.
+"""
+
+SAVE_PENDING = 4
+"""
+Maximum number of images waiting to be saved, so that memory stays bounded when saving is slower than compressing.
+"""
+
+def load_image(path: Path, mode: str = "L") -> np.typing.NDArray[np.uint8]:
+  """
+  Decodes an image file.
+
+  :param path: Path of the image.
+  :type path: Path
+  :param mode: Pillow mode to convert the image to, defaults to "L" for gray-scale.
+  :type mode: str, optional
+  :return: Decoded image.
+  :rtype: np.typing.NDArray[np.uint8]
+  """
+  with stage("load"):
+    with Image.open(path) as img:
+      return np.array(img.convert(mode))
+
+def save_image(img: np.typing.NDArray[Any], path: Path) -> Path:
+  """
+  Encodes and writes an image file, in the format given by its extension.
+
+  :param img: Image with values in the 0-255 range.
+  :type img: np.typing.NDArray[Any]
+  :param path: Path of the image.
+  :type path: Path
+  :return: Path of the saved image.
+  :rtype: Path
+  """
+  with stage("save"):
+    Image.fromarray(img.astype(np.uint8, copy=False)).save(path)
+  return path
+
+def prefetch(paths: Iterable[Path], load: Callable[[Path], Any] = load_image, depth: int = PREFETCH) -> Iterator[tuple[Path, "Future[Any]"]]:
+  """
+  Loads files on a background thread ahead of their use, so that decoding the next files overlaps with processing the current one.
+  Files are yielded in order along with the future of their content, which raises any error of the loading when its result is retrieved.
+
+  :param paths: Paths of the files.
+  :type paths: Iterable[Path]
+  :param load: Function loading a file, defaults to :func:`load_image`.
+  :type load: Callable[[Path], Any], optional
+  :param depth: Number of files loaded ahead of the one yielded, defaults to :data:`PREFETCH`.
+  :type depth: int, optional
+  :return: Iterator over each path and the future of its content.
+  :rtype: Iterator[tuple[Path, Future[Any]]]
+  """
+  remaining = iter(paths)
+  executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+  queued: deque[tuple[Path, Future[Any]]] = deque()
+  try:
+    for path in remaining:
+      queued.append((path, executor.submit(load, path)))
+      if len(queued) > depth:
+        yield queued.popleft()
+    while queued:
+      yield queued.popleft()
+  finally:
+    for _, future in queued: # Stopped early, drop what wasn't yielded.
+      future.cancel()
+    executor.shutdown(wait=False)
+
+class BackgroundSaver:
+  """
+  Saves images on background threads, so that encoding and writing them overlaps with computing the next ones.
+  Used as a context manager, it waits for all images to be saved on exit.
+  """
+  def __init__(self, threads: int = SAVE_THREADS, pending: int = SAVE_PENDING) -> None:
+    """
+    :param threads: Number of threads saving images, defaults to :data:`SAVE_THREADS`.
+    :type threads: int, optional
+    :param pending: Maximum number of images waiting to be saved before :meth:`save` blocks, defaults to :data:`SAVE_PENDING`.
+    :type pending: int, optional
+    """
+    self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="saver")
+    self._slots = BoundedSemaphore(pending)
+    self._futures: list[Future[Path]] = []
+
+  def __enter__(self) -> "BackgroundSaver":
+    return self
+
+  def __exit__(self, *_: Any) -> None:
+    self.close()
+
+  def save(self, img: np.typing.NDArray[Any], path: Path) -> "Future[Path]":
+    """
+    Queues an image to be saved, waiting first if too many images are already waiting.
+
+    :param img: Image to save, which must not be modified until saved.
+    :type img: np.typing.NDArray[Any]
+    :param path: Path of the image.
+    :type path: Path
+    :return: Future of the saved path, which raises any error of the saving when its result is retrieved.
+    :rtype: Future[Path]
+    """
+    self._slots.acquire()
+    future = self._executor.submit(save_image, img, path)
+    future.add_done_callback(lambda _: self._slots.release())
+    self._futures.append(future)
+    return future
+
+  def wait(self) -> list[Path]:
+    """
+    Waits for all queued images to be saved.
+
+    :raises Exception: The first error raised while saving, if any.
+    :return: Paths of the saved images, in the order they were queued.
+    :rtype: list[Path]
+    """
+    futures, self._futures = self._futures, []
+    return [future.result() for future in futures]
+
+  def close(self) -> None:
+    """
+    Waits for all queued images to be saved and stops the background threads. Errors are left to the futures returned by :meth:`save`.
+    """
+    self._executor.shutdown(wait=True)
+    self._futures = []
@@ -0,0 +1,121 @@
+import math
+from typing import Any
+import numpy as np
+
+SSIM_C1 = (0.01 * 255) ** 2
+"""
+SSIM stabilizing constant of the means, for 8-bit images.
+"""
+
+SSIM_C2 = (0.03 * 255) ** 2
+"""
+SSIM stabilizing constant of the variances, for 8-bit images.
+"""
+
+BAND_PIXELS = 2**20
+"""
+Approximate number of pixels measured at once, so that temporaries stay small and in cache.
+"""
+
+def psnr(mse: float) -> float:
+  """
+  Computes the Peak Signal-to-Noise Ratio of 8-bit images from their Mean Squared Error.
+
+  :param mse: Mean Squared Error.
+  :type mse: float
+  :return: PSNR in dB, infinite for identical images.
+  :rtype: float
+  """
+  return 10 * math.log10(255 ** 2 / mse) if mse > 0 else math.inf
+
+def _scores(x: np.typing.NDArray[np.float64], y: np.typing.NDArray[np.float64]) -> tuple[np.typing.NDArray[np.float64], np.typing.NDArray[np.float64]]:
+  """
+  Computes the squared error and the SSIM of each pair of blocks, using the whole block as the SSIM window.
+
+  :param x: (..., F, F) reference blocks, centered in place.
+  :type x: np.typing.NDArray[np.float64]
+  :param y: (..., F, F) reconstructed blocks, centered in place.
+  :type y: np.typing.NDArray[np.float64]
+  :return: Sum of the squared errors and SSIM of each block.
+  :rtype: tuple[np.typing.NDArray[np.float64], np.typing.NDArray[np.float64]]
+  """
+  F = x.shape[-1]
+  mean_x = x.mean(axis=(-2, -1), keepdims=True)
+  mean_y = y.mean(axis=(-2, -1), keepdims=True)
+  x -= mean_x
+  y -= mean_y
+  var_x = np.mean(x * x, axis=(-2, -1))
+  var_y = np.mean(y * y, axis=(-2, -1))
+  cov = np.mean(x * y, axis=(-2, -1))
+  mean_x, mean_y = mean_x[..., 0, 0], mean_y[..., 0, 0]
+  # Squared error from the centered blocks: Σ(x - y)² = Σ(x' - y')² + F²(μx - μy)².
+  squared_error = (var_x + var_y - 2 * cov + (mean_x - mean_y) ** 2) * F * F
+  ssim = (2 * mean_x * mean_y + SSIM_C1) * (2 * cov + SSIM_C2) / ((mean_x ** 2 + mean_y ** 2 + SSIM_C1) * (var_x + var_y + SSIM_C2))
+  return squared_error, ssim
+
+def block_scores(reference: np.typing.NDArray[Any], reconstruction: np.typing.NDArray[Any]) -> tuple[np.typing.NDArray[np.float64], np.typing.NDArray[np.float64]]:
+  """
+  Measures the squared error and the SSIM of each block, so that the quality of an image can be updated when only some of its blocks change.
+  The blocks are read in bands along the first axis, like :func:`block_quality` does.
+
+  :param reference: (..., F, F) blocks of the reference image.
+  :type reference: np.typing.NDArray[Any]
+  :param reconstruction: (..., F, F) blocks of the reconstructed image.
+  :type reconstruction: np.typing.NDArray[Any]
+  :return: (...) arrays with the sum of the squared errors and the SSIM of each block.
+  :rtype: tuple[np.typing.NDArray[np.float64], np.typing.NDArray[np.float64]]
+  """
+  squared_errors = np.empty(reference.shape[:-2])
+  ssims = np.empty(reference.shape[:-2])
+  rows = max(1, BAND_PIXELS // (reference[:1].size or 1))
+  for start in range(0, reference.shape[0], rows):
+    band = slice(start, start + rows)
+    squared_errors[band], ssims[band] = _scores(reference[band].astype(np.float64), reconstruction[band].astype(np.float64))
+  return squared_errors, ssims
+
+def block_quality(reference: np.typing.NDArray[Any], reconstruction: np.typing.NDArray[Any]) -> dict[str, float]:
+  """
+  Measures the quality of a reconstruction against its reference image, both as (H/F, W/F, F, F) arrays of blocks, such as the views and outputs of the block transforms.
+  The blocks are read once, in bands of block rows, accumulating the squared errors and the SSIM of each block, which uses the whole block as its window, without any full-image temporary.
+
+  :param reference: (H/F, W/F, F, F) blocks of the reference image.
+  :type reference: np.typing.NDArray[Any]
+  :param reconstruction: (H/F, W/F, F, F) blocks of the reconstructed image.
+  :type reconstruction: np.typing.NDArray[Any]
+  :return: MSE, PSNR and mean block-wise SSIM.
+  :rtype: dict[str, float]
+  """
+  bh, bw, F, _ = reference.shape
+  rows = max(1, BAND_PIXELS // (bw * F * F))
+  squared_error = 0.0
+  ssim = 0.0
+  for start in range(0, bh, rows):
+    errors, ssims = _scores(reference[start : start + rows].astype(np.float64), reconstruction[start : start + rows].astype(np.float64)) # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
+    squared_error += float(np.sum(errors))
+    ssim += float(np.sum(ssims))
+  mse = max(squared_error, 0.0) / reference.size
+  return {"mse": mse, "psnr": psnr(mse), "ssim": ssim / (bh * bw)}
+
+def padded_quality(reference: np.typing.NDArray[Any], reconstruction: np.typing.NDArray[Any]) -> dict[str, float]:
+  """
+  Measures the quality of a padded reconstruction against its H×W reference image, ignoring the padding.
+  Whole blocks are measured by :func:`block_quality`, while the partial blocks along the bottom and right borders only add their squared errors, so the SSIM averages whole blocks alone.
+
+  :param reference: H×W reference image.
+  :type reference: np.typing.NDArray[Any]
+  :param reconstruction: (⌈H/F⌉, ⌈W/F⌉, F, F) blocks of the padded reconstruction.
+  :type reconstruction: np.typing.NDArray[Any]
+  :return: MSE and PSNR over the reference pixels and mean SSIM over the whole blocks, NaN if there are none.
+  :rtype: dict[str, float]
+  """
+  h, w = reference.shape
+  F = reconstruction.shape[-1]
+  bh, bw = h // F, w // F
+  quality = block_quality(reference[: bh * F, : bw * F].reshape(bh, F, bw, F).swapaxes(1, 2), reconstruction[:bh, :bw]) if bh and bw else {"mse": 0.0, "ssim": math.nan} # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
+  squared_error = quality["mse"] * bh * bw * F * F
+  # Bottom strip, then right strip without the corner, each unblocked on its own.
+  for ref, rec in ((reference[bh * F :], reconstruction[bh:]), (reference[: bh * F, bw * F :], reconstruction[:bh, bw:])): # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
+    rec = rec.swapaxes(1, 2).reshape(rec.shape[0] * F, rec.shape[1] * F)[: ref.shape[0], : ref.shape[1]] # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
+    squared_error += float(np.sum((ref.astype(np.float64) - rec) ** 2))
+  mse = squared_error / reference.size
+  return {"mse": mse, "psnr": psnr(mse), "ssim": quality["ssim"]}
@@ -0,0 +1,547 @@
+from functools import cached_property
+from typing import Any, Callable, ContextManager, Optional
+import numpy as np
+from blocks import EDGES, block_view, blockwise_dct, get_precision, pack, packed_idct, unblock, unpack
+from cache import CACHE, image_digest
+from profiling import stage, count
+from display import display_factor, downsample
+from metrics import block_quality, padded_quality
+
+def crop(img: np.typing.NDArray[Any], F: int) -> tuple[np.typing.NDArray[Any], int, int]:
+  """
+  Crops an image to be perfectly divisible in blocks of side length F.
+
+  :param img: Image to crop.
+  :type img: np.typing.NDArray[Any]
+  :param F: Block side length.
+  :type F: int
+  :return: Cropped image along with its new width and height.
+  :rtype: tuple[np.typing.NDArray[Any], int, int]
+  """
+  h, w = img.shape
+  height, width = h - h % F, w - w % F
+  cropped = img[:height, :width]
+  return cropped, width, height
+
+def to_visual(data: np.typing.NDArray[Any]) -> np.typing.NDArray[Any]:
+  """
+  Converts a data matrix into gray-scale for visualization.
+
+  :param data: Data matrix.
+  :type data: np.typing.NDArray[Any]
+  :return: Gray-scale data matrix.
+  :rtype: np.typing.NDArray[Any]
+  """
+  return _scale_visual(log_magnitude(data))
+
+def log_magnitude(data: np.typing.NDArray[Any]) -> np.typing.NDArray[Any]:
+  """
+  Computes the logarithm of the magnitude of a data matrix, which keeps its 0s as 0s.
+
+  :param data: Data matrix.
+  :type data: np.typing.NDArray[Any]
+  :return: Matrix of log₁₀(1 + |data|).
+  :rtype: np.typing.NDArray[Any]
+  """
+  return np.log10(1 + np.abs(data)) # Apply absolute to avoid negatives and + 1 to avoid 0s and make original 0s become 0s when scaled (as log(1) is 0).
+
+def _scale_visual(disp: np.typing.NDArray[Any]) -> np.typing.NDArray[Any]:
+  """
+  Scales a non-negative matrix to the gray-scale range.
+
+  :param disp: Non-negative matrix, scaled in place.
+  :type disp: np.typing.NDArray[Any]
+  :return: Gray-scale matrix.
+  :rtype: np.typing.NDArray[Any]
+  """
+  disp *= 255 / disp.max() if disp.max() > 0 else 1
+  return disp.astype(np.uint8)
+
+def packed_visual(packed: np.typing.NDArray[Any], F: int, d_thr: int) -> np.typing.NDArray[np.uint8]:
+  """
+  Converts packed coefficients into gray-scale for visualization, like :func:`to_visual` does their unpacked blocks, but taking the log magnitude of the kept coefficients only and unpacking them straight as 8-bit values.
+
+  :param packed: (H/F, W/F, K) array of coefficients packed by :func:`blocks.pack`.
+  :type packed: np.typing.NDArray[Any]
+  :param F: Block side length.
+  :type F: int
+  :param d_thr: Threshold the coefficients were packed with.
+  :type d_thr: int
+  :return: Gray-scale H×W visualization, where masked coefficients are 0s.
+  :rtype: np.typing.NDArray[np.uint8]
+  """
+  return unblock(unpack(_scale_visual(log_magnitude(packed)), F, d_thr))
+
+def block_coefficients(img: np.typing.NDArray[Any], F: int, cached: bool = True, method: str = "auto", edge: str = "crop") -> np.typing.NDArray[Any]:
+  """
+  Computes the blockwise DCT2 of an image cropped or padded to blocks of side length F, reusing cached coefficients of the same image, F and edge handling.
+
+  :param img: Gray-scale image.
+  :type img: np.typing.NDArray[Any]
+  :param F: Block side length.
+  :type F: int
+  :param cached: Whether to look up and store the coefficients in the shared cache, defaults to True.
+  :type cached: bool, optional
+  :param method: Transform backend, one of :data:`blocks.METHODS`, defaults to "auto".
+  :type method: str, optional
+  :param edge: Handling of the partial blocks, one of :data:`blocks.EDGES`, defaults to "crop".
+  :type edge: str, optional
+  :return: Read-only (H/F, W/F, F, F) array with the DCT2 coefficients of each block, (⌈H/F⌉, ⌈W/F⌉, F, F) if padded.
+  :rtype: np.typing.NDArray[Any]
+  """
+  source = crop(img, F)[0] if edge == "crop" else img
+  if not cached:
+    return blockwise_dct(source, F, method=method, edge=edge)
+  precision = get_precision()
+  return CACHE.get_or_compute(("block_dct", image_digest(img), F, precision, edge), lambda: blockwise_dct(source, F, method=method, precision=precision, edge=edge))
+
+Progress = Callable[[str, float], None]
+"""
+Callback notified with the name of each stage of the pipeline and the fraction of the pipeline completed before it. It can raise to abort the pipeline.
+"""
+
+def _stage(name: str, fraction: float, progress: Optional[Progress]) -> ContextManager[None]:
+  """
+  Notifies the progress callback, if any, that a stage is starting and records it with the active profiler.
+
+  :param name: Stage name.
+  :type name: str
+  :param fraction: Fraction of the pipeline completed before the stage.
+  :type fraction: float
+  :param progress: Progress callback.
+  :type progress: Optional[Progress]
+  :return: Context manager wrapping the stage.
+  :rtype: ContextManager[None]
+  """
+  if progress is not None:
+    progress(name, fraction)
+  return stage(name)
+
+Step = np.typing.NDArray[Any] | tuple[np.typing.NDArray[Any], np.typing.NDArray[Any]]
+"""
+Image displayed for a step of the JPEG compression, or pair of images to compare side by side.
+"""
+
+def step_titles(d_thr: int) -> list[str]:
+  """
+  Titles of the JPEG compression steps.
+
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :return: Title of each step.
+  :rtype: list[str]
+  """
+  return [
+    "Original image",
+    "Cropped image",
+    "|DCT| (log₁₀)",
+    f"Mask k+ℓ ≥ {d_thr}",
+    "IDCT (round & clip 0-255)",
+    "Original vs Compressed images"
+  ]
+
+def _reconstruct(packed: np.typing.NDArray[Any], F: int, d_thr: int, method: str, progress: Optional[Progress]) -> np.typing.NDArray[Any]:
+  """
+  Reconstructs the image straight from the packed coefficients kept by the threshold.
+
+  :param packed: (H/F, W/F, K) array of coefficients packed by :func:`blocks.pack`.
+  :type packed: np.typing.NDArray[Any]
+  :param F: Block size.
+  :type F: int
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :param method: Block transform backend.
+  :type method: str
+  :param progress: Progress callback.
+  :type progress: Optional[Progress]
+  :return: Reconstructed image.
+  :rtype: np.typing.NDArray[Any]
+  """
+  with _stage("idct", 0.5, progress):
+    idct_float = unblock(packed_idct(packed, F, d_thr, method=method))
+  count("blocks", packed.shape[0] * packed.shape[1])
+  return idct_float
+
+def jpeg_pipeline_steps(img: np.typing.NDArray[Any], F: int, d_thr: int, cached: bool = True, method: str = "auto", progress: Optional[Progress] = None) -> tuple[list[Step], list[str]]:
+  """
+  Builds the JPEG compression steps.
+
+  :param img: Image to compress.
+  :type img: np.typing.NDArray[Any]
+  :param F: Block size.
+  :type F: int
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :param cached: Whether to reuse the cached DCT2 coefficients of the same image and F, defaults to True.
+  :type cached: bool, optional
+  :param method: Block transform backend, one of :data:`blocks.METHODS`, defaults to "auto".
+  :type method: str, optional
+  :param progress: Callback notified before each stage, which can raise to abort the pipeline, defaults to None.
+  :type progress: Optional[Progress], optional
+  :raises ValueError: _description_
+  :return: JPEG compression steps and titles.
+  :rtype: tuple[list[Step], list[str]]
+  """
+  if img.ndim != 2:
+    raise ValueError("Image must be gray-scale!")
+
+  with _stage("crop", 0.0, progress):
+    cropped, _, _ = crop(img, F)
+  with _stage("dct", 0.05, progress):
+    coeffs = block_coefficients(img, F, cached, method)
+  with _stage("mask", 0.4, progress):
+    packed = pack(coeffs, d_thr) # Only the coefficients with k+ℓ < d_thr, instead of a mostly 0 copy of all of them.
+  idct_float = _reconstruct(packed, F, d_thr, method, progress)
+  with _stage("to_visual", 0.85, progress):
+    coeff_visual = to_visual(unblock(coeffs))
+    coeff_masked_visual = packed_visual(packed, F, d_thr)
+
+  images: list[Step] = [
+    img,
+    cropped,
+    coeff_visual,
+    coeff_masked_visual,
+    idct_float,
+    (cropped, idct_float)
+  ]
+
+  return images, step_titles(d_thr)
+
+class PipelineSteps:
+  """
+  JPEG compression steps built lazily: each step is computed when first requested and kept in the shared cache, which releases the least recently used steps when its memory budget runs out, recomputing them if requested again.
+  The steps are the same as those of :func:`jpeg_pipeline_steps`, which instead builds all of them up front.
+  """
+  def __init__(self, img: np.typing.NDArray[Any], F: int, d_thr: int, method: str = "auto") -> None:
+    """
+    :param img: Image to compress.
+    :type img: np.typing.NDArray[Any]
+    :param F: Block size.
+    :type F: int
+    :param d_thr: Threshold.
+    :type d_thr: int
+    :param method: Block transform backend, one of :data:`blocks.METHODS`, defaults to "auto".
+    :type method: str, optional
+    :raises ValueError: If the image is not gray-scale.
+    """
+    if img.ndim != 2:
+      raise ValueError("Image must be gray-scale!")
+    self.img = img
+    """
+    Image to compress.
+    """
+    self.F = F
+    """
+    Block size.
+    """
+    self.d_thr = d_thr
+    """
+    Threshold.
+    """
+    self.method = method
+    """
+    Block transform backend.
+    """
+    self.precision = get_precision()
+    """
+    Floating point precision of the block transforms, the default one when the steps were created.
+    """
+    self.titles = step_titles(d_thr)
+    """
+    Title of each step.
+    """
+
+  def __len__(self) -> int:
+    return len(self.titles)
+
+  def __getitem__(self, idx: int) -> Step:
+    return self.step(idx)
+
+  @cached_property
+  def digest(self) -> str:
+    """
+    Digest of the image, computed on first use since hashing a large image takes a while.
+    """
+    return image_digest(self.img)
+
+  @property
+  def cropped(self) -> np.typing.NDArray[Any]:
+    """
+    Image cropped to be perfectly divisible in blocks, a view of the image.
+    """
+    return crop(self.img, self.F)[0]
+
+  def with_threshold(self, d_thr: int) -> "PipelineSteps":
+    """
+    Builds the steps for another threshold, sharing the image digest and the cached steps that don't depend on the threshold.
+
+    :param d_thr: Threshold.
+    :type d_thr: int
+    :return: Lazy steps for the new threshold.
+    :rtype: PipelineSteps
+    """
+    steps = PipelineSteps(self.img, self.F, d_thr, self.method)
+    steps.precision = self.precision
+    if "digest" in self.__dict__:
+      steps.digest = self.digest
+    return steps
+
+  def ready(self, idx: int) -> bool:
+    """
+    Checks whether a step is available without computing anything.
+
+    :param idx: Step index.
+    :type idx: int
+    :return: Whether the step is available.
+    :rtype: bool
+    """
+    if idx <= 1:
+      return True
+    if "digest" not in self.__dict__:
+      return False
+    return self._key(4 if idx == 5 else idx) in CACHE
+
+  def display_ready(self, idx: int, height: int, width: int) -> bool:
+    """
+    Checks whether a step is available for display on a canvas without computing anything.
+
+    :param idx: Step index.
+    :type idx: int
+    :param height: Canvas height in pixels.
+    :type height: int
+    :param width: Canvas width in pixels.
+    :type width: int
+    :return: Whether the downsampled step is available.
+    :rtype: bool
+    """
+    if idx == 5:
+      return self.display_ready(1, height, width // 2) and self.display_ready(4, height, width // 2)
+    factor = display_factor(self._shape(idx), height, width)
+    if factor == 1:
+      return self.ready(idx)
+    return "digest" in self.__dict__ and self._key(idx, "display") + (factor,) in CACHE
+
+  def display(self, idx: int, height: int, width: int, progress: Optional[Progress] = None) -> Step:
+    """
+    Returns a step downsampled to the level of its display pyramid matching a canvas, computing and caching the level if needed, so that large images are drawn quickly.
+    Images compared side by side get half the canvas width each.
+
+    :param idx: Step index.
+    :type idx: int
+    :param height: Canvas height in pixels.
+    :type height: int
+    :param width: Canvas width in pixels.
+    :type width: int
+    :param progress: Callback notified before each computed stage, which can raise to abort the computation, defaults to None.
+    :type progress: Optional[Progress], optional
+    :return: Downsampled image, or pair of images, of the step.
+    :rtype: Step
+    """
+    if idx == 5:
+      return self.display(1, height, width // 2, progress), self.display(4, height, width // 2, progress) # type: ignore
+    factor = display_factor(self._shape(idx), height, width)
+    if factor == 1:
+      return self.step(idx, progress)
+    return CACHE.get_or_compute(self._key(idx, "display") + (factor,), lambda: downsample(self.step(idx, progress), factor)) # type: ignore
+
+  def step(self, idx: int, progress: Optional[Progress] = None) -> Step:
+    """
+    Returns a step, computing it if it's not cached.
+
+    :param idx: Step index.
+    :type idx: int
+    :param progress: Callback notified before each computed stage, which can raise to abort the computation, defaults to None.
+    :type progress: Optional[Progress], optional
+    :raises IndexError: If there's no such step.
+    :return: Image, or pair of images, of the step.
+    :rtype: Step
+    """
+    match idx:
+      case 0:
+        return self.img
+      case 1:
+        return self.cropped
+      case 2:
+        return CACHE.get_or_compute(self._key(idx), lambda: self._visual(progress))
+      case 3:
+        return CACHE.get_or_compute(self._key(idx), lambda: self._masked_visual(progress))
+      case 4:
+        return CACHE.get_or_compute(self._key(idx), lambda: _reconstruct(self._packed(progress), self.F, self.d_thr, self.method, progress))
+      case 5:
+        return self.cropped, self.step(4, progress)
+    raise IndexError(f"There's no step {idx}!")
+
+  def _key(self, idx: int, kind: str = "step") -> tuple[Any, ...]:
+    """
+    Builds the cache key of a step.
+
+    :param idx: Step index.
+    :type idx: int
+    :param kind: Kind of cached data, either "step" or "display", defaults to "step".
+    :type kind: str, optional
+    :return: Cache key, without the threshold for steps that don't depend on it.
+    :rtype: tuple[Any, ...]
+    """
+    return (kind, self.digest, self.F, self.precision, idx) if idx <= 2 else (kind, self.digest, self.F, self.precision, self.d_thr, idx)
+
+  def _shape(self, idx: int) -> tuple[int, int]:
+    """
+    Computes the shape of a step image without computing it.
+
+    :param idx: Step index, except for 5.
+    :type idx: int
+    :return: Image height and width.
+    :rtype: tuple[int, int]
+    """
+    h, w = self.img.shape
+    return (h, w) if idx == 0 else (h - h % self.F, w - w % self.F)
+
+  def _coefficients(self, progress: Optional[Progress]) -> np.typing.NDArray[Any]:
+    """
+    Returns the cached blockwise DCT2 coefficients, computing them if missing.
+
+    :param progress: Progress callback.
+    :type progress: Optional[Progress]
+    :return: Read-only (H/F, W/F, F, F) array with the DCT2 coefficients of each block.
+    :rtype: np.typing.NDArray[Any]
+    """
+    with _stage("dct", 0.05, progress):
+      return CACHE.get_or_compute(("block_dct", self.digest, self.F, self.precision, "crop"), lambda: blockwise_dct(self.cropped, self.F, method=self.method, precision=self.precision))
+
+  def _visual(self, progress: Optional[Progress]) -> np.typing.NDArray[Any]:
+    """
+    Visualizes the DCT2 coefficients.
+
+    :param progress: Progress callback.
+    :type progress: Optional[Progress]
+    :return: Gray-scale H×W visualization.
+    :rtype: np.typing.NDArray[Any]
+    """
+    coeffs = self._coefficients(progress)
+    with _stage("to_visual", 0.85, progress):
+      return to_visual(unblock(coeffs))
+
+  def _packed(self, progress: Optional[Progress]) -> np.typing.NDArray[Any]:
+    """
+    Returns the cached packed coefficients kept by the threshold, shared by the masked coefficients and the IDCT steps, computing them if missing.
+
+    :param progress: Progress callback.
+    :type progress: Optional[Progress]
+    :return: Read-only (H/F, W/F, K) array with the K coefficients with k+ℓ < d of each block.
+    :rtype: np.typing.NDArray[Any]
+    """
+    coeffs = self._coefficients(progress)
+    with _stage("mask", 0.4, progress):
+      return CACHE.get_or_compute(("packed", self.digest, self.F, self.precision, self.d_thr), lambda: pack(coeffs, self.d_thr))
+
+  def _masked_visual(self, progress: Optional[Progress]) -> np.typing.NDArray[Any]:
+    """
+    Visualizes the masked coefficients straight from the packed ones.
+
+    :param progress: Progress callback.
+    :type progress: Optional[Progress]
+    :return: Gray-scale H×W visualization.
+    :rtype: np.typing.NDArray[Any]
+    """
+    packed = self._packed(progress)
+    with _stage("to_visual", 0.85, progress):
+      return packed_visual(packed, self.F, self.d_thr)
+
+def threshold_steps(img: np.typing.NDArray[Any], F: int, d_thr: int, method: str = "auto", progress: Optional[Progress] = None) -> tuple[np.typing.NDArray[Any], np.typing.NDArray[Any]]:
+  """
+  Rebuilds only the JPEG compression steps that change with the threshold, the masked coefficients and the IDCT, reusing the cached DCT2 coefficients and their log magnitudes for the same image and F.
+
+  :param img: Image to compress.
+  :type img: np.typing.NDArray[Any]
+  :param F: Block size.
+  :type F: int
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :param method: Block transform backend, one of :data:`blocks.METHODS`, defaults to "auto".
+  :type method: str, optional
+  :param progress: Callback notified before each stage, which can raise to abort the pipeline, defaults to None.
+  :type progress: Optional[Progress], optional
+  :raises ValueError: If the image is not gray-scale.
+  :return: Visualization of the masked coefficients and reconstructed image, the steps 3 and 4 of :func:`jpeg_pipeline_steps`.
+  :rtype: tuple[np.typing.NDArray[Any], np.typing.NDArray[Any]]
+  """
+  steps = PipelineSteps(img, F, d_thr, method)
+  return steps.step(3, progress), steps.step(4, progress) # type: ignore
+
+def compress(img: np.typing.NDArray[Any], F: int, d_thr: int, cached: bool = True, method: str = "auto", edge: str = "crop") -> tuple[np.typing.NDArray[Any], dict[str, float]]:
+  """
+  Compresses an image, building only the reconstruction, and measures its quality straight from the reconstructed blocks, before reassembling them.
+  Padded images keep their original size, the reconstruction being a view of the padded one.
+
+  :param img: Image to compress.
+  :type img: np.typing.NDArray[Any]
+  :param F: Block size.
+  :type F: int
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :param cached: Whether to reuse the cached DCT2 coefficients of the same image and F, defaults to True.
+  :type cached: bool, optional
+  :param method: Block transform backend, one of :data:`blocks.METHODS`, defaults to "auto".
+  :type method: str, optional
+  :param edge: Handling of the partial blocks, one of :data:`blocks.EDGES`, defaults to "crop".
+  :type edge: str, optional
+  :raises ValueError: If the image is not gray-scale, the edge handling is unknown or the image is cropped to less than a block.
+  :return: Reconstructed image, the step 4 of :func:`jpeg_pipeline_steps` when cropped, and its metrics: MSE, PSNR, block-wise SSIM (of whole blocks only), number and fraction of retained coefficients, including those of padded blocks.
+  :rtype: tuple[np.typing.NDArray[Any], dict[str, float]]
+  """
+  if img.ndim != 2:
+    raise ValueError("Image must be gray-scale!")
+  if edge not in EDGES:
+    raise ValueError(f"Edge must be one of {', '.join(EDGES)}!")
+
+  with stage("crop"):
+    cropped, width, height = crop(img, F)
+    if edge == "crop" and (width == 0 or height == 0):
+      raise ValueError("Image must be at least one block wide and high!")
+  with stage("dct"):
+    coeffs = block_coefficients(img, F, cached, method, edge)
+  with stage("mask"):
+    packed = pack(coeffs, d_thr)
+  with stage("idct"):
+    rec = packed_idct(packed, F, d_thr, method=method)
+  with stage("metrics"):
+    metrics = block_quality(block_view(cropped, F), rec) if edge == "crop" else padded_quality(img, rec)
+  count("blocks", coeffs.shape[0] * coeffs.shape[1])
+  reconstructed = unblock(rec) if edge == "crop" else unblock(rec)[: img.shape[0], : img.shape[1]] # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
+  return reconstructed, {**metrics, "retained": packed.size, "fraction": packed.shape[-1] / F**2}
+
+def sweep(img: np.typing.NDArray[Any], F: int, d_values: list[int]) -> tuple[np.typing.NDArray[Any], list[dict[str, float]]]:
+  """
+  Compresses the same image with many thresholds, computing the blockwise DCT2 only once. Each threshold is then reconstructed by its own IDCT2 of its packed coefficients, since thresholds keep different numbers of coefficients, and the reconstructions are stacked.
+
+  :param img: Image to compress.
+  :type img: np.typing.NDArray[Any]
+  :param F: Block size.
+  :type F: int
+  :param d_values: Thresholds.
+  :type d_values: list[int]
+  :raises ValueError: If the image is not gray-scale or is smaller than a block.
+  :return: (len(d_values), H, W) array with the reconstruction for each threshold along with, for each threshold, the number and fraction of retained coefficients, the MSE, the PSNR and the block-wise SSIM.
+  :rtype: tuple[np.typing.NDArray[Any], list[dict[str, float]]]
+  """
+  if img.ndim != 2:
+    raise ValueError("Image must be gray-scale!")
+
+  with stage("crop"):
+    cropped, width, height = crop(img, F)
+    if width == 0 or height == 0:
+      raise ValueError("Image must be at least one block wide and high!")
+  with stage("dct"):
+    coeffs = block_coefficients(img, F)
+  with stage("mask"):
+    packs = [pack(coeffs, d_thr) for d_thr in d_values]
+  with stage("idct"):
+    recs = np.stack([packed_idct(packed, F, d_thr) for d_thr, packed in zip(d_values, packs)])
+  count("blocks", len(d_values) * coeffs.shape[0] * coeffs.shape[1])
+  reference = block_view(cropped, F)
+
+  rows: list[dict[str, float]] = []
+  with stage("metrics"):
+    for d_thr, packed, rec in zip(d_values, packs, recs):
+      rows.append({"d": d_thr, "retained": packed.size, "fraction": packed.shape[-1] / F**2, **block_quality(reference, rec)})
+  return np.stack([unblock(rec) for rec in recs]), rows
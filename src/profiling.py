@@ -0,0 +1,175 @@
+import os
+import json
+import threading
+import tracemalloc
+from pathlib import Path
+from time import perf_counter_ns
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Iterator, Optional
+
+class Profiler:
+  """
+  Collects the duration and, optionally, the memory allocated by each stage of the compression, along with event counters.
+  """
+  def __init__(self, memory: bool = False) -> None:
+    """
+    :param memory: Whether to trace memory allocations too, which slows down the code considerably, defaults to False.
+    :type memory: bool, optional
+    """
+    self.memory = memory
+    """
+    Whether memory allocations are traced.
+    """
+    self.events: list[dict[str, Any]] = []
+    """
+    Recorded stages, with their name, thread, start and duration in nanoseconds and, if memory is traced, the net and peak allocated bytes.
+    """
+    self.counters: dict[str, int] = {}
+    """
+    Event counters, such as the number of transformed blocks.
+    """
+    self._origin = perf_counter_ns()
+    self._owns_tracing = memory and not tracemalloc.is_tracing()
+    if self._owns_tracing:
+      tracemalloc.start()
+
+  @contextmanager
+  def stage(self, name: str) -> Iterator[None]:
+    """
+    Records the execution of a stage.
+    Memory peaks of nested stages are not reliable, since each stage resets the peak.
+
+    :param name: Stage name.
+    :type name: str
+    """
+    if self.memory:
+      tracemalloc.reset_peak()
+      before = tracemalloc.get_traced_memory()[0]
+    start = perf_counter_ns()
+    try:
+      yield
+    finally:
+      event: dict[str, Any] = {"name": name, "tid": threading.get_ident(), "start": start - self._origin, "duration": perf_counter_ns() - start}
+      if self.memory:
+        current, peak = tracemalloc.get_traced_memory()
+        event["allocated"] = current - before
+        event["peak"] = peak - before
+      self.events.append(event)
+
+  def count(self, name: str, amount: int = 1) -> None:
+    """
+    Increments an event counter.
+
+    :param name: Counter name.
+    :type name: str
+    :param amount: Increment, defaults to 1.
+    :type amount: int, optional
+    """
+    self.counters[name] = self.counters.get(name, 0) + amount
+
+  def summary(self) -> list[dict[str, float]]:
+    """
+    Aggregates the recorded stages by name.
+
+    :return: For each stage, in order of first execution, the number of calls, total and mean milliseconds and, if memory is traced, the largest net and peak MiB allocated.
+    :rtype: list[dict[str, float]]
+    """
+    stages: dict[str, dict[str, Any]] = {}
+    for event in self.events:
+      row = stages.setdefault(event["name"], {"stage": event["name"], "calls": 0, "total_ms": 0.0})
+      row["calls"] += 1
+      row["total_ms"] += event["duration"] / 1e6
+      if self.memory:
+        row["allocated_mib"] = max(row.get("allocated_mib", -float("inf")), event["allocated"] / 2**20)
+        row["peak_mib"] = max(row.get("peak_mib", 0.0), event["peak"] / 2**20)
+    return [{"stage": row.pop("stage"), "calls": row["calls"], "total_ms": row["total_ms"], "mean_ms": row["total_ms"] / row["calls"], **row} for row in stages.values()]
+
+  def chrome_trace(self) -> dict[str, Any]:
+    """
+    Converts the recorded stages and counters into the Chrome trace event format, viewable in chrome://tracing or Perfetto.
+
+    :return: Trace with one complete event per stage and the counters as metadata.
+    :rtype: dict[str, Any]
+    """
+    pid = os.getpid()
+    events = [{"name": event["name"], "cat": "pipeline", "ph": "X", "pid": pid, "tid": event["tid"], "ts": event["start"] / 1e3, "dur": event["duration"] / 1e3, "args": {key: event[key] for key in ("allocated", "peak") if key in event}} for event in self.events]
+    return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"counters": self.counters}}
+
+  def close(self) -> None:
+    """
+    Stops the memory tracing, if this profiler started it.
+    """
+    if self._owns_tracing:
+      tracemalloc.stop()
+      self._owns_tracing = False
+
+  def export(self, path: Path) -> None:
+    """
+    Saves the Chrome trace to a JSON file.
+
+    :param path: Path of the trace file.
+    :type path: Path
+    """
+    path.write_text(json.dumps(self.chrome_trace()), encoding="utf-8")
+
+_profiler: Optional[Profiler] = None
+
+def enable(memory: bool = False) -> Profiler:
+  """
+  Starts profiling the instrumented code with a new profiler.
+
+  :param memory: Whether to trace memory allocations too, defaults to False.
+  :type memory: bool, optional
+  :return: The new active profiler.
+  :rtype: Profiler
+  """
+  global _profiler # pylint: disable=global-statement
+  if _profiler is not None:
+    _profiler.close()
+  _profiler = Profiler(memory)
+  return _profiler
+
+def disable() -> Optional[Profiler]:
+  """
+  Stops profiling, also stopping the memory tracing if the profiler started it.
+
+  :return: The profiler that was active, if any, to inspect its results.
+  :rtype: Optional[Profiler]
+  """
+  global _profiler # pylint: disable=global-statement
+  profiler, _profiler = _profiler, None
+  if profiler is not None:
+    profiler.close()
+  return profiler
+
+def active() -> Optional[Profiler]:
+  """
+  Returns the active profiler.
+
+  :return: The active profiler, None when profiling is off.
+  :rtype: Optional[Profiler]
+  """
+  return _profiler
+
+def stage(name: str) -> ContextManager[None]:
+  """
+  Records a stage with the active profiler, doing nothing when profiling is off.
+
+  :param name: Stage name.
+  :type name: str
+  :return: Context manager wrapping the stage.
+  :rtype: ContextManager[None]
+  """
+  return nullcontext() if _profiler is None else _profiler.stage(name)
+
+def count(name: str, amount: int = 1) -> None:
+  """
+  Increments an event counter of the active profiler, doing nothing when profiling is off.
+
+  :param name: Counter name.
+  :type name: str
+  :param amount: Increment, defaults to 1.
+  :type amount: int, optional
+  """
+  if _profiler is not None:
+    _profiler.count(name, amount)
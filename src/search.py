@@ -0,0 +1,132 @@
+from functools import partial
+from typing import Any, Callable, Optional
+import numpy as np
+from pipeline import compress
+from codec import encode
+from profiling import count
+
+TARGETS = ("psnr", "fraction", "bytes")
+"""
+Available search targets: a minimum PSNR in dB, a maximum fraction of retained coefficients or a maximum size in bytes of the compressed file.
+"""
+
+DEFAULT_FS = (4, 8, 16, 32)
+"""
+Block sizes searched when none are given.
+"""
+
+def _first(lo: int, hi: int, predicate: Callable[[int], bool]) -> int:
+  """
+  Bisects the smallest integer in [lo, hi] that satisfies a monotone predicate, false up to some point and true from there on.
+
+  :param lo: Smallest candidate.
+  :type lo: int
+  :param hi: Largest candidate.
+  :type hi: int
+  :param predicate: Monotone predicate.
+  :type predicate: Callable[[int], bool]
+  :return: Smallest candidate satisfying the predicate, hi + 1 if none does.
+  :rtype: int
+  """
+  hi += 1
+  while lo < hi:
+    mid = (lo + hi) // 2
+    if predicate(mid):
+      hi = mid
+    else:
+      lo = mid + 1
+  return lo
+
+def _evaluate(img: np.typing.NDArray[Any], F: int, d_thr: int, target: str, q: float, evaluated: dict[int, dict[str, float]]) -> dict[str, float]:
+  """
+  Compresses an image with a candidate threshold, unless already done for the same block size.
+
+  :param img: Gray-scale image.
+  :type img: np.typing.NDArray[Any]
+  :param F: Block size.
+  :type F: int
+  :param d_thr: Candidate threshold.
+  :type d_thr: int
+  :param target: Search target, one of :data:`TARGETS`.
+  :type target: str
+  :param q: Quantization step of the compressed file, for a size target.
+  :type q: float
+  :param evaluated: Candidates already evaluated for the block size, by threshold, updated in place.
+  :type evaluated: dict[int, dict[str, float]]
+  :return: F and d with their metrics, along with the file size for a size target.
+  :rtype: dict[str, float]
+  """
+  if d_thr not in evaluated:
+    _, metrics = compress(img, F, d_thr)
+    if target == "bytes":
+      metrics["bytes"] = len(encode(img, F, d_thr, q))
+    evaluated[d_thr] = {"F": F, "d": d_thr, **metrics}
+  return evaluated[d_thr]
+
+def _reaches(d_thr: int, img: np.typing.NDArray[Any], F: int, target: str, value: float, q: float, evaluated: dict[int, dict[str, float]]) -> bool:
+  """
+  Checks whether a candidate threshold reaches the target value: at least the target PSNR, or more than the budget of retained coefficients or bytes. Either way, it holds from some threshold on.
+
+  :param d_thr: Candidate threshold.
+  :type d_thr: int
+  :param img: Gray-scale image.
+  :type img: np.typing.NDArray[Any]
+  :param F: Block size.
+  :type F: int
+  :param target: Search target, one of :data:`TARGETS`.
+  :type target: str
+  :param value: Target PSNR in dB, fraction of retained coefficients or size in bytes.
+  :type value: float
+  :param q: Quantization step of the compressed file, for a size target.
+  :type q: float
+  :param evaluated: Candidates already evaluated for the block size, by threshold, updated in place.
+  :type evaluated: dict[int, dict[str, float]]
+  :return: Whether the target value is reached.
+  :rtype: bool
+  """
+  metrics = _evaluate(img, F, d_thr, target, q, evaluated)
+  return metrics["psnr"] >= value if target == "psnr" else metrics[target] > value
+
+def search(img: np.typing.NDArray[Any], target: str, value: float, Fs: Optional[list[int]] = None, q: float = 1.0) -> tuple[dict[str, float], list[dict[str, float]]]:
+  """
+  Searches the block size and threshold that best meet a target: the fewest retained coefficients with at least the given PSNR, or the highest PSNR within the given fraction of retained coefficients or compressed file size.
+  For each block size F the threshold is bisected over [1, 2F - 1], since the PSNR, the retained coefficients and the file size all grow with d. The DCT2 of each F is computed once and cached, so each candidate threshold only costs a mask and an IDCT2 (and an entropy coding for a size target).
+
+  :param img: Gray-scale image.
+  :type img: np.typing.NDArray[Any]
+  :param target: Search target, one of :data:`TARGETS`.
+  :type target: str
+  :param value: Target PSNR in dB, fraction of retained coefficients or size in bytes.
+  :type value: float
+  :param Fs: Block sizes to search, defaults to None for :data:`DEFAULT_FS` (only those fitting the image are searched).
+  :type Fs: Optional[list[int]], optional
+  :param q: Quantization step of the compressed file, for a size target, defaults to 1.0.
+  :type q: float, optional
+  :raises ValueError: If the target is unknown, the image is not gray-scale, a given block size is larger than the image or no block size can meet the target.
+  :return: Best F and d with their metrics (see :func:`pipeline.compress`, along with the file size for a size target), and the best threshold found for each block size.
+  :rtype: tuple[dict[str, float], list[dict[str, float]]]
+  """
+  if target not in TARGETS:
+    raise ValueError(f"Target must be one of {', '.join(TARGETS)}!")
+  if img.ndim != 2:
+    raise ValueError("Image must be gray-scale!")
+
+  if Fs and max(Fs) > min(img.shape):
+    raise ValueError("Block sizes must fit in the image!")
+
+  candidates: list[dict[str, float]] = []
+  for F in Fs or [F for F in DEFAULT_FS if F <= min(img.shape)]:
+    evaluated: dict[int, dict[str, float]] = {}
+    d_thr = _first(1, 2 * F - 1, partial(_reaches, img=img, F=F, target=target, value=value, q=q, evaluated=evaluated))
+    if target != "psnr":
+      d_thr -= 1 # Last threshold within the budget.
+    count("candidates", len(evaluated))
+    if 1 <= d_thr <= 2 * F - 1:
+      candidates.append(_evaluate(img, F, d_thr, target, q, evaluated))
+  if not candidates:
+    raise ValueError("No block size can meet the target!")
+  if target == "psnr":
+    best = min(candidates, key=lambda row: (row["fraction"], -row["psnr"]))
+  else:
+    best = max(candidates, key=lambda row: (row["psnr"], row["ssim"]))
+  return best, candidates
@@ -0,0 +1,219 @@
+import math
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Iterator, Optional
+from PIL import Image, ImageSequence
+import numpy as np
+from blocks import block_view, blockwise_dct, get_precision, pack, packed_idct, zigzag_indices
+from fileio import IMAGE_EXTENSIONS, BackgroundSaver, prefetch
+from metrics import block_scores, psnr
+from profiling import stage, count
+
+FRAME_EXTENSIONS = IMAGE_EXTENSIONS + (".tif", ".tiff")
+"""
+File extensions picked up as frames when scanning a directory.
+"""
+
+def find_frames(directory: Path) -> list[Path]:
+  """
+  Lists the frames directly inside a directory, in order of their names.
+
+  :param directory: Directory to scan.
+  :type directory: Path
+  :return: Paths of the frames found.
+  :rtype: list[Path]
+  """
+  return sorted(path for path in directory.iterdir() if path.is_file() and path.suffix.lower() in FRAME_EXTENSIONS)
+
+def read_frames(source: Path) -> Iterator[tuple[str, np.typing.NDArray[np.uint8]]]:
+  """
+  Streams the gray-scale frames of a sequence, either the images in a directory, decoded ahead in the background, or the pages of a multi-page TIFF, decoded one at a time.
+
+  :param source: Directory of frames or multi-page TIFF.
+  :type source: Path
+  :return: Iterator over the name and pixels of each frame.
+  :rtype: Iterator[tuple[str, np.typing.NDArray[np.uint8]]]
+  """
+  if source.is_dir():
+    for path, frame in prefetch(find_frames(source)):
+      yield path.name, frame.result()
+    return
+  with Image.open(source) as img:
+    for idx, page in enumerate(ImageSequence.Iterator(img)):
+      with stage("load"):
+        frame = np.array(page.convert("L"))
+      yield f"{source.name}[{idx}]", frame
+
+def changed_blocks(frame: np.typing.NDArray[Any], previous: np.typing.NDArray[Any], F: int) -> np.typing.NDArray[np.bool_]:
+  """
+  Finds the blocks whose pixels differ between two frames of the same shape, with sides divisible by F.
+  Pixels are compared as the widest unsigned integers, up to 8 bytes, that rows of a block and rows of both frames are made of, so that 8×8 blocks of 8-bit pixels take a single comparison per row.
+
+  :param frame: Current frame.
+  :type frame: np.typing.NDArray[Any]
+  :param previous: Previous frame.
+  :type previous: np.typing.NDArray[Any]
+  :param F: Block size.
+  :type F: int
+  :return: (H/F, W/F) mask of the changed blocks.
+  :rtype: np.typing.NDArray[np.bool_]
+  """
+  h, w = frame.shape
+  row = F * frame.itemsize
+  word = 1
+  if frame.dtype == previous.dtype and frame.strides[1] == previous.strides[1] == frame.itemsize:
+    word = math.gcd(row, 8, frame.strides[0], previous.strides[0])
+  if word == 1:
+    return np.any(block_view(frame, F) != block_view(previous, F), axis=(2, 3))
+  words = np.dtype(f"u{word}")
+  return np.any((frame.view(words) != previous.view(words)).reshape(h // F, F, w // F, row // word), axis=(1, 3))
+
+class SequenceCompressor:
+  """
+  Compresses the frames of a sequence one after the other, recomputing only the blocks whose pixels changed since the previous frame.
+  The packed coefficients, the reconstruction and the quality scores of every block are kept between frames, so unchanged blocks cost a single comparison of their pixels.
+  """
+  def __init__(self, F: int, d_thr: int, method: str = "auto") -> None:
+    """
+    :param F: Block size.
+    :type F: int
+    :param d_thr: Threshold.
+    :type d_thr: int
+    :param method: Block transform backend, one of :data:`blocks.METHODS`, defaults to "auto".
+    :type method: str, optional
+    """
+    self.F = F
+    """
+    Block size.
+    """
+    self.d_thr = d_thr
+    """
+    Threshold.
+    """
+    self.method = method
+    """
+    Block transform backend.
+    """
+    self.packed: np.typing.NDArray[Any] = np.empty((0, 0, 0))
+    """
+    (H/F, W/F, K) array with the packed coefficients of each block of the last frame, see :func:`blocks.pack`.
+    """
+    self.reconstruction: np.typing.NDArray[np.uint8] = np.empty((0, 0), dtype=np.uint8)
+    """
+    Reconstruction of the last frame, whose changed blocks are overwritten by each frame.
+    """
+    self._frame: np.typing.NDArray[Any] = np.empty((0, 0), dtype=np.uint8)
+    self._errors: np.typing.NDArray[np.float64] = np.empty((0, 0))
+    self._ssims: np.typing.NDArray[np.float64] = np.empty((0, 0))
+
+  def compress(self, frame: np.typing.NDArray[Any]) -> tuple[np.typing.NDArray[np.uint8], dict[str, float]]:
+    """
+    Compresses the next frame, cropped to be divisible in blocks. Frames whose cropped size differs from the previous one are compressed from scratch.
+    The frame is kept to be compared with the next one, so it must not be modified afterwards.
+
+    :param frame: Gray-scale frame.
+    :type frame: np.typing.NDArray[Any]
+    :raises ValueError: If the frame is not gray-scale or is smaller than a block.
+    :return: Reconstructed frame and its results: number of blocks and of recomputed blocks, MSE, PSNR and block-wise SSIM.
+    :rtype: tuple[np.typing.NDArray[np.uint8], dict[str, float]]
+    """
+    F = self.F
+    if frame.ndim != 2:
+      raise ValueError("Frame must be gray-scale!")
+    with stage("crop"):
+      h, w = frame.shape[0] - frame.shape[0] % F, frame.shape[1] - frame.shape[1] % F
+      if h == 0 or w == 0:
+        raise ValueError("Frame must be at least one block wide and high!")
+      cropped = frame[:h, :w]
+    blocks = block_view(cropped, F)
+    with stage("diff"):
+      if self._frame.shape != cropped.shape:
+        changed = np.ones(blocks.shape[:2], dtype=bool)
+        self.packed = np.empty(blocks.shape[:2] + zigzag_indices(F, self.d_thr)[0].shape, dtype=get_precision())
+        self.reconstruction = np.empty(cropped.shape, dtype=np.uint8)
+        self._errors, self._ssims = np.empty(blocks.shape[:2]), np.empty(blocks.shape[:2])
+      else:
+        changed = changed_blocks(cropped, self._frame, F)
+      stack = blocks[changed] # (n, F, F) copy of the changed blocks only.
+    if len(stack):
+      with stage("dct"):
+        coeffs = blockwise_dct(stack.reshape(-1, F), F, method=self.method) # Blocks stacked as a single column, so they still split in bands of block rows.
+      with stage("mask"):
+        packed = pack(coeffs, self.d_thr)[:, 0]
+      with stage("idct"):
+        rec = packed_idct(packed[:, None], F, self.d_thr, method=self.method)[:, 0]
+      with stage("metrics"):
+        errors, ssims = block_scores(stack, rec)
+      self.packed[changed] = packed
+      block_view(self.reconstruction, F)[changed] = rec.astype(np.uint8)
+      self._errors[changed] = errors
+      self._ssims[changed] = ssims
+    self._frame = cropped
+    recomputed = int(changed.sum())
+    count("blocks", recomputed)
+    count("skipped_blocks", changed.size - recomputed)
+    mse = max(float(self._errors.sum()), 0.0) / cropped.size
+    return self.reconstruction.copy(), {"blocks": changed.size, "changed": recomputed, "mse": mse, "psnr": psnr(mse), "ssim": float(self._ssims.mean())}
+
+def frame_output_path(name: str, output_dir: Path, F: int, d_thr: int) -> Path:
+  """
+  Builds the path of a compressed frame, named like the compressed images of :func:`batch.output_path`, with the page number of multi-page TIFF frames.
+
+  :param name: Frame name, as given by :func:`read_frames`.
+  :type name: str
+  :param output_dir: Directory where to save the compressed frame.
+  :type output_dir: Path
+  :param F: Block size.
+  :type F: int
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :return: Path of the compressed frame.
+  :rtype: Path
+  """
+  stem, _, page = name.partition("[")
+  stem = Path(stem).stem + (f"_{int(page.rstrip(']')):04d}" if page else "")
+  return output_dir / f"{stem}_step_4_{F}_{d_thr}.bmp"
+
+def compress_sequence(source: Path, F: int, d_thr: int, output_dir: Optional[Path] = None, method: str = "auto") -> tuple[list[dict[str, Any]], dict[str, float]]:
+  """
+  Compresses the frames of a directory or multi-page TIFF in order, recomputing only the blocks that changed since the previous frame, see :class:`SequenceCompressor`.
+  Frames are decoded ahead and the compressed ones saved in the background.
+
+  :param source: Directory of frames or multi-page TIFF.
+  :type source: Path
+  :param F: Block size.
+  :type F: int
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :param output_dir: Directory where to save the compressed frames, created if missing, defaults to None to not save them.
+  :type output_dir: Optional[Path], optional
+  :param method: Block transform backend, one of :data:`blocks.METHODS`, defaults to "auto".
+  :type method: str, optional
+  :raises ValueError: If a frame is not gray-scale or is smaller than a block.
+  :return: Results of each frame (see :meth:`SequenceCompressor.compress`, along with the frame name and its seconds), and a summary with the number of frames, the elapsed seconds, the throughput in frames per second and the fraction of the blocks recomputed.
+  :rtype: tuple[list[dict[str, Any]], dict[str, float]]
+  """
+  compressor = SequenceCompressor(F, d_thr, method)
+  rows: list[dict[str, Any]] = []
+  blocks = 0
+  changed = 0
+  if output_dir is not None:
+    output_dir.mkdir(parents=True, exist_ok=True)
+  start = perf_counter()
+  with BackgroundSaver() as saver:
+    for name, frame in read_frames(source):
+      begin = perf_counter()
+      rec, results = compressor.compress(frame)
+      if output_dir is not None:
+        saver.save(rec, frame_output_path(name, output_dir, F, d_thr))
+      rows.append({"frame": name, **results, "seconds": perf_counter() - begin})
+      blocks += results["blocks"]
+      changed += results["changed"]
+    saver.wait()
+  elapsed = perf_counter() - start
+  return rows, {
+    "frames": len(rows),
+    "seconds": elapsed,
+    "frames_per_second": len(rows) / elapsed if elapsed > 0 else 0.0,
+    "changed_fraction": changed / blocks if blocks else 0.0
+  }
@@ -0,0 +1,145 @@
+import struct
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+from PIL import Image
+import numpy as np
+from blocks import block_view, blockwise_dct, pack, packed_idct
+
+BMP_HEADER_SIZE = 14 + 40 + 256 * 4
+"""
+Size of the headers of an 8-bit gray-scale BMP: file header, info header and a 256 colors palette.
+"""
+
+def _row_stride(width: int) -> int:
+  """
+  Computes the number of bytes of an 8-bit BMP row, which is padded to a multiple of 4.
+
+  :param width: Image width.
+  :type width: int
+  :return: Row size in bytes.
+  :rtype: int
+  """
+  return (width + 3) & ~3
+
+def open_bmp(path: Path) -> np.typing.NDArray[np.uint8]:
+  """
+  Memory-maps the pixels of an uncompressed 8-bit gray-scale BMP, without reading them.
+
+  :param path: Path of the BMP image.
+  :type path: Path
+  :raises ValueError: If the image is not an uncompressed 8-bit BMP with a gray-scale palette.
+  :return: Read-only H×W view of the pixels, top row first.
+  :rtype: np.typing.NDArray[np.uint8]
+  """
+  with open(path, "rb") as file:
+    header = file.read(54)
+    if len(header) < 54 or header[:2] != b"BM":
+      raise ValueError("Image must be a BMP!")
+    offset, dib_size, width, height, _, bpp, compression = struct.unpack_from("<I I i i H H I", header, 10)
+    colors = struct.unpack_from("<I", header, 46)[0] if dib_size >= 40 else 0
+    if bpp != 8 or compression != 0:
+      raise ValueError("BMP must be uncompressed with 8 bits per pixel!")
+    file.seek(14 + dib_size)
+    palette = np.frombuffer(file.read(4 * (colors or 256)), dtype=np.uint8).reshape(-1, 4)
+  if not np.array_equal(palette[:, :3], np.repeat(np.arange(len(palette), dtype=np.uint8)[:, None], 3, axis=1)):
+    raise ValueError("BMP must have a gray-scale palette!")
+  rows = np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(abs(height), _row_stride(width)))[:, :width]
+  return rows[::-1] if height > 0 else rows # Positive heights mean bottom-up rows.
+
+def create_bmp(path: Path, height: int, width: int) -> np.typing.NDArray[np.uint8]:
+  """
+  Creates an 8-bit gray-scale BMP and memory-maps its pixels for writing.
+
+  :param path: Path of the BMP image.
+  :type path: Path
+  :param height: Image height.
+  :type height: int
+  :param width: Image width.
+  :type width: int
+  :return: Writable H×W view of the pixels, top row first.
+  :rtype: np.typing.NDArray[np.uint8]
+  """
+  image_size = _row_stride(width) * height
+  with open(path, "wb") as file:
+    file.write(struct.pack("<2s I H H I", b"BM", BMP_HEADER_SIZE + image_size, 0, 0, BMP_HEADER_SIZE))
+    file.write(struct.pack("<I i i H H I I i i I I", 40, width, height, 1, 8, 0, image_size, 2835, 2835, 256, 0))
+    file.write(np.repeat(np.arange(256, dtype=np.uint8)[:, None], 4, axis=1).tobytes())
+    file.truncate(BMP_HEADER_SIZE + image_size)
+  rows = np.memmap(path, dtype=np.uint8, mode="r+", offset=BMP_HEADER_SIZE, shape=(height, _row_stride(width)))[:, :width]
+  return rows[::-1] # Bottom-up rows.
+
+def open_image(path: Path) -> np.typing.NDArray[Any]:
+  """
+  Opens a gray-scale image, memory-mapping it when it is an 8-bit BMP or a NumPy .npy file.
+  Any other format is fully decoded in memory.
+
+  :param path: Path of the image.
+  :type path: Path
+  :return: H×W image.
+  :rtype: np.typing.NDArray[Any]
+  """
+  if path.suffix.lower() == ".npy":
+    return np.load(path, mmap_mode="r")
+  if path.suffix.lower() == ".bmp":
+    try:
+      return open_bmp(path)
+    except ValueError:
+      pass
+  return np.array(Image.open(path).convert("L"))
+
+def create_image(path: Path, height: int, width: int) -> np.typing.NDArray[np.uint8]:
+  """
+  Creates a memory-mapped gray-scale image, either a NumPy .npy file or, for any other extension, an 8-bit BMP.
+
+  :param path: Path of the image.
+  :type path: Path
+  :param height: Image height.
+  :type height: int
+  :param width: Image width.
+  :type width: int
+  :return: Writable H×W view of the pixels.
+  :rtype: np.typing.NDArray[np.uint8]
+  """
+  if path.suffix.lower() == ".npy":
+    return np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=(height, width))
+  return create_bmp(path, height, width)
+
+def compress_streaming(input_path: Path, output_path: Path, F: int, d_thr: int, strip_rows: int = 0) -> dict[str, float]:
+  """
+  Compresses an image strip by strip, reading the input and writing the output through memory maps so that peak memory depends only on the strip size.
+  Like the in-memory pipeline, the image is cropped to be perfectly divisible in blocks of side length F.
+
+  :param input_path: Path of the image to compress, an 8-bit gray-scale BMP or .npy file to avoid loading it entirely.
+  :type input_path: Path
+  :param output_path: Path of the compressed image, a .npy file or otherwise an 8-bit BMP.
+  :type output_path: Path
+  :param F: Block size.
+  :type F: int
+  :param d_thr: Threshold.
+  :type d_thr: int
+  :param strip_rows: Number of rows of each strip, rounded down to a multiple of F, defaults to F.
+  :type strip_rows: int, optional
+  :raises ValueError: If the image is not gray-scale or is smaller than a block.
+  :return: Summary with the compressed image height and width, the number of strips and the elapsed seconds.
+  :rtype: dict[str, float]
+  """
+  start = perf_counter()
+  img = open_image(input_path)
+  if img.ndim != 2:
+    raise ValueError("Image must be gray-scale!")
+  h, w = img.shape
+  height, width = h - h % F, w - w % F
+  if height == 0 or width == 0:
+    raise ValueError("Image must be at least one block wide and high!")
+  strip_rows = max(F, strip_rows - strip_rows % F)
+  out = create_image(output_path, height, width)
+  strips = 0
+  for y in range(0, height, strip_rows):
+    strip = img[y : min(y + strip_rows, height), :width] # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
+    coeffs = blockwise_dct(strip, F)
+    block_view(out[y : y + strip.shape[0]], F)[...] = packed_idct(pack(coeffs, d_thr), F, d_thr) # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
+    strips += 1
+  if isinstance(out, np.memmap):
+    out.flush()
+  return {"height": height, "width": width, "strips": strips, "seconds": perf_counter() - start}
@@ -0,0 +1,176 @@
+import queue
+from threading import Event
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+class Cancelled(Exception):
+  """
+  Raised inside a task to abort it once it has been cancelled or superseded.
+  """
+
+class Task:
+  """
+  Unit of work submitted to a :class:`BackgroundWorker`, with the callbacks to run on the UI thread.
+  """
+  def __init__(self, worker: "BackgroundWorker", on_result: Callable[[Any], None], on_error: Optional[Callable[[Exception], None]], on_progress: Optional[Callable[[str, float], None]]) -> None:
+    """
+    :param worker: Worker running the task.
+    :type worker: BackgroundWorker
+    :param on_result: Callback receiving the result.
+    :type on_result: Callable[[Any], None]
+    :param on_error: Callback receiving the exception raised by the task.
+    :type on_error: Optional[Callable[[Exception], None]]
+    :param on_progress: Callback receiving the name of the current stage and the fraction completed.
+    :type on_progress: Optional[Callable[[str, float], None]]
+    """
+    self._worker = worker
+    self._cancelled = Event()
+    self.on_result = on_result
+    """
+    Callback receiving the result.
+    """
+    self.on_error = on_error
+    """
+    Callback receiving the exception raised by the task.
+    """
+    self.on_progress = on_progress
+    """
+    Callback receiving the name of the current stage and the fraction completed.
+    """
+
+  @property
+  def cancelled(self) -> bool:
+    """
+    Whether the task has been cancelled or superseded.
+    """
+    return self._cancelled.is_set()
+
+  def cancel(self) -> None:
+    """
+    Cancels the task: it won't start if still queued, it will stop at its next progress report if running and its callbacks won't be called anymore.
+    """
+    self._cancelled.set()
+
+  def progress(self, name: str, fraction: float) -> None:
+    """
+    Reports the progress of the task to the UI thread, to be passed as the progress callback of the running function.
+
+    :param name: Name of the current stage.
+    :type name: str
+    :param fraction: Fraction completed.
+    :type fraction: float
+    :raises Cancelled: If the task has been cancelled, to abort it.
+    """
+    if self.cancelled:
+      raise Cancelled()
+    if self.on_progress is not None:
+      self._worker.post(self, self.on_progress, name, fraction)
+
+class BackgroundWorker:
+  """
+  Runs tasks one at a time on a background thread, keeping only the latest one: submitting a task supersedes the previous one.
+  Tk widgets must be used only by the thread running the main loop, so callbacks are queued and run by :meth:`dispatch`, which the UI thread polls.
+  """
+  def __init__(self) -> None:
+    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="worker")
+    self._messages: queue.SimpleQueue[tuple[Task, Optional[Callable[..., None]], tuple[Any, ...], bool]] = queue.SimpleQueue()
+    self._current: Optional[Task] = None
+
+  @property
+  def busy(self) -> bool:
+    """
+    Whether a task is queued or running and not cancelled.
+    """
+    return self._current is not None
+
+  def submit(self, function: Callable[..., Any], *args: Any, on_result: Callable[[Any], None], on_error: Optional[Callable[[Exception], None]] = None, on_progress: Optional[Callable[[str, float], None]] = None) -> Task:
+    """
+    Cancels the current task, if any, and queues a new one.
+
+    :param function: Function to run, called with the given arguments and the keyword argument progress, a callback reporting progress that raises :class:`Cancelled` once the task is cancelled.
+    :type function: Callable[..., Any]
+    :param on_result: Callback receiving the result on the UI thread.
+    :type on_result: Callable[[Any], None]
+    :param on_error: Callback receiving the exception raised by the function on the UI thread, defaults to None.
+    :type on_error: Optional[Callable[[Exception], None]], optional
+    :param on_progress: Callback receiving the name of the current stage and the fraction completed on the UI thread, defaults to None.
+    :type on_progress: Optional[Callable[[str, float], None]], optional
+    :return: The new task.
+    :rtype: Task
+    """
+    self.cancel()
+    task = Task(self, on_result, on_error, on_progress)
+    self._current = task
+    self._executor.submit(self._run, task, function, args)
+    return task
+
+  def cancel(self) -> None:
+    """
+    Cancels the current task, if any.
+    """
+    if self._current is not None:
+      self._current.cancel()
+      self._current = None
+
+  def post(self, task: Task, callback: Optional[Callable[..., None]], *args: Any, final: bool = False) -> None:
+    """
+    Queues a callback of a task to be run on the UI thread.
+
+    :param task: Task the callback belongs to.
+    :type task: Task
+    :param callback: Callback, None to only end the task.
+    :type callback: Optional[Callable[..., None]]
+    :param final: Whether the callback ends the task, delivering its result or error, defaults to False.
+    :type final: bool, optional
+    """
+    self._messages.put((task, callback, args, final))
+
+  def dispatch(self) -> int:
+    """
+    Runs the queued callbacks, dropping those of cancelled tasks. Must be called by the UI thread.
+
+    :return: Number of callbacks run.
+    :rtype: int
+    """
+    run = 0
+    while True:
+      try:
+        task, callback, args, final = self._messages.get_nowait()
+      except queue.Empty:
+        return run
+      if task.cancelled:
+        continue
+      if final and task is self._current:
+        self._current = None
+      if callback is not None:
+        callback(*args)
+        run += 1
+
+  def shutdown(self) -> None:
+    """
+    Cancels the current task and stops the background thread without waiting for it.
+    """
+    self.cancel()
+    self._executor.shutdown(wait=False, cancel_futures=True)
+
+  def _run(self, task: Task, function: Callable[..., Any], args: tuple[Any, ...]) -> None:
+    """
+    Runs a task on the background thread, skipping it if it was superseded while queued.
+
+    :param task: Task to run.
+    :type task: Task
+    :param function: Function to run.
+    :type function: Callable[..., Any]
+    :param args: Function arguments.
+    :type args: tuple[Any, ...]
+    """
+    if task.cancelled:
+      return
+    try:
+      result = function(*args, progress=task.progress)
+    except Cancelled:
+      return
+    except Exception as exc: # pylint: disable=broad-exception-caught
+      self.post(task, task.on_error, exc, final=True)
+      return
+    self.post(task, task.on_result, result, final=True)
@@ -0,0 +1,60 @@
+import math
+import pytest
+import numpy as np
+from PIL import Image
+from pipeline import jpeg_pipeline_steps
+from batch import find_images, compress_file, batch_compress, main
+
+class TestBatch:
+  F = 8
+  D_THR = 10
+
+  @staticmethod
+  def _image() -> np.typing.NDArray[np.uint8]:
+    return np.random.default_rng(42).integers(0, 256, size=(20, 36)).astype(np.uint8)
+
+  def test_compress_file(self, tmp_path) -> None:
+    img = TestBatch._image()
+    Image.fromarray(img).save(tmp_path / "image.png")
+    out_path, metrics = compress_file(tmp_path / "image.png", tmp_path, TestBatch.F, TestBatch.D_THR)
+    assert out_path.name == f"image_step_4_{TestBatch.F}_{TestBatch.D_THR}.bmp", "Output name check failed!"
+    expected = jpeg_pipeline_steps(img, TestBatch.F, TestBatch.D_THR)[0][4]
+    assert np.array_equal(np.array(Image.open(out_path)), expected), "Compressed image check failed!"
+    assert math.isclose(metrics["mse"], float(np.mean((expected - img[:16, :32]) ** 2, dtype=np.float64))), "Compressed image metrics check failed!"
+
+  def test_compress_padded_file(self, tmp_path) -> None:
+    Image.fromarray(TestBatch._image()).save(tmp_path / "image.png")
+    out_path, _ = compress_file(tmp_path / "image.png", tmp_path, TestBatch.F, TestBatch.D_THR, edge="replicate")
+    assert np.array(Image.open(out_path)).shape == (20, 36), "Padded image size check failed!"
+
+  def test_compress_color_file(self, tmp_path) -> None:
+    img = np.random.default_rng(42).integers(0, 256, size=(20, 36, 3)).astype(np.uint8)
+    Image.fromarray(img).save(tmp_path / "image.png")
+    out_path, metrics = compress_file(tmp_path / "image.png", tmp_path, TestBatch.F, TestBatch.D_THR, "4:2:0")
+    assert np.array(Image.open(out_path)).shape == (16, 32, 3) and metrics["fraction"] < 1, "Compressed color image check failed!"
+    with pytest.raises(ValueError):
+      batch_compress(tmp_path, tmp_path / "output", TestBatch.F, TestBatch.D_THR, subsampling="4:2:0", edge="reflect")
+    with pytest.raises(SystemExit):
+      main([str(tmp_path), str(tmp_path / "output"), str(TestBatch.F), str(TestBatch.D_THR), "--color", "4:2:0", "--edge", "reflect"])
+
+  def test_batch_compress(self, tmp_path) -> None:
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    for name in ("a.bmp", "b.png"):
+      Image.fromarray(TestBatch._image()).save(input_dir / name)
+    (input_dir / "notes.txt").write_text("not an image")
+    (input_dir / "broken.png").write_text("not an image either")
+    assert [path.name for path in find_images(input_dir)] == ["a.bmp", "b.png", "broken.png"], "Image discovery check failed!"
+    summary = batch_compress(input_dir, tmp_path / "output", TestBatch.F, TestBatch.D_THR, workers=1, report=tmp_path / "report.csv")
+    assert summary["images"] == 2 and summary["failed"] == 1 and 0 < summary["mean_ssim"] < 1, "Batch summary check failed!"
+    assert len(list((tmp_path / "output").iterdir())) == 2, "Batch output check failed!"
+    report = (tmp_path / "report.csv").read_text(encoding="utf-8").splitlines()
+    assert report[0].startswith("image,F,d,mse,psnr,ssim") and report[1].startswith("a.bmp,") and len(report) == 3, "Batch report check failed!"
+
+  def test_rejects_workers(self, tmp_path) -> None:
+    for workers in ("0", "-1"):
+      with pytest.raises(SystemExit):
+        main([str(tmp_path), str(tmp_path / "output"), str(TestBatch.F), str(TestBatch.D_THR), "--workers", workers])
+
+if __name__ == "__main__":
+  pytest.main()
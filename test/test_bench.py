@@ -0,0 +1,39 @@
+import sys
+import math
+import subprocess
+from pathlib import Path
+import pytest
+from bench import KEYS, benchmark_pipeline, benchmark_startup, save_results, load_results, compare
+
+@pytest.fixture(scope="module")
+def results():
+  return benchmark_pipeline(sizes=[64], Fs=[8, 16], ds=[4], repeats=1)
+
+class TestBench:
+  def test_benchmark_pipeline(self, results) -> None:
+    assert len(results) == 2, "Benchmark configurations check failed!"
+    assert (results[["dct", "idct", "total", "peak_mib"]] > 0).all().all(), "Benchmark metrics check failed!"
+
+  @pytest.mark.parametrize("name", ["results.json", "results.csv"])
+  def test_roundtrip_and_compare(self, results, tmp_path, name: str) -> None:
+    save_results(results, tmp_path / name)
+    loaded = load_results(tmp_path / name)
+    assert loaded[KEYS].equals(results[KEYS]), "Saved results check failed!"
+    assert not compare(results, loaded)["regression"].any(), "Identical results must not regress!"
+    slower = loaded.copy()
+    slower["peak_mib"] *= 1.5
+    assert compare(results, slower)["regression"].all(), "Regression check failed!"
+
+  def test_benchmark_startup(self) -> None:
+    startup = benchmark_startup(repeats=1, modules=["pipeline", "missing_module"])
+    assert list(startup.index) == ["python", "engine start", "import pipeline", "import missing_module"], "Startup targets check failed!"
+    assert (startup["seconds"].iloc[:3] > 0).all() and math.isnan(startup.loc["import missing_module", "seconds"]), "Startup times check failed!"
+
+  def test_lazy_engine_imports(self) -> None:
+    heavy = ["numpy", "pandas", "scipy", "matplotlib", "tkinter", "PIL"]
+    code = f"import sys, engine; print([module for module in {heavy!r} if module in sys.modules])"
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=Path(__file__).resolve().parent.parent / "src", check=True)
+    assert completed.stdout.strip() == "[]", "The engine must not import heavy dependencies at startup!"
+
+if __name__ == "__main__":
+  pytest.main()
@@ -0,0 +1,100 @@
+import pytest
+import numpy as np
+from scipy.fft import dctn, idctn
+from blocks import EDGES, block_view, padded_blocks, unblock, block_mask, blockwise_dct, blockwise_idct, get_precision, resolve_method, set_precision, pack, unpack, packed_idct
+
+class TestBlocks:
+  F = 8
+  D_THR = 10
+
+  @staticmethod
+  def _image(height: int, width: int) -> np.typing.NDArray[np.uint8]:
+    return np.random.default_rng(42).integers(0, 256, size=(height, width)).astype(np.uint8)
+
+  def test_block_view_roundtrip(self) -> None:
+    img = TestBlocks._image(24, 40)
+    blocks = block_view(img, TestBlocks.F)
+    assert blocks.shape == (3, 5, TestBlocks.F, TestBlocks.F), "Block view shape check failed!"
+    assert np.shares_memory(blocks, img), "Block view must not copy the image!"
+    assert np.array_equal(blocks[1, 2], img[8:16, 16:24]), "Block view indexing check failed!"
+    assert np.array_equal(unblock(blocks), img), "Unblock roundtrip check failed!"
+
+  def test_block_mask(self) -> None:
+    mask = block_mask(4, 2)
+    assert mask.sum() == 3, "Block mask count check failed!"
+    assert mask[0, 0] and mask[0, 1] and mask[1, 0] and not mask[1, 1], "Block mask shape check failed!"
+
+  def test_pack_roundtrip(self) -> None:
+    F = TestBlocks.F
+    coeffs = blockwise_dct(TestBlocks._image(24, 40), F)
+    mask = block_mask(F, 4)
+    packed = pack(coeffs, 4)
+    assert packed.shape == (3, 5, 10) and packed.flags.c_contiguous, "Packed shape check failed!"
+    assert np.array_equal(packed[..., :3], coeffs[..., [0, 0, 1], [0, 1, 0]]), "Packed zig-zag order check failed!"
+    assert np.array_equal(unpack(packed, F, 4), coeffs * mask), "Unpack roundtrip check failed!"
+    assert np.array_equal(unpack(packed, F, 4, 3), (coeffs * mask)[..., :3, :3]), "Unpack corner check failed!"
+
+  @pytest.mark.parametrize("F, d_thr, method", [(8, 4, "auto"), (8, 15, "matrix"), (32, 6, "auto"), (32, 40, "auto"), (32, 6, "scipy"), (64, 10, "auto")])
+  def test_packed_idct(self, F: int, d_thr: int, method: str) -> None:
+    coeffs = blockwise_dct(TestBlocks._image(2 * F, 3 * F), F, precision="float64")
+    expected = blockwise_idct(coeffs * block_mask(F, d_thr), method="scipy")
+    assert np.array_equal(packed_idct(pack(coeffs, d_thr), F, d_thr, method=method), expected), "Packed IDCT2 check failed!"
+    assert np.array_equal(packed_idct(pack(coeffs, d_thr), F, d_thr, workers=2, method=method), expected), "Packed IDCT2 in bands check failed!"
+
+  @pytest.mark.parametrize("method", ["scipy", "matrix"])
+  def test_matches_per_block(self, method: str) -> None:
+    F = TestBlocks.F
+    img = TestBlocks._image(32, 48)
+    mask = block_mask(F, TestBlocks.D_THR)
+    coeffs = blockwise_dct(img, F, method=method, precision="float64")
+    rec = blockwise_idct(coeffs * mask, method=method)
+    for by in range(img.shape[0] // F):
+      for bx in range(img.shape[1] // F):
+        patch = img[by * F : (by + 1) * F, bx * F : (bx + 1) * F].astype(float) # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
+        c = dctn(patch - 128, norm="ortho")
+        assert np.allclose(coeffs[by, bx], c), "Blockwise DCT2 check failed!"
+        expected = np.clip(np.round(idctn(c * mask, norm="ortho") + 128), 0, 255)
+        assert np.array_equal(rec[by, bx], expected), "Blockwise IDCT2 check failed!"
+
+  @pytest.mark.parametrize("method", ["scipy", "matrix"])
+  def test_single_precision(self, method: str) -> None:
+    img = TestBlocks._image(64, 96)
+    mask = block_mask(TestBlocks.F, TestBlocks.D_THR)
+    coeffs = blockwise_dct(img, TestBlocks.F, method=method, precision="float32")
+    expected = blockwise_dct(img, TestBlocks.F, method=method, precision="float64")
+    assert coeffs.dtype == np.float32, "Single precision type check failed!"
+    assert np.allclose(coeffs, expected, rtol=1e-2, atol=1e-1), "Single precision DCT2 check failed!"
+    rec = blockwise_idct(coeffs * mask, method=method)
+    assert rec.dtype == np.float32, "Single precision IDCT2 type check failed!"
+    assert np.abs(rec - blockwise_idct(expected * mask, method=method)).max() <= 1, "Single precision IDCT2 check failed!"
+
+  def test_resolve_method(self) -> None:
+    assert resolve_method(2) == "scipy" and resolve_method(8) == "matrix" and resolve_method(128) == "scipy", "Automatic method check failed!"
+    assert resolve_method(128, "matrix") == "matrix", "Explicit method check failed!"
+    with pytest.raises(ValueError):
+      resolve_method(8, "fft")
+
+  def test_precision(self) -> None:
+    assert get_precision() == "float32", "Single precision must be the default!"
+    with pytest.raises(ValueError):
+      set_precision("float16")
+
+  def test_workers(self) -> None:
+    img = TestBlocks._image(40, 48)
+    coeffs = blockwise_dct(img, TestBlocks.F, 1)
+    assert np.array_equal(blockwise_dct(img, TestBlocks.F, 3), coeffs), "Banded DCT2 check failed!"
+    masked = np.stack([coeffs * block_mask(TestBlocks.F, d_thr) for d_thr in (1, TestBlocks.D_THR)])
+    assert np.array_equal(blockwise_idct(masked, 4), blockwise_idct(masked, 1)), "Banded IDCT2 check failed!"
+
+  @pytest.mark.parametrize("edge", ["replicate", "reflect", "zero"])
+  @pytest.mark.parametrize("shape", [(21, 35), (5, 7), (24, 40)])
+  def test_padded_blocks(self, edge: str, shape: tuple[int, int]) -> None:
+    img = TestBlocks._image(*shape)
+    padded = unblock(padded_blocks(img, TestBlocks.F, edge, np.float64))
+    pad = ((0, -shape[0] % TestBlocks.F), (0, -shape[1] % TestBlocks.F))
+    assert np.array_equal(padded, np.pad(img, pad, mode=EDGES[edge])), f"Padded blocks check failed for {edge} padding!"
+    if shape == (24, 40):
+      assert np.array_equal(blockwise_dct(img, TestBlocks.F, edge=edge), blockwise_dct(img, TestBlocks.F)), "Aligned padding must not change the DCT2!"
+
+if __name__ == "__main__":
+  pytest.main()
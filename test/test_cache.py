@@ -0,0 +1,44 @@
+import pytest
+import numpy as np
+from cache import LRUCache, image_digest
+
+class TestCache:
+  KIB = 1024
+
+  @staticmethod
+  def _array(value: int) -> np.typing.NDArray[np.uint8]:
+    return np.full(TestCache.KIB, value, dtype=np.uint8)
+
+  def test_lru_eviction(self) -> None:
+    cache = LRUCache(2 * TestCache.KIB)
+    cache.put("a", TestCache._array(1))
+    cache.put("b", TestCache._array(2))
+    assert cache.get("a") is not None, "Cache lookup check failed!"
+    cache.put("c", TestCache._array(3)) # Evicts "b", the least recently used.
+    assert cache.get("b") is None and cache.get("a") is not None and cache.get("c") is not None, "LRU eviction check failed!"
+    assert cache.nbytes == 2 * TestCache.KIB and len(cache) == 2, "Cache size check failed!"
+    cache.budget = TestCache.KIB
+    assert len(cache) == 1 and cache.get("c") is not None, "Budget eviction check failed!"
+    cache.put("big", np.zeros(2 * TestCache.KIB, dtype=np.uint8))
+    assert cache.get("big") is None, "Oversized entries must not be cached!"
+
+  def test_get_or_compute(self) -> None:
+    cache = LRUCache(TestCache.KIB)
+    calls: list[int] = []
+    def compute() -> np.typing.NDArray[np.uint8]:
+      calls.append(1)
+      return TestCache._array(7)
+    first = cache.get_or_compute("key", compute)
+    second = cache.get_or_compute("key", compute)
+    assert first is second and len(calls) == 1, "Cached value must be computed only once!"
+    assert not first.flags.writeable, "Cached values must be read-only!"
+    assert cache.hits == 1 and cache.misses == 1, "Cache statistics check failed!"
+
+  def test_image_digest(self) -> None:
+    img = np.arange(64, dtype=np.uint8).reshape(8, 8)
+    assert image_digest(img) == image_digest(img.copy()), "Equal images must have equal digests!"
+    assert image_digest(img) != image_digest(img.reshape(4, 16)), "Digest must depend on the shape!"
+    assert image_digest(img[:, :4]) == image_digest(img[:, :4].copy()), "Digest must support non-contiguous views!"
+
+if __name__ == "__main__":
+  pytest.main()
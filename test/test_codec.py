@@ -0,0 +1,53 @@
+import pytest
+import numpy as np
+from pipeline import jpeg_pipeline_steps
+from codec import HEADER, zigzag_indices, encode, decode
+
+class TestCodec:
+  F = 8
+  D_THR = 10
+
+  @staticmethod
+  def _image() -> np.typing.NDArray[np.uint8]:
+    x = np.linspace(0, 4 * np.pi, 52)
+    smooth = 128 + 60 * np.sin(x)[:, None] * np.cos(x[:44])[None, :]
+    return np.clip(smooth + np.random.default_rng(42).normal(0, 8, smooth.shape), 0, 255).astype(np.uint8)
+
+  def test_zigzag_order(self) -> None:
+    k_idx, l_idx = zigzag_indices(TestCodec.F, 4)
+    assert list(zip(k_idx, l_idx)) == [(0, 0), (0, 1), (1, 0), (2, 0), (1, 1), (0, 2), (0, 3), (1, 2), (2, 1), (3, 0)], "Zig-zag order check failed!"
+    assert len(zigzag_indices(TestCodec.F, 2 * TestCodec.F)[0]) == TestCodec.F ** 2, "Zig-zag full block check failed!"
+
+  def test_roundtrip(self) -> None:
+    img = TestCodec._image()
+    expected = jpeg_pipeline_steps(img, TestCodec.F, TestCodec.D_THR)[0][4]
+    lossless = decode(encode(img, TestCodec.F, TestCodec.D_THR, 1e-3))
+    assert np.array_equal(lossless, expected), "Fine quantization must match the pipeline!"
+    data = encode(img, TestCodec.F, TestCodec.D_THR, 4.0)
+    assert len(data) < img.size / 2, "Compression ratio check failed!"
+    assert np.abs(decode(data).astype(int) - expected).max() <= 8, "Coarse quantization error check failed!"
+
+  def test_rejects_invalid(self) -> None:
+    with pytest.raises(ValueError):
+      decode(b"BM" + bytes(64))
+    with pytest.raises(ValueError):
+      encode(np.zeros((8, 8, 3), dtype=np.uint8), TestCodec.F, TestCodec.D_THR)
+    with pytest.raises(ValueError):
+      encode(TestCodec._image(), TestCodec.F, 2 * TestCodec.F) # Keeps nothing more than 2F - 1.
+    with pytest.raises(ValueError):
+      encode(TestCodec._image(), TestCodec.F, TestCodec.D_THR, 1e-30) # Levels overflowing 32 bits.
+    with pytest.raises(ValueError):
+      encode(np.zeros((4, 40), dtype=np.uint8), TestCodec.F, TestCodec.D_THR) # Smaller than a block.
+
+  def test_rejects_corrupt(self) -> None:
+    data = encode(TestCodec._image(), TestCodec.F, TestCodec.D_THR)
+    for truncated in (data[: HEADER.size + 2], data[:-10]): # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
+      with pytest.raises(ValueError, match="Corrupt"):
+        decode(truncated)
+    fields = list(HEADER.unpack_from(data))
+    fields[4] = 0 # F.
+    with pytest.raises(ValueError, match="Corrupt"):
+      decode(HEADER.pack(*fields) + data[HEADER.size :]) # noqa: E203 - False positive, see https://github.com/PyCQA/pycodestyle/issues/373
+
+if __name__ == "__main__":
+  pytest.main()
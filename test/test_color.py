@@ -0,0 +1,45 @@
+import pytest
+import numpy as np
+from pipeline import compress
+from color import SUBSAMPLINGS, compress_color, rgb_to_ycbcr, subsample, upsample, ycbcr_to_rgb
+
+class TestColor:
+  F = 8
+
+  @staticmethod
+  def _image() -> np.typing.NDArray[np.uint8]:
+    return np.random.default_rng(5).integers(0, 256, size=(40, 56, 3)).astype(np.uint8)
+
+  def test_conversion(self) -> None:
+    img = TestColor._image()
+    planes = rgb_to_ycbcr(img, "float64")
+    gray = np.full((2, 2, 3), 77, dtype=np.uint8)
+    assert np.array_equal(ycbcr_to_rgb(planes), img), "YCbCr round trip check failed!"
+    assert np.allclose(rgb_to_ycbcr(gray, "float64"), np.array([77, 128, 128])[:, None, None]), "Gray chroma check failed!"
+
+  def test_subsampling(self) -> None:
+    planes = rgb_to_ycbcr(TestColor._image(), "float64")
+    small = subsample(planes, 2, 2)
+    assert np.allclose(small, planes.reshape(3, 20, 2, 28, 2).mean(axis=(2, 4))), "Subsampling check failed!"
+    out = np.empty_like(planes)
+    assert np.array_equal(subsample(upsample(small, out), 2, 2), small), "Upsampling check failed!"
+
+  def test_full_chroma_matches_gray(self) -> None:
+    gray = TestColor._image()[:, :, 0]
+    img = np.repeat(gray[:, :, None], 3, axis=2)
+    rec, _ = compress_color(img, TestColor.F, 5, "4:4:4")
+    expected, _ = compress(gray, TestColor.F, 5, cached=False)
+    assert np.abs(rec[:, :, 0].astype(int) - expected).max() <= 1, "Gray color image check failed!"
+
+  @pytest.mark.parametrize("subsampling", list(SUBSAMPLINGS))
+  def test_compress(self, subsampling: str) -> None:
+    fy, fx = SUBSAMPLINGS[subsampling]
+    rec, metrics = compress_color(TestColor._image(), TestColor.F, 2 * TestColor.F - 1, subsampling)
+    h, w = 40 - 40 % (TestColor.F * fy), 56 - 56 % (TestColor.F * fx)
+    assert rec.shape == (h, w, 3) and rec.dtype == np.uint8, "Color shape check failed!"
+    assert metrics["fraction"] == (1 + 2 / (fy * fx)) / 3, "Color retained fraction check failed!"
+    with pytest.raises(ValueError):
+      compress_color(TestColor._image()[:, :, 0], TestColor.F, 5, subsampling)
+
+if __name__ == "__main__":
+  pytest.main()
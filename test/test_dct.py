@@ -1,6 +1,7 @@
 import pytest
 import numpy as np
-from dct import compute_dct_matrix, dct2_naive, dct2_scipy
+from dct import compute_dct_matrix, dct2_naive, dct2_scipy, parse_size, benchmark
+from blocks import blockwise_dct
 
 class TestDCT:
   TEST_ROW = [231, 32, 233, 161, 24, 71, 140, 245]
@@ -50,5 +51,31 @@ class TestDCT:
     got_block = dct2_scipy(block)
     assert np.allclose(got_block, expected_block, rtol=1e-2, atol=1e-1), "2D SciPy's DCT2 check failed!"
 
+  @pytest.mark.parametrize("method", ["scipy", "matrix"])
+  def test_scaling_single_precision(self, method: str) -> None:
+    block = np.array(TestDCT.TEXT_MATRIX, dtype=np.uint8)
+    expected_block = np.array(TestDCT.EXPECTED_MATRIX)
+    got_block = blockwise_dct(block, 8, method=method, precision="float32")[0, 0].astype(float)
+    got_block[0, 0] += 128 * 8 # Undo the level shift, which only affects the DC coefficient.
+    assert np.allclose(got_block, expected_block, rtol=1e-2, atol=1e-1), f"2D single precision {method} DCT2 check failed!"
+
+  def test_rectangular(self) -> None:
+    data = np.random.default_rng(0).random((12, 20))
+    assert np.allclose(dct2_naive(data), dct2_scipy(data)), "Rectangular naive DCT2 check failed!"
+    assert np.allclose(dct2_scipy(data.copy(), overwrite=True), dct2_scipy(data)), "In place SciPy's DCT2 check failed!"
+
+  def test_parse_size(self) -> None:
+    assert parse_size("64") == (64, 64), "Square size check failed!"
+    assert parse_size("60x40") == parse_size("60×40") == (60, 40), "Rectangular size check failed!"
+    for text in ("0", "x40", "2x3x4", "N"):
+      with pytest.raises(ValueError):
+        parse_size(text)
+
+  def test_benchmark_budget(self) -> None:
+    result = benchmark([32, (24, 40), 16, (40, 24), 16], budget=0)
+    assert list(result.index) == [(16, 16), (24, 40), (40, 24), (32, 32)], "Benchmark sizes check failed!"
+    assert list(result["estimated"]) == [False, True, True, True], "Naive extrapolation check failed!"
+    assert (result["fast_runs"] == 1).all() and (result[["naive", "fast"]] > 0).all().all(), "Benchmark budget check failed!"
+
 if __name__ == "__main__":
   pytest.main()
@@ -0,0 +1,20 @@
+import pytest
+import numpy as np
+from display import display_factor, downsample
+
+class TestDisplay:
+  def test_display_factor(self) -> None:
+    assert display_factor((600, 800), 720, 1080) == 1, "Small images must not be downsampled!"
+    assert display_factor((10000, 10000), 680, 1080) == 8, "Pyramid level check failed!"
+    assert display_factor((2000, 8000), 720, 1000) == 8, "The widest side must fit the canvas!"
+
+  def test_downsample(self) -> None:
+    img = np.arange(6 * 9, dtype=np.uint8).reshape(6, 9)
+    assert downsample(img, 1) is img, "Factor 1 must return the image itself!"
+    small = downsample(img, 2)
+    assert small.shape == (3, 4) and small.dtype == np.uint8, "Downsampled shape check failed!"
+    assert small[1, 2] == np.rint(img[2:4, 4:6].mean()), "Downsampled value check failed!"
+    assert downsample(img.astype(float), 3).dtype == np.float32, "Float images must be downsampled to float32!"
+
+if __name__ == "__main__":
+  pytest.main()
@@ -0,0 +1,95 @@
+import sys
+import json
+import subprocess
+from pathlib import Path
+import pytest
+import numpy as np
+from PIL import Image
+from engine import Engine
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+@pytest.fixture
+def image(tmp_path: Path) -> Path:
+  path = tmp_path / "image.png"
+  Image.fromarray(np.random.default_rng(0).integers(0, 256, size=(32, 40), dtype=np.uint8)).save(path)
+  return path
+
+class TestEngine:
+  @staticmethod
+  def _responses(capsys: pytest.CaptureFixture[str]) -> list[dict]:
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+  def test_json_output(self, image: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    engine = Engine(json_output=True, interactive=False)
+    assert engine.run_script([f"metrics {image} 8 4", "# comment", "", "bogus", "info"]) is False, "Script failure check failed!"
+    metrics, bogus, info = self._responses(capsys)
+    assert metrics["ok"] and metrics["error"] is None, "Successful command check failed!"
+    assert set(metrics["result"]) == {"mse", "psnr", "ssim", "retained", "fraction"}, "Command results check failed!"
+    assert "PSNR" in metrics["output"], "Captured output check failed!"
+    assert not bogus["ok"] and bogus["error"].startswith("Invalid command"), "Failed command check failed!"
+    assert info["result"] == {"version": Engine.VERSION}, "Commands after a failure check failed!"
+
+  def test_non_finite_results(self, image: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    engine = Engine(json_output=True, interactive=False)
+    assert engine.run_script([f"metrics {image} 8 15", "exit", "info"]), "Script success check failed!"
+    (response,) = self._responses(capsys)
+    assert response["result"]["psnr"] is None, "Infinite PSNR check failed!"
+
+  def test_non_interactive(self, capsys: pytest.CaptureFixture[str]) -> None:
+    engine = Engine(json_output=True, interactive=False)
+    engine.run("dct 4")
+    engine.run("cmp")
+    dct, cmp = self._responses(capsys)
+    assert dct["ok"] and len(dct["result"]) == 2, "Benchmark without plot check failed!"
+    assert not cmp["ok"], "Application in non-interactive mode check failed!"
+
+  def test_block_larger_than_image(self, image: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    engine = Engine(json_output=True, interactive=False)
+    assert engine.run_script([f"metrics {image} 64 4", f"sweep {image} 64 4 5", f"metrics {image} 64 4 reflect"]) is False, "Script with errors check failed!"
+    metrics, sweep, padded = self._responses(capsys)
+    assert not metrics["ok"] and not sweep["ok"] and "at least one block" in metrics["error"], "Block larger than image check failed!"
+    assert padded["ok"], "Padded block larger than image check failed!"
+
+  def test_batch_report(self, image: Path, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    engine = Engine(json_output=True, interactive=False)
+    engine.run(f"batch {image.parent} {tmp_path / 'output'} 8 4 1 {tmp_path / 'report.csv'}")
+    engine.run(f"batch {image.parent} {tmp_path / 'output'} 8 4 {tmp_path / 'other.csv'}")
+    responses = self._responses(capsys)
+    assert all(response["ok"] for response in responses), "Batch with report check failed!"
+    assert (tmp_path / "report.csv").read_text().count("image.png") == 1 and (tmp_path / "other.csv").is_file(), "Batch report check failed!"
+
+  def test_batch_workers(self, image: Path, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    engine = Engine(json_output=True, interactive=False)
+    assert engine.run_script([f"batch {image.parent} {tmp_path / 'output'} 8 4 {workers}" for workers in (-1, 0)]) is False, "Script with errors check failed!"
+    assert [response["error"] for response in self._responses(capsys)] == ["Workers must be an integer ≥ 1"] * 2, "Invalid workers check failed!"
+
+  def test_script_survives_exceptions(self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]) -> None:
+    def fail(_engine: Engine, _arguments: list[str]) -> None:
+      raise RuntimeError("boom")
+    monkeypatch.setattr(Engine, "cache", fail)
+    engine = Engine(interactive=False)
+    assert engine.run_script(["cache", "info"]) is False and engine.failures == 1, "Script failure check failed!"
+    output = capsys.readouterr().out
+    assert "err boom" in output and Engine.VERSION in output, "Commands after an exception check failed!"
+
+  def test_server(self, image: Path) -> None:
+    commands = f"info\nmetrics {image} 8 4\nmetrics {image} 8\nexit\ninfo\n"
+    completed = subprocess.run([sys.executable, "engine.py", "--json"], input=commands, capture_output=True, text=True, cwd=SRC, check=True)
+    responses = [json.loads(line) for line in completed.stdout.splitlines()]
+    assert [response["ok"] for response in responses] == [True, True, False], "Server responses check failed!"
+
+  def test_dct(self) -> None:
+    for command in (["dct", "4"], ["dct", "sizes", "8", "12x16"]): # Fresh interpreters, so that every lazy import of the command is exercised.
+      completed = subprocess.run([sys.executable, "engine.py", "--json", *command], capture_output=True, text=True, cwd=SRC, check=False)
+      (response,) = [json.loads(line) for line in completed.stdout.splitlines()]
+      assert completed.returncode == 0 and response["ok"] and response["result"], f"'{' '.join(command)}' command check failed!"
+
+  def test_command_line(self, image: Path) -> None:
+    completed = subprocess.run([sys.executable, "engine.py", "metrics", str(image), "8", "4"], capture_output=True, text=True, cwd=SRC, check=False)
+    assert completed.returncode == 0 and "PSNR" in completed.stdout, "Single command check failed!"
+    completed = subprocess.run([sys.executable, "engine.py", "metrics", str(image), "8"], capture_output=True, text=True, cwd=SRC, check=False)
+    assert completed.returncode == 1, "Exit status check failed!"
+
+if __name__ == "__main__":
+  pytest.main()
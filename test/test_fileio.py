@@ -0,0 +1,35 @@
+import pytest
+import numpy as np
+from PIL import Image
+from fileio import BackgroundSaver, load_image, prefetch
+
+class TestFileIO:
+  @staticmethod
+  def _image(seed: int) -> np.typing.NDArray[np.uint8]:
+    return np.random.default_rng(seed).integers(0, 256, size=(12, 20)).astype(np.uint8)
+
+  def test_prefetch(self, tmp_path) -> None:
+    paths = [tmp_path / f"{idx}.png" for idx in range(5)]
+    for idx, path in enumerate(paths):
+      Image.fromarray(TestFileIO._image(idx)).save(path)
+    paths.insert(2, tmp_path / "missing.png")
+    loaded = [(path, image) for path, image in prefetch(paths, depth=2)]
+    assert [path for path, _ in loaded] == paths, "Prefetch order check failed!"
+    for path, image in loaded:
+      if path.name == "missing.png":
+        with pytest.raises(OSError):
+          image.result()
+      else:
+        assert np.array_equal(image.result(), TestFileIO._image(int(path.stem))), f"Prefetched image check failed for {path.name}!"
+
+  def test_saver(self, tmp_path) -> None:
+    with BackgroundSaver(threads=2, pending=1) as saver:
+      for idx in range(4):
+        saver.save(TestFileIO._image(idx), tmp_path / f"{idx}.bmp")
+      assert len(saver.wait()) == 4, "Saved paths check failed!"
+      failed = saver.save(TestFileIO._image(0), tmp_path / "missing" / "0.bmp")
+    assert isinstance(failed.exception(), OSError), "Save error check failed!"
+    assert all(np.array_equal(load_image(tmp_path / f"{idx}.bmp"), TestFileIO._image(idx)) for idx in range(4)), "Saved image check failed!"
+
+if __name__ == "__main__":
+  pytest.main()
@@ -0,0 +1,56 @@
+import math
+import pytest
+import numpy as np
+from blocks import block_view, padded_blocks, unblock
+from metrics import block_quality, block_scores, padded_quality, psnr
+
+class TestMetrics:
+  F = 8
+
+  @staticmethod
+  def _blocks(img: np.typing.NDArray[np.uint8]) -> np.typing.NDArray[np.uint8]:
+    return block_view(img, TestMetrics.F)
+
+  def test_identical(self) -> None:
+    img = np.random.default_rng(0).integers(0, 256, size=(32, 48)).astype(np.uint8)
+    quality = block_quality(TestMetrics._blocks(img), TestMetrics._blocks(img))
+    assert quality["mse"] == 0 and quality["psnr"] == math.inf and math.isclose(quality["ssim"], 1), "Identical images check failed!"
+
+  def test_matches_direct(self) -> None:
+    rng = np.random.default_rng(1)
+    reference = rng.integers(0, 256, size=(32, 48)).astype(np.uint8)
+    reconstruction = np.clip(reference + rng.normal(0, 10, size=reference.shape), 0, 255).astype(np.uint8)
+    quality = block_quality(TestMetrics._blocks(reference), TestMetrics._blocks(reconstruction))
+    mse = float(np.mean((reference.astype(np.float64) - reconstruction) ** 2))
+    assert math.isclose(quality["mse"], mse) and math.isclose(quality["psnr"], psnr(mse)), "MSE and PSNR check failed!"
+    assert -1 <= quality["ssim"] < 1, "SSIM range check failed!"
+
+  def test_bands(self, monkeypatch: pytest.MonkeyPatch) -> None:
+    rng = np.random.default_rng(2)
+    reference = rng.integers(0, 256, size=(64, 32)).astype(np.uint8)
+    reconstruction = rng.integers(0, 256, size=(64, 32)).astype(np.uint8)
+    whole = block_quality(TestMetrics._blocks(reference), TestMetrics._blocks(reconstruction))
+    monkeypatch.setattr("metrics.BAND_PIXELS", TestMetrics.F * TestMetrics.F)
+    banded = block_quality(TestMetrics._blocks(reference), TestMetrics._blocks(reconstruction))
+    assert all(math.isclose(whole[key], banded[key]) for key in whole), "Banded metrics check failed!"
+
+  def test_block_scores(self) -> None:
+    rng = np.random.default_rng(4)
+    reference = rng.integers(0, 256, size=(24, 40)).astype(np.uint8)
+    reconstruction = rng.integers(0, 256, size=(24, 40)).astype(np.uint8)
+    errors, ssims = block_scores(TestMetrics._blocks(reference), TestMetrics._blocks(reconstruction))
+    quality = block_quality(TestMetrics._blocks(reference), TestMetrics._blocks(reconstruction))
+    assert errors.shape == ssims.shape == (3, 5), "Block scores shape check failed!"
+    assert math.isclose(errors.sum() / reference.size, quality["mse"]) and math.isclose(ssims.mean(), quality["ssim"]), "Block scores check failed!"
+
+  def test_padded(self) -> None:
+    rng = np.random.default_rng(3)
+    reference = rng.integers(0, 256, size=(21, 35)).astype(np.uint8)
+    reconstruction = padded_blocks(reference, TestMetrics.F, "reflect", np.float64) + rng.normal(0, 5, size=(3, 5, TestMetrics.F, TestMetrics.F))
+    quality = padded_quality(reference, reconstruction)
+    mse = float(np.mean((reference - unblock(reconstruction)[:21, :35]) ** 2))
+    whole = block_quality(TestMetrics._blocks(reference[:16, :32]), reconstruction[:2, :4])
+    assert math.isclose(quality["mse"], mse) and math.isclose(quality["ssim"], whole["ssim"]), "Padded metrics check failed!"
+
+if __name__ == "__main__":
+  pytest.main()
@@ -0,0 +1,90 @@
+import math
+import pytest
+import numpy as np
+from cache import CACHE
+from blocks import block_mask, pack, unblock
+from pipeline import PipelineSteps, block_coefficients, compress, jpeg_pipeline_steps, packed_visual, threshold_steps, sweep, to_visual
+
+class TestPipeline:
+  F = 8
+  D_VALUES = [1, 4, 10, 15]
+
+  @staticmethod
+  def _image() -> np.typing.NDArray[np.uint8]:
+    return np.random.default_rng(42).integers(0, 256, size=(30, 44)).astype(np.uint8)
+
+  def test_sweep_matches_pipeline(self) -> None:
+    img = TestPipeline._image()
+    recs, rows = sweep(img, TestPipeline.F, TestPipeline.D_VALUES)
+    assert recs.shape == (len(TestPipeline.D_VALUES), 24, 40), "Sweep shape check failed!"
+    for d_thr, rec, row in zip(TestPipeline.D_VALUES, recs, rows):
+      images, _ = jpeg_pipeline_steps(img, TestPipeline.F, d_thr)
+      assert np.array_equal(rec, images[4]), f"Sweep reconstruction check failed for d={d_thr}!"
+      assert math.isclose(row["mse"], float(np.mean((images[4] - images[1]) ** 2, dtype=np.float64))), f"Sweep MSE check failed for d={d_thr}!"
+    assert rows[-1]["fraction"] == 1 and rows[-1]["psnr"] == math.inf, "Sweep lossless check failed!"
+
+  def test_compress_matches_pipeline(self) -> None:
+    img = TestPipeline._image()
+    _, rows = sweep(img, TestPipeline.F, TestPipeline.D_VALUES)
+    for d_thr, row in zip(TestPipeline.D_VALUES, rows):
+      images, _ = jpeg_pipeline_steps(img, TestPipeline.F, d_thr)
+      rec, metrics = compress(img, TestPipeline.F, d_thr)
+      assert np.array_equal(rec, images[4]), f"Compressed reconstruction check failed for d={d_thr}!"
+      assert all(math.isclose(metrics[key], row[key]) for key in row if key != "d"), f"Compressed metrics check failed for d={d_thr}!"
+
+  def test_compress_padded(self) -> None:
+    img = TestPipeline._image()
+    cropped, _ = compress(img, TestPipeline.F, 6)
+    for edge in ("replicate", "reflect", "zero"):
+      padded, metrics = compress(img, TestPipeline.F, 6, edge=edge)
+      assert padded.shape == img.shape and np.array_equal(padded[:24, :40], cropped), f"Padded compression check failed for {edge} padding!"
+      assert math.isclose(metrics["mse"], float(np.mean((padded - img.astype(np.float64)) ** 2))), f"Padded MSE check failed for {edge} padding!"
+    lossless, _ = compress(img, TestPipeline.F, 2 * TestPipeline.F - 1, edge="reflect")
+    assert np.array_equal(lossless, img), "Padded lossless check failed!"
+
+  def test_packed_visual(self) -> None:
+    F = TestPipeline.F
+    coeffs = block_coefficients(TestPipeline._image(), F)
+    for d_thr in TestPipeline.D_VALUES:
+      expected = to_visual(unblock(coeffs * block_mask(F, d_thr)))
+      assert np.array_equal(packed_visual(pack(coeffs, d_thr), F, d_thr), expected), f"Packed visualization check failed for d={d_thr}!"
+
+  def test_threshold_steps(self) -> None:
+    img = TestPipeline._image()
+    for d_thr in TestPipeline.D_VALUES:
+      images, _ = jpeg_pipeline_steps(img, TestPipeline.F, d_thr)
+      masked, rec = threshold_steps(img, TestPipeline.F, d_thr)
+      assert np.array_equal(masked, images[3]) and np.array_equal(rec, images[4]), f"Threshold steps check failed for d={d_thr}!"
+
+  def test_lazy_steps(self) -> None:
+    img = TestPipeline._image()
+    images, titles = jpeg_pipeline_steps(img, TestPipeline.F, 4, cached=False)
+    CACHE.clear()
+    steps = PipelineSteps(img, TestPipeline.F, 4)
+    assert steps.titles == titles and len(steps) == len(images), "Lazy steps titles check failed!"
+    assert not steps.ready(4) and len(CACHE) == 0, "Lazy steps must not compute anything up front!"
+    assert np.array_equal(steps[4], images[4]) and steps.ready(5), "Lazy IDCT step check failed!"
+    assert not steps.ready(2) and not steps.ready(3), "Lazy steps must compute only the requested step!"
+    for idx in (0, 1, 2, 3):
+      assert np.array_equal(steps[idx], images[idx]), f"Lazy step {idx} check failed!"
+    assert all(np.array_equal(a, b) for a, b in zip(steps[5], images[5])), "Lazy comparison step check failed!"
+    assert steps.display(4, 1000, 1000) is steps[4] and steps.display_ready(5, 1000, 1000), "Small steps must be displayed at full resolution!"
+    small = steps.display(5, 6, 10)
+    assert small[0].shape == small[1].shape == (3, 5) and steps.display_ready(5, 6, 10), "Display pyramid check failed!"
+    other = steps.with_threshold(TestPipeline.D_VALUES[-1])
+    assert other.ready(2) and not other.ready(3), "Threshold change must keep only the steps independent of it!"
+
+  def test_progress(self) -> None:
+    stages: list[str] = []
+    fractions: list[float] = []
+    def progress(name: str, fraction: float) -> None:
+      stages.append(name)
+      fractions.append(fraction)
+      if name == "idct":
+        raise InterruptedError()
+    with pytest.raises(InterruptedError):
+      jpeg_pipeline_steps(TestPipeline._image(), TestPipeline.F, 4, progress=progress)
+    assert stages == ["crop", "dct", "mask", "idct"] and fractions == sorted(fractions), "Pipeline progress check failed!"
+
+if __name__ == "__main__":
+  pytest.main()
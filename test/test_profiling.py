@@ -0,0 +1,28 @@
+import json
+import pytest
+import numpy as np
+import profiling
+from pipeline import jpeg_pipeline_steps
+
+class TestProfiling:
+  def test_disabled_by_default(self) -> None:
+    assert profiling.active() is None, "Profiling must be opt-in!"
+    with profiling.stage("noop"):
+      profiling.count("noop")
+
+  def test_pipeline_stages(self, tmp_path) -> None:
+    profiler = profiling.enable(memory=True)
+    try:
+      jpeg_pipeline_steps(np.zeros((32, 40), dtype=np.uint8), 8, 4, cached=False)
+    finally:
+      assert profiling.disable() is profiler, "Disable must return the active profiler!"
+    summary = {row["stage"]: row for row in profiler.summary()}
+    assert list(summary) == ["crop", "dct", "mask", "idct", "to_visual"], "Pipeline stages check failed!"
+    assert summary["dct"]["calls"] == 1 and summary["dct"]["peak_mib"] > 0, "Stage statistics check failed!"
+    assert profiler.counters["blocks"] == 20, "Block counter check failed!"
+    profiler.export(tmp_path / "trace.json")
+    trace = json.loads((tmp_path / "trace.json").read_text(encoding="utf-8"))
+    assert len(trace["traceEvents"]) == 5 and all(event["ph"] == "X" for event in trace["traceEvents"]), "Chrome trace check failed!"
+
+if __name__ == "__main__":
+  pytest.main()
@@ -0,0 +1,39 @@
+import pytest
+import numpy as np
+from pipeline import sweep
+from search import search
+
+class TestSearch:
+  FS = [4, 8]
+
+  @staticmethod
+  def _image() -> np.typing.NDArray[np.uint8]:
+    y, x = np.mgrid[0:48, 0:64]
+    noise = np.random.default_rng(3).integers(0, 32, size=(48, 64))
+    return (96 + 64 * np.sin(x / 7) * np.cos(y / 5) + noise).astype(np.uint8)
+
+  def test_psnr(self) -> None:
+    img = TestSearch._image()
+    best, candidates = search(img, "psnr", 30, TestSearch.FS)
+    assert len(candidates) == len(TestSearch.FS) and best in candidates, "Search candidates check failed!"
+    for candidate in candidates:
+      F, d_thr = int(candidate["F"]), int(candidate["d"])
+      _, rows = sweep(img, F, list(range(1, 2 * F)))
+      assert candidate["psnr"] >= 30 and (d_thr == 1 or rows[d_thr - 2]["psnr"] < 30), f"Smallest threshold check failed for F={F}!"
+    assert best["fraction"] == min(candidate["fraction"] for candidate in candidates), "Best candidate check failed!"
+
+  def test_budgets(self) -> None:
+    img = TestSearch._image()
+    best, _ = search(img, "fraction", 0.2, TestSearch.FS)
+    assert best["fraction"] <= 0.2, "Fraction budget check failed!"
+    best, _ = search(img, "bytes", 2000, TestSearch.FS)
+    assert best["bytes"] <= 2000, "Byte budget check failed!"
+    with pytest.raises(ValueError):
+      search(img, "bytes", 1, TestSearch.FS)
+    with pytest.raises(ValueError):
+      search(img, "ssim", 0.9)
+    with pytest.raises(ValueError):
+      search(img, "psnr", 30, [8, 64])
+
+if __name__ == "__main__":
+  pytest.main()
@@ -0,0 +1,62 @@
+import math
+import pytest
+import numpy as np
+from PIL import Image
+from blocks import block_view
+from pipeline import compress
+from sequence import SequenceCompressor, changed_blocks, compress_sequence, frame_output_path
+
+class TestSequence:
+  F = 8
+  D_THR = 4
+
+  @staticmethod
+  def _frames() -> list[np.typing.NDArray[np.uint8]]:
+    rng = np.random.default_rng(7)
+    first = rng.integers(0, 256, size=(37, 45)).astype(np.uint8) # Partial blocks to exercise cropping.
+    second = first.copy()
+    second[3, 5] ^= 1 # A single pixel of block (0, 0).
+    second[20:30, 30:34] = 0 # Blocks (2, 3) to (3, 4).
+    third = second.copy()
+    third[33:, 40:] = 255 # Only pixels cropped away.
+    return [first, second, third, rng.integers(0, 256, size=(30, 45)).astype(np.uint8)]
+
+  @pytest.mark.parametrize("F, width, dtype", [(8, 64, np.uint8), (8, 45, np.uint8), (6, 48, np.uint8), (12, 60, np.uint16), (4, 32, np.float32)])
+  def test_changed_blocks(self, F: int, width: int, dtype: type) -> None:
+    rng = np.random.default_rng(F)
+    previous = rng.integers(0, 256, size=(48, width)).astype(dtype)
+    frame = previous.copy()
+    frame[rng.integers(0, 48, size=10), rng.integers(0, width, size=10)] += 1
+    h, w = 48 - 48 % F, width - width % F
+    expected = np.any(block_view(frame[:h, :w], F) != block_view(previous[:h, :w], F), axis=(2, 3))
+    assert np.array_equal(changed_blocks(frame[:h, :w], previous[:h, :w], F), expected), "Changed blocks check failed!"
+
+  def test_compressor(self) -> None:
+    compressor = SequenceCompressor(TestSequence.F, TestSequence.D_THR)
+    changed = []
+    for frame in TestSequence._frames():
+      rec, results = compressor.compress(frame)
+      expected, metrics = compress(frame, TestSequence.F, TestSequence.D_THR, cached=False)
+      assert np.array_equal(rec, expected), "Sequence reconstruction check failed!"
+      assert all(math.isclose(results[key], metrics[key], abs_tol=1e-9) for key in ("mse", "psnr", "ssim")), "Sequence metrics check failed!"
+      changed.append(results["changed"])
+    assert changed == [20, 5, 0, 15], "Recomputed blocks check failed!"
+
+  def test_sources(self, tmp_path) -> None:
+    frames = [Image.fromarray(frame) for frame in TestSequence._frames()[:3]]
+    frames[0].save(tmp_path / "frames.tif", save_all=True, append_images=frames[1:]) # Before the PNGs, as Pillow keeps the options of the last save in each image.
+    (tmp_path / "frames").mkdir()
+    for idx, frame in enumerate(frames):
+      frame.save(tmp_path / "frames" / f"frame_{idx}.png")
+    results = [compress_sequence(source, TestSequence.F, TestSequence.D_THR, tmp_path / "output") for source in (tmp_path / "frames", tmp_path / "frames.tif")]
+    for rows, summary in results:
+      assert [row["changed"] for row in rows] == [20, 5, 0], "Recomputed frames check failed!"
+      assert summary["frames"] == 3 and summary["frames_per_second"] > 0 and math.isclose(summary["changed_fraction"], 25 / 60), "Sequence summary check failed!"
+    assert [row["psnr"] for row in results[0][0]] == [row["psnr"] for row in results[1][0]], "Directory and TIFF check failed!"
+    assert frame_output_path("frames.tif[2]", tmp_path, TestSequence.F, TestSequence.D_THR).name == "frames_0002_step_4_8_4.bmp", "Page output path check failed!"
+    assert len(list((tmp_path / "output").iterdir())) == 6, "Saved frames check failed!"
+    expected = compress(np.array(frames[1]), TestSequence.F, TestSequence.D_THR, cached=False)[0]
+    assert np.array_equal(np.array(Image.open(tmp_path / "output" / "frames_0001_step_4_8_4.bmp")), expected), "Saved frame check failed!"
+
+if __name__ == "__main__":
+  pytest.main()
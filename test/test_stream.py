@@ -0,0 +1,41 @@
+import pytest
+import numpy as np
+from PIL import Image
+from pipeline import jpeg_pipeline_steps
+from stream import open_bmp, create_bmp, compress_streaming
+
+class TestStream:
+  F = 8
+  D_THR = 5
+
+  @staticmethod
+  def _image() -> np.typing.NDArray[np.uint8]:
+    return np.random.default_rng(42).integers(0, 256, size=(45, 37)).astype(np.uint8) # Odd width to exercise BMP row padding.
+
+  def test_bmp_roundtrip(self, tmp_path) -> None:
+    img = TestStream._image()
+    Image.fromarray(img).save(tmp_path / "pil.bmp")
+    assert np.array_equal(open_bmp(tmp_path / "pil.bmp"), img), "BMP memory map check failed!"
+    out = create_bmp(tmp_path / "ours.bmp", *img.shape)
+    out[...] = img
+    out.flush()
+    del out
+    assert np.array_equal(np.array(Image.open(tmp_path / "ours.bmp").convert("L")), img), "BMP creation check failed!"
+
+  @pytest.mark.parametrize("suffix, strip_rows", [(".bmp", 0), (".npy", 16), (".bmp", 20)])
+  def test_matches_pipeline(self, tmp_path, suffix: str, strip_rows: int) -> None:
+    img = TestStream._image()
+    np.save(tmp_path / "input.npy", img)
+    summary = compress_streaming(tmp_path / "input.npy", tmp_path / f"output{suffix}", TestStream.F, TestStream.D_THR, strip_rows)
+    assert (summary["height"], summary["width"]) == (40, 32), "Streaming crop check failed!"
+    got = np.load(tmp_path / "output.npy") if suffix == ".npy" else np.array(Image.open(tmp_path / "output.bmp"))
+    assert np.array_equal(got, jpeg_pipeline_steps(img, TestStream.F, TestStream.D_THR)[0][4]), "Streaming compression check failed!"
+
+  def test_rejects_small_image(self, tmp_path) -> None:
+    np.save(tmp_path / "input.npy", TestStream._image()[:4])
+    with pytest.raises(ValueError):
+      compress_streaming(tmp_path / "input.npy", tmp_path / "output.bmp", TestStream.F, TestStream.D_THR)
+    assert not (tmp_path / "output.bmp").exists(), "Output of a small image check failed!"
+
+if __name__ == "__main__":
+  pytest.main()
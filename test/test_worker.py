@@ -0,0 +1,62 @@
+import time
+import pytest
+from threading import Event
+from worker import BackgroundWorker
+
+class TestWorker:
+  TIMEOUT = 5
+
+  @staticmethod
+  def _wait(worker: BackgroundWorker) -> None:
+    deadline = time.monotonic() + TestWorker.TIMEOUT
+    while worker.busy and time.monotonic() < deadline:
+      worker.dispatch()
+      time.sleep(0.01)
+
+  def test_result_and_progress(self) -> None:
+    worker = BackgroundWorker()
+    results: list[int] = []
+    stages: list[str] = []
+    def square(x: int, progress) -> int:
+      progress("square", 0.0)
+      return x * x
+    worker.submit(square, 7, on_result=results.append, on_progress=lambda name, _: stages.append(name))
+    TestWorker._wait(worker)
+    worker.shutdown()
+    assert results == [49] and stages == ["square"], "Background result check failed!"
+
+  def test_error(self) -> None:
+    worker = BackgroundWorker()
+    errors: list[Exception] = []
+    def fail(progress) -> None:
+      raise ValueError("boom")
+    worker.submit(fail, on_result=lambda _: None, on_error=errors.append)
+    TestWorker._wait(worker)
+    worker.shutdown()
+    assert len(errors) == 1 and isinstance(errors[0], ValueError), "Background error check failed!"
+
+  def test_superseded(self) -> None:
+    worker = BackgroundWorker()
+    started, release = Event(), Event()
+    results: list[str] = []
+    def slow(name: str, progress) -> str:
+      started.set()
+      release.wait(TestWorker.TIMEOUT)
+      progress("after wait", 1.0) # Raises once superseded.
+      return name
+    calls: list[str] = []
+    def fast(name: str, progress) -> str:
+      calls.append(name)
+      return name
+    worker.submit(slow, "first", on_result=results.append)
+    assert started.wait(TestWorker.TIMEOUT), "Background task didn't start!"
+    worker.submit(fast, "queued", on_result=results.append)
+    worker.submit(fast, "last", on_result=results.append)
+    release.set()
+    TestWorker._wait(worker)
+    worker.shutdown()
+    assert results == ["last"], "Only the latest task must deliver its result!"
+    assert calls == ["last"], "Superseded queued tasks must not run!"
+
+if __name__ == "__main__":
+  pytest.main()